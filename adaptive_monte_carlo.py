@@ -0,0 +1,256 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tabulate import tabulate
+
+# Monte Carlo driver that keeps a mergeable quantile sketch instead of every
+# simulated price, and stops once the confidence intervals of the requested
+# percentiles are narrow enough. Workers each fill their own sketch and only
+# the sketches (a few KB of bucket counts) are merged.
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch with logarithmic buckets (DDSketch style).
+
+    A quantile is interpolated linearly within the bucket holding its rank,
+    treating the bucket's samples as evenly spread over its value range, so
+    it moves smoothly with q instead of in whole-bucket steps and stays
+    within 2 * relative_accuracy of a true sample value. Memory grows with
+    the log of the value range rather than the sample count, and two
+    sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.positive = _BucketStore()
+        self.negative = _BucketStore()
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.positive.total + self.negative.total + self.zero_count
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        magnitude = np.abs(values)
+        nonzero = magnitude > 0
+        indices = np.ceil(np.log(magnitude[nonzero]) / self.log_gamma).astype(np.int64)
+        positive = values[nonzero] > 0
+        self.positive.add(indices[positive])
+        self.negative.add(indices[~positive])
+        self.zero_count += int((~nonzero).sum())
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q):
+        """Values at quantiles q (0-1, scalar or array), ordered negatives, zeros, positives."""
+        if self.count == 0:
+            raise ValueError("Empty sketch")
+        q = np.asarray(q, dtype=float)
+        # Bucket i holds magnitudes in (gamma^(i-1), gamma^i]; buckets in ascending value order
+        negative = self.gamma ** self.negative.indices()[::-1].astype(float)
+        positive = self.gamma ** self.positive.indices().astype(float)
+        counts = np.concatenate([self.negative.counts[::-1], [self.zero_count], self.positive.counts])
+        lows = np.concatenate([-negative, [0.0], positive / self.gamma])
+        highs = np.concatenate([-negative / self.gamma, [0.0], positive])
+        cumulative = np.cumsum(counts)
+        ranks = np.clip(q, 0, 1) * (self.count - 1)
+        bucket = np.minimum(np.searchsorted(cumulative, ranks, side="right"), len(counts) - 1)
+        fraction = np.clip((ranks - (cumulative[bucket] - counts[bucket]) + 0.5) / counts[bucket], 0, 1)
+        return lows[bucket] + (highs[bucket] - lows[bucket]) * fraction
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": self.positive.to_dict(),
+            "negative": self.negative.to_dict(),
+            "zero_count": self.zero_count
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state["relative_accuracy"])
+        sketch.positive = _BucketStore.from_dict(state["positive"])
+        sketch.negative = _BucketStore.from_dict(state["negative"])
+        sketch.zero_count = state["zero_count"]
+        return sketch
+
+
+class _BucketStore:
+    """Dense bucket counts starting at index offset."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def indices(self):
+        return np.arange(self.offset, self.offset + len(self.counts))
+
+    def _extend(self, low, high):
+        if len(self.counts) == 0:
+            self.offset, self.counts = low, np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add(self, indices):
+        if len(indices) == 0:
+            return
+        low, high = int(indices.min()), int(indices.max())
+        self._extend(low, high)
+        self.counts += np.bincount(indices - self.offset, minlength=len(self.counts))
+
+    def merge(self, other):
+        if len(other.counts) == 0:
+            return
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+
+    def to_dict(self):
+        return {"offset": self.offset, "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        store = cls()
+        store.offset = state["offset"]
+        store.counts = np.array(state["counts"], dtype=np.int64)
+        return store
+
+
+def percentile_intervals(sketch, percentiles, z=1.96):
+    """
+    Estimate and distribution-free confidence interval for each percentile,
+    from the binomial spread of the order statistic around rank n * q.
+    """
+    q = np.asarray(percentiles, dtype=float) / 100
+    n = sketch.count
+    spread = z * np.sqrt(n * q * (1 - q)) / n
+    return sketch.quantile(q), sketch.quantile(q - spread), sketch.quantile(q + spread)
+
+
+def _interval_widths(estimate, lower, upper, relative):
+    width = upper - lower
+    return width / np.maximum(np.abs(estimate), 1e-12) if relative else width
+
+
+def adaptive_monte_carlo(sampler, percentiles=(5, 50, 95), target_width=0.02, relative=True, batch_size=10000,
+                         min_samples=20000, max_samples=5000000, relative_accuracy=0.002, seed=None):
+    """
+    Draw batches from sampler until every percentile's confidence interval
+    is narrower than target_width (a fraction of the estimate when relative).
+
+    sampler(n, seed) must return n simulated values, e.g. per-share prices.
+    Quantiles are interpolated within sketch buckets, which assumes samples
+    spread evenly across each bucket; below about 2 * relative_accuracy the
+    interval widths rest on that assumption, so a relative target_width
+    should stay well above it.
+    """
+    sketch = QuantileSketch(relative_accuracy)
+    seeds = np.random.SeedSequence(seed)
+    while True:
+        sketch.add(sampler(batch_size, seeds.spawn(1)[0]))
+        estimate, lower, upper = percentile_intervals(sketch, percentiles)
+        widths = _interval_widths(estimate, lower, upper, relative)
+        if (sketch.count >= min_samples and (widths <= target_width).all()) or sketch.count >= max_samples:
+            break
+    return {
+        "percentiles": np.asarray(percentiles),
+        "estimate": estimate,
+        "lower": lower,
+        "upper": upper,
+        "samples": sketch.count,
+        "converged": bool((widths <= target_width).all()),
+        "sketch": sketch
+    }
+
+
+def _worker_sketch(sampler, batch_size, relative_accuracy, seed):
+    sketch = QuantileSketch(relative_accuracy)
+    sketch.add(sampler(batch_size, seed))
+    return sketch.to_dict()
+
+
+def parallel_adaptive_monte_carlo(sampler, workers=4, percentiles=(5, 50, 95), target_width=0.02, relative=True,
+                                  batch_size=10000, min_samples=20000, max_samples=5000000, relative_accuracy=0.002,
+                                  seed=None):
+    """
+    adaptive_monte_carlo across worker processes. Each round every worker
+    returns the sketch of its own batch and the parent merges them; sampler
+    must be a picklable module-level function.
+    """
+    sketch = QuantileSketch(relative_accuracy)
+    seeds = np.random.SeedSequence(seed)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            states = pool.map(_worker_sketch, [sampler] * workers, [batch_size] * workers,
+                              [relative_accuracy] * workers, seeds.spawn(workers))
+            for state in states:
+                sketch.merge(QuantileSketch.from_dict(state))
+            estimate, lower, upper = percentile_intervals(sketch, percentiles)
+            widths = _interval_widths(estimate, lower, upper, relative)
+            if (sketch.count >= min_samples and (widths <= target_width).all()) or sketch.count >= max_samples:
+                break
+    return {
+        "percentiles": np.asarray(percentiles),
+        "estimate": estimate,
+        "lower": lower,
+        "upper": upper,
+        "samples": sketch.count,
+        "converged": bool((widths <= target_width).all()),
+        "sketch": sketch
+    }
+
+
+def _nvda_regime_sampler(n, seed):
+    from regime_switching import NVDA_REGIMES, NVDA_TRANSITIONS, regime_valuation
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe(["NVDA"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+    result = regime_valuation(universe["current_fcf"][0], NVDA_REGIMES, NVDA_TRANSITIONS, 0,
+                              universe["terminal_growth"][0, 1], wacc, universe["initial_shares"][0],
+                              universe["buyback_rate"][0], universe["debt"][0] - universe["cash"][0],
+                              n_paths=n, seed=seed)
+    return result["price_per_share"]
+
+
+# Example usage:
+if __name__ == "__main__":
+    for name, run in (("Single process", adaptive_monte_carlo), ("4 workers", parallel_adaptive_monte_carlo)):
+        start = time.perf_counter()
+        result = run(_nvda_regime_sampler, target_width=0.01, seed=0)
+        elapsed = time.perf_counter() - start
+
+        headers = ["Percentile", "Estimate", "95% CI"]
+        table = [
+            [f"{p:g}th", f"${result['estimate'][i]:.2f}", f"${result['lower'][i]:.2f} - ${result['upper'][i]:.2f}"]
+            for i, p in enumerate(result["percentiles"])
+        ]
+        print(f"\n{name}: NVDA regime-switching price per share")
+        print(tabulate(table, headers, tablefmt="grid"))
+        print(f"Stopped after {result['samples']} paths in {elapsed:.2f}s (converged: {result['converged']}), "
+              f"sketch buckets: {len(result['sketch'].positive.counts) + len(result['sketch'].negative.counts)}")
@@ -0,0 +1,153 @@
+import sys
+import time
+import warnings
+
+import numpy as np
+from tabulate import tabulate
+
+from beta_estimation import load_price_directory, rolling_beta
+from fundamentals_store import FundamentalsStore
+from universe import TICKERS, load_universe
+from valuation_core import SCENARIOS, calculate_wacc, run_scenarios
+
+
+def scenario_templates(tickers):
+    """
+    Growth (tickers, 3, 10) and terminal growth (tickers, 3) for a backtest.
+
+    Tickers in the universe keep their own scenario definitions; any other
+    ticker gets the universe average so it can still be ranked.
+    """
+    universe = load_universe()
+    known = {ticker: i for i, ticker in enumerate(universe["tickers"])}
+    default_growth = universe["growth"].mean(axis=0)
+    default_terminal = universe["terminal_growth"].mean(axis=0)
+    growth = np.array([universe["growth"][known[t]] if t in known else default_growth for t in tickers])
+    terminal = np.array([universe["terminal_growth"][known[t]] if t in known else default_terminal for t in tickers])
+    return growth, terminal
+
+
+def forward_returns(price_dates, prices, dates, horizon=252):
+    """
+    Return from the last close on or before each date to the close horizon
+    trading days later, shape (dates, tickers). NaN past the end of history.
+    """
+    start = np.searchsorted(price_dates, np.asarray(dates, dtype="datetime64[D]"), side="right") - 1
+    end = start + horizon
+    usable = (start >= 0) & (end < len(price_dates))
+    start = np.clip(start, 0, len(price_dates) - 1)
+    end = np.clip(end, 0, len(price_dates) - 1)
+    returns = prices[:, end] / prices[:, start] - 1
+    return np.where(usable[None, :], returns, np.nan).T
+
+
+def rank_correlation(x, y):
+    """Spearman correlation along the last axis, ignoring pairs with a NaN."""
+    valid = np.isfinite(x) & np.isfinite(y)
+
+    def ranks(values):
+        order = np.argsort(np.where(valid, values, np.inf), axis=-1)
+        ranked = np.empty(values.shape)
+        np.put_along_axis(ranked, order, np.arange(values.shape[-1], dtype=float) + np.zeros(values.shape), axis=-1)
+        return np.where(valid, ranked, np.nan)
+
+    rx, ry = ranks(x), ranks(y)
+    rx = rx - np.nanmean(rx, axis=-1, keepdims=True)
+    ry = ry - np.nanmean(ry, axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nansum(rx * ry, axis=-1) / np.sqrt(np.nansum(rx * rx, axis=-1) * np.nansum(ry * ry, axis=-1))
+
+
+def run_backtest(store, price_directory, dates=None, horizon=252, risk_free_rate=0.04457, market_return=0.095,
+                 cost_of_debt=0.04, beta_window=252, index="SPY", chunk_dates=64):
+    """
+    Revalue every ticker at every snapshot date and compare implied upside
+    with the realised forward return.
+
+    Parameters:
+    store (FundamentalsStore): Point-in-time fundamentals
+    price_directory (str): Directory of daily price files (see beta_estimation.py)
+    dates (array): Snapshot dates to test (default: every date in the store)
+    horizon (int): Forward return horizon in trading days
+    risk_free_rate, market_return, cost_of_debt (float): calculate_wacc inputs
+    beta_window (int): Rolling beta window; beta is taken as of each snapshot
+    chunk_dates (int): Snapshot dates valued per batch, to bound memory
+
+    Returns:
+    dict: dates, tickers, upside (dates, tickers, scenarios), forward_return
+    (dates, tickers), information_coefficient (dates, scenarios) and
+    top_minus_bottom (dates, scenarios): top-quintile minus bottom-quintile
+    forward return when ranked by upside
+    """
+    tickers = store.tickers
+    dates = store.dates if dates is None else np.asarray(dates, dtype="datetime64[D]")
+    price_dates, index_prices, prices = load_price_directory(price_directory, tickers, index)
+
+    betas = rolling_beta(prices[:, 1:] / prices[:, :-1] - 1, index_prices[1:] / index_prices[:-1] - 1, beta_window)
+    beta_row = np.searchsorted(price_dates, dates, side="right") - 1 - beta_window
+    beta = np.where((beta_row >= 0)[:, None], betas[:, np.clip(beta_row, 0, betas.shape[1] - 1)].T, np.nan)
+    beta = np.where(np.isfinite(beta), beta, 1.0)
+
+    growth, terminal_growth = scenario_templates(tickers)
+    fundamentals = {field: store.panel(field, dates) for field in ("market_cap", "current_fcf", "cash", "debt",
+                                                                    "initial_shares")}
+
+    # Tickers whose scripts leave cash out of the WACC keep it out here too
+    nets_cash = np.array([TICKERS.get(t, {}).get("wacc_nets_cash", True) for t in tickers], dtype=float)
+
+    upside = np.empty((len(dates), len(tickers), len(SCENARIOS)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, len(dates), chunk_dates):
+            rows = slice(start, start + chunk_dates)
+            market_cap = fundamentals["market_cap"][rows]
+            debt, cash = fundamentals["debt"][rows], fundamentals["cash"][rows]
+            wacc = calculate_wacc(risk_free_rate, market_return, beta[rows], market_cap, debt, cash * nets_cash,
+                                  cost_of_debt=cost_of_debt)
+            result = run_scenarios(fundamentals["current_fcf"][rows][..., None], growth, terminal_growth,
+                                   wacc[..., None], fundamentals["initial_shares"][rows][..., None], 0,
+                                   (debt - cash)[..., None])
+            upside[rows] = result["equity_value"] / market_cap[..., None] - 1
+
+    realised = forward_returns(price_dates, prices, dates, horizon)
+    with warnings.catch_warnings():
+        # Dates before the first snapshot or inside the final horizon have no pairs
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        information_coefficient = np.stack(
+            [rank_correlation(upside[..., s], realised) for s in range(len(SCENARIOS))], axis=-1)
+
+        valid = np.isfinite(upside) & np.isfinite(realised)[..., None]
+        ranked = np.where(valid, upside, np.nan)
+        low, high = np.nanpercentile(ranked, [20, 80], axis=1, keepdims=True)
+        forward = np.broadcast_to(realised[..., None], upside.shape)
+        top = np.nanmean(np.where(valid & (ranked >= high), forward, np.nan), axis=1)
+        bottom = np.nanmean(np.where(valid & (ranked <= low), forward, np.nan), axis=1)
+
+    return {
+        "dates": dates,
+        "tickers": tickers,
+        "upside": upside,
+        "forward_return": realised,
+        "information_coefficient": information_coefficient,
+        "top_minus_bottom": top - bottom
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    store_path = sys.argv[1] if len(sys.argv) > 1 else "fundamentals"
+    price_directory = sys.argv[2] if len(sys.argv) > 2 else "prices"
+
+    start = time.perf_counter()
+    result = run_backtest(FundamentalsStore(store_path), price_directory)
+    elapsed = time.perf_counter() - start
+
+    ic = result["information_coefficient"]
+    headers = ["Metric"] + list(SCENARIOS)
+    table = [
+        ["Mean Rank IC"] + [f"{v:.3f}" for v in np.nanmean(ic, axis=0)],
+        ["IC Hit Rate"] + [f"{v:.1%}" for v in np.nanmean(np.where(np.isfinite(ic), ic > 0, np.nan), axis=0)],
+        ["Top-Bottom Quintile Return"] + [f"{v:.2%}" for v in np.nanmean(result["top_minus_bottom"], axis=0)]
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"{len(result['dates'])} dates x {len(result['tickers'])} tickers x {len(SCENARIOS)} scenarios "
+          f"in {elapsed:.2f}s")
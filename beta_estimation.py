@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+# Rolling betas from local daily price histories, to replace the hard-coded
+# beta in each ticker script. Histories live in one directory as
+# <TICKER>.csv (a header row, then date,close rows with ISO dates) or
+# <TICKER>.npy (closing prices already aligned with the index history).
+
+
+def load_price_history(path):
+    """Return (dates, closes) from a CSV or .npy price file; dates is None for .npy."""
+    if path.endswith(".npy"):
+        return None, np.load(path).astype(float)
+    data = np.genfromtxt(path, delimiter=",", skip_header=1, dtype=str, encoding="utf-8")
+    data = np.atleast_2d(data)
+    return data[:, 0].astype("datetime64[D]"), data[:, -1].astype(float)
+
+
+def _find_price_file(directory, ticker):
+    for extension in (".npy", ".csv"):
+        path = os.path.join(directory, ticker + extension)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No price history for {ticker} in {directory}")
+
+
+def load_price_directory(directory, tickers, index="SPY"):
+    """
+    Load and align price histories on the index's trading days.
+
+    Returns (dates, index_prices, prices) where prices has shape
+    (len(tickers), days) and is NaN on days a ticker has no close.
+    """
+    dates, index_prices = load_price_history(_find_price_file(directory, index))
+    prices = np.full((len(tickers), len(index_prices)), np.nan)
+    for i, ticker in enumerate(tickers):
+        ticker_dates, closes = load_price_history(_find_price_file(directory, ticker))
+        if ticker_dates is None or dates is None:
+            # .npy histories are aligned to the end of the index history
+            count = min(len(closes), len(index_prices))
+            prices[i, len(index_prices) - count:] = closes[len(closes) - count:]
+        else:
+            positions = np.searchsorted(dates, ticker_dates)
+            found = (positions < len(dates)) & (dates[np.minimum(positions, len(dates) - 1)] == ticker_dates)
+            prices[i, positions[found]] = closes[found]
+    return dates, index_prices, prices
+
+
+def _window_sums(values, window):
+    totals = np.cumsum(values, axis=-1)
+    totals = np.concatenate([np.zeros(values.shape[:-1] + (1,)), totals], axis=-1)
+    return totals[..., window:] - totals[..., :-window]
+
+
+def rolling_beta(returns, index_returns, window=252, min_periods=None):
+    """
+    Rolling OLS beta of each ticker's returns on the index returns.
+
+    Uses running sums of x, y, xy and xx so every window costs O(1) and the
+    whole history is O(n) per ticker, whatever the window length.
+
+    Parameters:
+    returns (array): Daily returns, shape (tickers, days); NaN where missing
+    index_returns (array): Daily index returns, shape (days,)
+    window (int): Window length in trading days
+    min_periods (int): Minimum paired observations for a beta (default: window // 2)
+
+    Returns:
+    array: Betas of shape (tickers, days - window + 1); entry j covers days j..j+window-1
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=float))
+    index_returns = np.broadcast_to(np.asarray(index_returns, dtype=float), returns.shape)
+    if min_periods is None:
+        min_periods = window // 2
+
+    valid = np.isfinite(returns) & np.isfinite(index_returns)
+    # Demeaning first keeps the cumulative sums well conditioned over decades
+    x = np.where(valid, index_returns - np.nanmean(np.where(valid, index_returns, np.nan), axis=-1, keepdims=True), 0)
+    y = np.where(valid, returns - np.nanmean(np.where(valid, returns, np.nan), axis=-1, keepdims=True), 0)
+
+    count = _window_sums(valid.astype(float), window)
+    sum_x = _window_sums(x, window)
+    sum_y = _window_sums(y, window)
+    sum_xy = _window_sums(x * y, window)
+    sum_xx = _window_sums(x * x, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = sum_xy - sum_x * sum_y / count
+        variance = sum_xx - sum_x * sum_x / count
+        beta = covariance / variance
+    return np.where((count >= min_periods) & (variance > 0), beta, np.nan)
+
+
+def estimate_betas(directory, tickers, index="SPY", window=252):
+    """
+    Latest rolling beta per ticker, in tickers order, ready to pass as the
+    beta argument of calculate_wacc. Also returns the full rolling history.
+    Betas are NaN when the histories hold fewer than window returns.
+    """
+    dates, index_prices, prices = load_price_directory(directory, tickers, index)
+    index_returns = index_prices[1:] / index_prices[:-1] - 1
+    returns = prices[:, 1:] / prices[:, :-1] - 1
+    history = rolling_beta(returns, index_returns, window)
+    if not history.shape[1]:
+        return np.full(len(tickers), np.nan), history
+    return history[:, -1], history
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "prices"
+    universe = load_universe()
+
+    start = time.perf_counter()
+    betas, history = estimate_betas(directory, universe["tickers"])
+    elapsed = time.perf_counter() - start
+
+    betas = np.where(np.isfinite(betas), betas, universe["beta"])
+    hard_coded_wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                                     universe["market_cap"], universe["debt"], wacc_cash(universe),
+                                     cost_of_debt=universe["cost_of_debt"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], betas,
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+
+    headers = ["Ticker", "Script Beta", "Rolling Beta", "Script WACC", "Rolling-Beta WACC"]
+    table = [
+        [ticker, f"{universe['beta'][i]:.2f}", f"{betas[i]:.2f}", f"{hard_coded_wacc[i]:.2%}", f"{wacc[i]:.2%}"]
+        for i, ticker in enumerate(universe["tickers"])
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"Rolling betas for {history.shape[0]} tickers x {history.shape[1]} windows in {elapsed:.3f}s")
@@ -0,0 +1,177 @@
+import sys
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import calculate_wacc, run_scenarios
+
+# Scenario growth paths resampled from each ticker's own history instead of
+# typed-in pessimistic/base/optimistic lists. Annual FCF (or revenue) comes
+# from a CSV with a header row and year,value rows, or from the yearly
+# snapshots in a fundamentals store.
+
+
+def load_annual_series(path):
+    data = np.atleast_2d(np.genfromtxt(path, delimiter=",", skip_header=1))
+    return data[np.argsort(data[:, 0]), -1]
+
+
+def annual_series_from_store(store, ticker, field="current_fcf"):
+    """Last stored value of each calendar year for one ticker."""
+    dates, values = store.history(ticker, field)
+    years = dates.astype("datetime64[Y]")
+    year_end = np.r_[years[1:] != years[:-1], True]
+    values = np.asarray(values)[year_end]
+    return values[np.isfinite(values)]
+
+
+def historical_growth(values):
+    """
+    Year-over-year growth, NaN where either value is not positive, so the
+    remaining years keep their place in the sequence.
+    """
+    values = np.asarray(values, dtype=float)
+    usable = (values[:-1] > 0) & (values[1:] > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(usable, values[1:] / values[:-1] - 1, np.nan)
+
+
+def block_bootstrap(histories, n_paths, years=10, block_length=3, seed=None):
+    """
+    Circular block bootstrap of growth histories.
+
+    Blocks are drawn only from starts whose block_length consecutive years
+    are all known, so a NaN year (see historical_growth) never enters a path
+    and no block joins years from either side of a gap.
+
+    Parameters:
+    histories (list): One 1-D array of historical growth rates per ticker, NaN where unknown
+    n_paths (int): Resampled paths per ticker
+    years (int): Length of each path
+    block_length (int): Consecutive years drawn together, keeping runs of good and bad years
+    seed (int): Seed for the random generator
+
+    Returns:
+    array: Growth paths of shape (tickers, n_paths, years)
+    """
+    rng = np.random.default_rng(seed)
+    lengths = np.array([len(history) for history in histories])
+    if (lengths == 0).any():
+        raise ValueError("Every ticker needs at least one historical growth rate")
+    padded = np.zeros((len(histories), lengths.max()))
+    for i, history in enumerate(histories):
+        padded[i, :len(history)] = history
+
+    # Valid starts per ticker, listed first in start order
+    candidates = np.arange(lengths.max())
+    window = (candidates[:, None] + np.arange(block_length)) % lengths[:, None, None]
+    complete = np.isfinite(np.take_along_axis(padded[:, None, :], window, axis=-1)).all(axis=-1)
+    complete &= candidates < lengths[:, None]
+    counts = complete.sum(axis=1)
+    if (counts == 0).any():
+        raise ValueError(f"Every ticker needs {block_length} consecutive known growth rates for a block")
+    valid_starts = np.argsort(~complete, axis=1, kind="stable")
+
+    blocks = -(-years // block_length)
+    draws = np.floor(rng.random((len(histories), n_paths, blocks)) * counts[:, None, None]).astype(int)
+    starts = np.take_along_axis(valid_starts, draws.reshape(len(histories), -1), axis=1).reshape(draws.shape)
+    offsets = starts[..., None] + np.arange(block_length)
+    positions = (offsets % lengths[:, None, None, None]).reshape(len(histories), n_paths, -1)[..., :years]
+    return np.take_along_axis(padded[:, None, :], positions, axis=-1)
+
+
+def fade_paths(paths, fade_to):
+    """Blend resampled growth linearly towards fade_to by the final year."""
+    weights = np.linspace(0, 1, paths.shape[-1])
+    return paths * (1 - weights) + np.asarray(fade_to, dtype=float)[..., None, None] * weights
+
+
+def bootstrap_valuation(initial_fcf, histories, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                        net_debt, n_paths=100000, years=10, block_length=3, fade_to=None,
+                        percentiles=(5, 50, 95), seed=None):
+    """
+    Value every ticker over bootstrapped growth paths in one batch.
+
+    Ticker inputs are (tickers,) arrays. Returns the paths and, for both
+    today's per-share value and the final-year price, the requested
+    percentiles with shape (tickers, len(percentiles)).
+    """
+    paths = block_bootstrap(histories, n_paths, years, block_length, seed)
+    if fade_to is not None:
+        paths = fade_paths(paths, fade_to)
+
+    def per_ticker(values):
+        return np.asarray(values, dtype=float)[:, None]
+
+    result = run_scenarios(per_ticker(initial_fcf), paths, per_ticker(terminal_growth), per_ticker(discount_rate),
+                           per_ticker(initial_shares), per_ticker(buyback_rate), per_ticker(net_debt))
+    price_per_share = result["yearly_share_prices"][..., 0]
+    return {
+        "growth_paths": paths,
+        "percentiles": np.asarray(percentiles),
+        "price_per_share": np.percentile(price_per_share, percentiles, axis=1).T,
+        "final_price_per_share": np.percentile(result["final_price_per_share"], percentiles, axis=1).T
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    from fundamentals_store import FundamentalsStore, write_store
+    from universe import load_universe, wacc_cash
+
+    tickers = load_universe()["tickers"]
+    directory = None
+    if len(sys.argv) > 1:
+        store = FundamentalsStore(sys.argv[1])
+        source = f"history in {sys.argv[1]}"
+    else:
+        # Without a store, build one with ten synthetic year-end FCF snapshots
+        # per ticker ending at today's FCF. These are made up, not history,
+        # and every output says so.
+        source = "SYNTHETIC history (made up; pass a fundamentals store path for real history)"
+        rng = np.random.default_rng(0)
+        current_fcf = load_universe(tickers)["current_fcf"]
+        levels = np.exp(np.cumsum(rng.normal(0.08, 0.12, (len(tickers), 10)), axis=1))
+        fcf = current_fcf[:, None] * levels / levels[:, -1:]
+        records = [(ticker, f"{2015 + year}-12-31", {"current_fcf": float(fcf[i, year])})
+                   for i, ticker in enumerate(tickers) for year in range(fcf.shape[1])]
+        directory = tempfile.mkdtemp()
+        write_store(directory, records, fields=("current_fcf",))
+        store = FundamentalsStore(directory)
+
+    histories = {ticker: historical_growth(annual_series_from_store(store, ticker))
+                 for ticker in tickers if ticker in store.ticker_index}
+    usable = [ticker for ticker, history in histories.items() if np.isfinite(history).any()]
+    if not usable:
+        sys.exit(f"Bootstrapping needs at least two years of positive FCF per ticker; the store has "
+                 f"{len(store.dates)} snapshot date(s). Run without arguments for a synthetic multi-year store.")
+    if len(usable) < len(histories):
+        print(f"Skipping {', '.join(sorted(set(histories) - set(usable)))}: fewer than two years of positive FCF")
+    universe = load_universe(usable)
+    histories = [histories[ticker] for ticker in usable]
+
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    start = time.perf_counter()
+    result = bootstrap_valuation(universe["current_fcf"], histories, universe["terminal_growth"][:, 1], wacc,
+                                 universe["initial_shares"], universe["buyback_rate"],
+                                 universe["debt"] - universe["cash"], fade_to=universe["terminal_growth"][:, 1])
+    elapsed = time.perf_counter() - start
+
+    print(f"Bootstrapped from {source}")
+    synthetic = " (synthetic)" if directory is not None else ""
+    headers = [f"Ticker{synthetic}", f"Years of History{synthetic}", "5th Pct", "Median", "95th Pct"]
+    table = [
+        [ticker, np.isfinite(histories[i]).sum()] + [f"${v:.2f}" for v in result["price_per_share"][i]]
+        for i, ticker in enumerate(universe["tickers"])
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"{result['growth_paths'].shape[1]} paths per ticker for {len(histories)} tickers in {elapsed:.2f}s"
+          f"{synthetic}")
+    if directory is not None:
+        shutil.rmtree(directory)
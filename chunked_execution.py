@@ -0,0 +1,206 @@
+import time
+import tracemalloc
+
+import numpy as np
+from tabulate import tabulate
+
+# run_scenarios over more paths than fit in memory. plan_execution() sizes
+# chunks so the working set (projections, discount factors, suffix values,
+# share counts, per-year prices) fits a memory budget; run_scenarios_chunked()
+# allocates those working buffers once and fills them in place chunk after
+# chunk, writing results into preallocated output arrays (which may be
+# np.memmap files for per-year prices). Peak memory is then the budget plus
+# the outputs, whatever the number of paths.
+
+OUTPUTS = ("ev", "equity_value", "final_price_per_share", "price_to_fcf", "yearly_share_prices")
+
+# (paths, years) working buffers: fcf projections, discount factors, suffix values / prices, share counts
+WORKING_BUFFERS = 4
+# (paths,) working vectors: 1 + rate, net debt, terminal value, ...
+WORKING_VECTORS = 6
+
+
+def plan_execution(n_paths, years, memory_budget, output_columns=4):
+    """
+    Chunk size for a sweep of n_paths paths of `years` projections.
+
+    Parameters:
+    n_paths (int): Total number of paths
+    years (int): Projection years per path (growth rates + 1)
+    memory_budget (int): Bytes available for working buffers and in-memory outputs
+    output_columns (int): float64 output values kept in memory per path
+        (1 per scalar output, years for per-year prices; memmapped outputs don't count)
+
+    Returns:
+    dict: chunk_size, n_chunks, working_bytes, output_bytes, peak_bytes
+    """
+    output_bytes = n_paths * output_columns * 8
+    bytes_per_path = (WORKING_BUFFERS * years + WORKING_VECTORS) * 8
+    available = memory_budget - output_bytes
+    if available < bytes_per_path:
+        raise MemoryError(f"Outputs alone need {output_bytes / 2**20:.1f} MiB of a "
+                          f"{memory_budget / 2**20:.1f} MiB budget; pass np.memmap outputs in out=")
+    chunk_size = int(min(n_paths, available // bytes_per_path))
+    return {
+        "chunk_size": chunk_size,
+        "n_chunks": -(-n_paths // chunk_size),
+        "working_bytes": chunk_size * bytes_per_path,
+        "output_bytes": output_bytes,
+        "peak_bytes": chunk_size * bytes_per_path + output_bytes
+    }
+
+
+def _rows(values, start, stop):
+    """Chunk of a (paths,) input; scalars and single values pass through unchanged."""
+    values = np.asarray(values) if not isinstance(values, np.ndarray) else values
+    return values[start:stop] if values.ndim and values.shape[0] > 1 else values
+
+
+def _growth_rows(growth_rates, start, stop):
+    """Chunk of (paths, years - 1) growth paths; a shared (years - 1,) path passes through unchanged."""
+    return growth_rates[start:stop] if growth_rates.ndim == 2 and growth_rates.shape[0] > 1 else growth_rates
+
+
+def run_scenarios_chunked(initial_fcf, growth_rates, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                          net_debt, memory_budget=64 * 2**20, outputs=OUTPUTS[:4], out=None, per_share_scale=1000):
+    """
+    run_scenarios for a flat batch of paths, in budget-sized chunks.
+
+    Parameters:
+    initial_fcf, terminal_growth, discount_rate, initial_shares, buyback_rate, net_debt
+        (array): Scalars or (paths,) arrays (np.memmap works)
+    growth_rates (array): (paths, years - 1) or one shared (years - 1,) path
+    memory_budget (int): Bytes for working buffers and in-memory outputs
+    outputs (tuple): Which of OUTPUTS to return
+    out (dict): Optional preallocated output arrays by name, (paths,) or
+        (paths, years) for yearly_share_prices; np.memmap outputs keep large
+        results on disk and are not counted against the budget
+
+    Returns:
+    dict: The requested run_scenarios outputs and the "plan" used
+    """
+    growth_rates = growth_rates if isinstance(growth_rates, np.ndarray) else np.asarray(growth_rates, dtype=float)
+    years = growth_rates.shape[-1] + 1
+    per_path = (initial_fcf, terminal_growth, discount_rate, initial_shares, buyback_rate, net_debt)
+    n_paths = max([np.shape(x)[0] for x in per_path if np.ndim(x)] + [growth_rates.shape[0]
+                                                                       if growth_rates.ndim == 2 else 1])
+    unknown = set(outputs) - set(OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown outputs: {sorted(unknown)}")
+    out = dict(out or {})
+    columns = sum(years if name == "yearly_share_prices" else 1
+                  for name in outputs if not isinstance(out.get(name), np.memmap))
+    plan = plan_execution(n_paths, years, memory_budget, columns)
+    chunk = plan["chunk_size"]
+    for name in outputs:
+        if name not in out:
+            out[name] = np.empty((n_paths, years) if name == "yearly_share_prices" else n_paths)
+    fcf = np.empty((chunk, years))
+    factors = np.empty((chunk, years))
+    values = np.empty((chunk, years))
+    shares = np.empty((chunk, years))
+    exponents = np.arange(years, dtype=float)
+
+    for start in range(0, n_paths, chunk):
+        stop = min(start + chunk, n_paths)
+        n = stop - start
+        f, pv, v, s = fcf[:n], factors[:n], values[:n], shares[:n]
+        rate = np.broadcast_to(_rows(discount_rate, start, stop), (n,))[:, None]
+        terminal = 1 + np.broadcast_to(_rows(terminal_growth, start, stop), (n,))
+        debt = np.broadcast_to(_rows(net_debt, start, stop), (n,))
+
+        # FCF projections: initial_fcf * cumprod([1, 1 + g1, 1 + g2, ...])
+        f[:, 0] = 1
+        np.add(_growth_rows(growth_rates, start, stop), 1, out=f[:, 1:])
+        np.cumprod(f, axis=1, out=f)
+        f *= np.broadcast_to(_rows(initial_fcf, start, stop), (n,))[:, None]
+
+        # Discount factors (1 + r)^-t, t = 1..years
+        np.power(1 + rate, -(exponents + 1), out=pv)
+
+        # Suffix values: reverse cumulative sum of discounted FCF plus discounted terminal value
+        np.multiply(f, pv, out=s)
+        np.cumsum(s[:, ::-1], axis=1, out=v[:, ::-1])
+        v += (f[:, -1] * terminal / (rate[:, 0] - terminal + 1) * pv[:, -1])[:, None]
+        # Re-base each suffix so its first year is discounted one period: / (pv * (1 + r))
+        v /= pv
+        v /= 1 + rate
+        ev = v[:, 0].copy()
+
+        # Share counts, then per-year prices in place of the suffix values
+        np.power(1 - np.broadcast_to(_rows(buyback_rate, start, stop), (n,))[:, None], exponents, out=s)
+        s *= np.broadcast_to(_rows(initial_shares, start, stop), (n,))[:, None]
+        v -= debt[:, None]
+        v *= per_share_scale
+        v /= s
+
+        chunk_outputs = {
+            "ev": lambda: ev,
+            "equity_value": lambda: ev - debt,
+            "final_price_per_share": lambda: v[:, -1],
+            "price_to_fcf": lambda: v[:, -1] / (f[:, -1] * per_share_scale / s[:, -1]),
+            "yearly_share_prices": lambda: v
+        }
+        for name in outputs:
+            out[name][start:stop] = chunk_outputs[name]()
+
+    result = {name: out[name] for name in outputs}
+    result["plan"] = plan
+    return result
+
+
+# Example usage:
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc, run_scenarios
+
+    universe = load_universe(["MSFT"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+    net_debt = universe["debt"][0] - universe["cash"][0]
+    base_growth = universe["growth"][0, 1]
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for n_paths in (100000, 1000000):
+        growth = base_growth + rng.normal(0, 0.02, (n_paths, base_growth.shape[0]))
+        rates = wacc + rng.normal(0, 0.005, n_paths)
+        args = (universe["initial_fcf"][0, 1], growth, universe["terminal_growth"][0, 1], rates,
+                universe["initial_shares"][0], universe["buyback_rate"][0], net_debt)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        full = run_scenarios(*args)
+        full_time = time.perf_counter() - start
+        _, full_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del full
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Per-year prices for every path go to disk; scalars stay in memory
+            yearly = np.lib.format.open_memmap(os.path.join(directory, "prices.npy"), mode="w+",
+                                               shape=(n_paths, base_growth.shape[0] + 1))
+            tracemalloc.start()
+            start = time.perf_counter()
+            chunked = run_scenarios_chunked(*args, memory_budget=32 * 2**20,
+                                            outputs=("equity_value", "final_price_per_share", "yearly_share_prices"),
+                                            out={"yearly_share_prices": yearly})
+            chunked_time = time.perf_counter() - start
+            _, chunked_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            check = run_scenarios(*[a[:1000] if np.ndim(a) else a for a in args])
+            error = max(np.max(np.abs(chunked["yearly_share_prices"][:1000] / check["yearly_share_prices"] - 1)),
+                        np.max(np.abs(chunked["equity_value"][:1000] / check["equity_value"] - 1)))
+            plan = chunked["plan"]
+            del yearly, chunked
+
+        rows.append([f"{n_paths:,}", f"{full_peak / 2**20:.1f} MiB", f"{full_time:.2f}s",
+                     f"{chunked_peak / 2**20:.1f} MiB", f"{chunked_time:.2f}s", f"{error:.1e}"])
+        rows[-1] += [plan["chunk_size"], f"{plan['peak_bytes'] / 2**20:.1f} MiB"]
+
+    print(tabulate(rows, ["Paths", "run_scenarios Peak", "Time", "Chunked Peak (32 MiB budget)", "Time",
+                          "Max Rel. Diff", "Chunk", "Planned Peak"], tablefmt="grid"))
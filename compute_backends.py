@@ -0,0 +1,403 @@
+import json
+import platform
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import calculate_fcf
+from valuation_core import dcf_valuation as numpy_dcf_valuation
+from valuation_core import yearly_dcf_valuations as numpy_yearly_dcf_valuations
+
+try:
+    import numba
+except ImportError:  # optional: the JIT backend is only registered when numba is installed
+    numba = None
+
+# The DCF kernels behind interchangeable backends. A single three-scenario
+# run spends more time in NumPy call overhead than in arithmetic, while
+# million-path sweeps pay for the temporaries NumPy allocates (projections,
+# discount factors, products). So:
+#
+#   python  plain loops over lists; lowest overhead for a handful of aligned
+#           paths (inputs needing broadcasting are broadcast by NumPy first)
+#   numpy   valuation_core; good for medium batches
+#   numba   fused, parallel compiled loop, no temporaries (optional)
+#
+# select_backend() picks one by the number of paths. Every backend computes
+# the same quantities, broadcasts like NumPy and returns arrays;
+# cross_check() compares them over aligned, scalar and broadcast inputs.
+# valuation_core.run_scenarios values its yearly EVs on the selected
+# backend (a three-scenario MSFT run went from ~66us to ~54us; 200,000
+# paths from ~123ms to ~54ms). The numba kernels are cached on disk, so
+# only the first large run on a machine pays the JIT compile.
+# Numbers recorded with record_benchmarks() (growth_valuation, 10-year
+# paths, microseconds per call):
+#
+#   paths       python      numpy      numba
+#   1              5.2       29.4       38.8
+#   3              8.9       30.2       38.4
+#   100          203.2       49.7       38.7
+#   10,000     20508.7     4045.5      267.8
+#   1,000,000        -   348150.0    23172.6
+#
+# (Linux x86_64, 1 CPU, CPython 3.11, NumPy 2.4, numba 0.68, after JIT
+# warm-up.) The numba call carries ~35us of fixed cost, so NumPy stays the
+# choice between the two thresholds below.
+
+PYTHON_MAX_PATHS = 16
+NUMPY_MAX_PATHS = 64
+
+
+class Backend:
+    """
+    Named kernels: dcf_valuation(fcf, tg, r), growth_valuation(fcf0, growth, tg, r)
+    and yearly_dcf_valuations(fcf, tg, r).
+    """
+
+    def __init__(self, name, dcf_valuation, growth_valuation, yearly_dcf_valuations):
+        self.name = name
+        self.dcf_valuation = dcf_valuation
+        self.growth_valuation = growth_valuation
+        self.yearly_dcf_valuations = yearly_dcf_valuations
+
+    def __repr__(self):
+        return f"Backend({self.name!r})"
+
+
+def _flatten(paths, *per_path):
+    """Broadcast per-path inputs against the leading dims of paths and flatten to 1-D / 2-D."""
+    paths = np.asarray(paths, dtype=float)
+    shape = np.broadcast_shapes(paths.shape[:-1], *[np.shape(x) for x in per_path])
+    paths = np.ascontiguousarray(np.broadcast_to(paths, shape + paths.shape[-1:])).reshape(-1, paths.shape[-1])
+    flat = [np.ascontiguousarray(np.broadcast_to(np.asarray(x, dtype=float), shape)).ravel() for x in per_path]
+    return shape, paths, flat
+
+
+def _aligned_rows(paths, *per_path):
+    """
+    Plain lists for the python loops when the inputs are already aligned
+    (one path, or n paths with scalars or n values per path); None when
+    NumPy broadcasting is needed.
+    """
+    paths = paths.tolist() if isinstance(paths, np.ndarray) else paths
+    single = not (paths and isinstance(paths[0], (list, tuple)))
+    rows = [paths] if single else paths
+    if not single and rows[0] and isinstance(rows[0][0], (list, tuple)):
+        return None
+    columns = []
+    for values in per_path:
+        values = values.tolist() if isinstance(values, np.ndarray) else values
+        if isinstance(values, (list, tuple)):
+            if single or len(values) != len(rows) or (values and isinstance(values[0], (list, tuple))):
+                return None
+            columns.append(values)
+        else:
+            columns.append([values] * len(rows))
+    return single, rows, columns
+
+
+def _python_result(values, single, shape):
+    if shape is not None:
+        return np.array(values).reshape(shape)
+    return np.array(values[0] if single else values)
+
+
+def _python_dcf_valuation(fcf_projections, terminal_growth, discount_rate):
+    aligned = _aligned_rows(fcf_projections, terminal_growth, discount_rate)
+    if aligned is None:
+        shape, fcf, (tg, r) = _flatten(fcf_projections, terminal_growth, discount_rate)
+        single, rows, (growths, rates) = False, fcf.tolist(), (tg.tolist(), r.tolist())
+    else:
+        shape, (single, rows, (growths, rates)) = None, aligned
+    values = []
+    for path, g, rate in zip(rows, growths, rates):
+        factor = 1.0
+        total = 0.0
+        for value in path:
+            factor /= 1 + rate
+            total += value * factor
+        values.append(total + path[-1] * (1 + g) / (rate - g) * factor)
+    return _python_result(values, single, shape)
+
+
+def _python_growth_valuation(initial_fcf, growth_rates, terminal_growth, discount_rate):
+    aligned = _aligned_rows(growth_rates, initial_fcf, terminal_growth, discount_rate)
+    if aligned is None:
+        shape, growth, (fcf0, tg, r) = _flatten(growth_rates, initial_fcf, terminal_growth, discount_rate)
+        single, rows, (starts, growths, rates) = False, growth.tolist(), (fcf0.tolist(), tg.tolist(), r.tolist())
+    else:
+        shape, (single, rows, (starts, growths, rates)) = None, aligned
+    values = []
+    for path, fcf, g, rate in zip(rows, starts, growths, rates):
+        factor = 1 / (1 + rate)
+        total = fcf * factor
+        for growth_rate in path:
+            fcf *= 1 + growth_rate
+            factor /= 1 + rate
+            total += fcf * factor
+        values.append(total + fcf * (1 + g) / (rate - g) * factor)
+    return _python_result(values, single, shape)
+
+
+def _python_yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate):
+    aligned = _aligned_rows(fcf_projections, terminal_growth, discount_rate)
+    if aligned is None:
+        shape, fcf, (tg, r) = _flatten(fcf_projections, terminal_growth, discount_rate)
+        single, rows, (growths, rates) = False, fcf.tolist(), (tg.tolist(), r.tolist())
+        shape = shape + fcf.shape[-1:]
+    else:
+        shape, (single, rows, (growths, rates)) = None, aligned
+    values = []
+    for path, g, rate in zip(rows, growths, rates):
+        # Back from the terminal value: each suffix is this year's FCF plus the next suffix, discounted a period
+        value = path[-1] * (1 + g) / (rate - g)
+        suffixes = []
+        for fcf in reversed(path):
+            value = (value + fcf) / (1 + rate)
+            suffixes.append(value)
+        values.append(suffixes[::-1])
+    return _python_result(values, single, shape)
+
+
+def _numpy_growth_valuation(initial_fcf, growth_rates, terminal_growth, discount_rate):
+    return numpy_dcf_valuation(calculate_fcf(initial_fcf, growth_rates), terminal_growth, discount_rate)
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=False, cache=True)
+    def _numba_dcf_kernel(fcf, terminal_growth, discount_rate):
+        out = np.empty(fcf.shape[0])
+        for i in numba.prange(fcf.shape[0]):
+            r = discount_rate[i]
+            factor = 1.0
+            total = 0.0
+            for j in range(fcf.shape[1]):
+                factor /= 1 + r
+                total += fcf[i, j] * factor
+            g = terminal_growth[i]
+            out[i] = total + fcf[i, -1] * (1 + g) / (r - g) * factor
+        return out
+
+    @numba.njit(parallel=True, fastmath=False, cache=True)
+    def _numba_growth_kernel(initial_fcf, growth, terminal_growth, discount_rate):
+        out = np.empty(growth.shape[0])
+        for i in numba.prange(growth.shape[0]):
+            r = discount_rate[i]
+            fcf = initial_fcf[i]
+            factor = 1 / (1 + r)
+            total = fcf * factor
+            for j in range(growth.shape[1]):
+                fcf *= 1 + growth[i, j]
+                factor /= 1 + r
+                total += fcf * factor
+            g = terminal_growth[i]
+            out[i] = total + fcf * (1 + g) / (r - g) * factor
+        return out
+
+    # Serial: run_scenarios calls this from scripts that fork worker pools
+    # afterwards, and numba's parallel thread pool does not survive a fork
+    @numba.njit(fastmath=False, cache=True)
+    def _numba_yearly_kernel(fcf, terminal_growth, discount_rate):
+        out = np.empty(fcf.shape)
+        years = fcf.shape[1]
+        for i in range(fcf.shape[0]):
+            r = discount_rate[i]
+            g = terminal_growth[i]
+            value = fcf[i, years - 1] * (1 + g) / (r - g)
+            for j in range(years - 1, -1, -1):
+                value = (value + fcf[i, j]) / (1 + r)
+                out[i, j] = value
+        return out
+
+    def _numba_dcf_valuation(fcf_projections, terminal_growth, discount_rate):
+        shape, fcf, (tg, r) = _flatten(fcf_projections, terminal_growth, discount_rate)
+        return _numba_dcf_kernel(fcf, tg, r).reshape(shape)
+
+    def _numba_growth_valuation(initial_fcf, growth_rates, terminal_growth, discount_rate):
+        shape, growth, (fcf0, tg, r) = _flatten(growth_rates, initial_fcf, terminal_growth, discount_rate)
+        return _numba_growth_kernel(fcf0, growth, tg, r).reshape(shape)
+
+    def _numba_yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate):
+        shape, fcf, (tg, r) = _flatten(fcf_projections, terminal_growth, discount_rate)
+        return _numba_yearly_kernel(fcf, tg, r).reshape(shape + fcf.shape[-1:])
+
+
+BACKENDS = {
+    "python": Backend("python", _python_dcf_valuation, _python_growth_valuation, _python_yearly_dcf_valuations),
+    "numpy": Backend("numpy", numpy_dcf_valuation, _numpy_growth_valuation, numpy_yearly_dcf_valuations),
+}
+if numba is not None:
+    BACKENDS["numba"] = Backend("numba", _numba_dcf_valuation, _numba_growth_valuation, _numba_yearly_dcf_valuations)
+
+
+def batch_paths(paths):
+    """Number of paths in an array or (nested) list whose last axis is years."""
+    if isinstance(paths, np.ndarray):
+        return paths.size // max(paths.shape[-1], 1) if paths.ndim else 1
+    return len(paths) if paths and isinstance(paths[0], (list, tuple)) else 1
+
+
+def select_backend(n_paths):
+    if n_paths <= PYTHON_MAX_PATHS:
+        return BACKENDS["python"]
+    if n_paths <= NUMPY_MAX_PATHS or "numba" not in BACKENDS:
+        return BACKENDS["numpy"]
+    return BACKENDS["numba"]
+
+
+def _resolve(backend, paths):
+    if backend == "auto":
+        return select_backend(batch_paths(paths))
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; available: {sorted(BACKENDS)}")
+    return BACKENDS[backend]
+
+
+def dcf_valuation(fcf_projections, terminal_growth, discount_rate, backend="auto"):
+    """
+    valuation_core.dcf_valuation on the chosen backend ("auto" picks by path count).
+    Every backend broadcasts like NumPy and returns an array.
+    """
+    return np.asarray(_resolve(backend, fcf_projections).dcf_valuation(fcf_projections, terminal_growth,
+                                                                       discount_rate))
+
+
+def growth_valuation(initial_fcf, growth_rates, terminal_growth, discount_rate, backend="auto"):
+    """EV of dcf_valuation(calculate_fcf(initial_fcf, growth_rates), ...) without materializing the projections."""
+    return np.asarray(_resolve(backend, growth_rates).growth_valuation(initial_fcf, growth_rates, terminal_growth,
+                                                                       discount_rate))
+
+
+def yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate, backend="auto"):
+    """valuation_core.yearly_dcf_valuations (Gordon terminal value) on the chosen backend."""
+    return np.asarray(_resolve(backend, fcf_projections).yearly_dcf_valuations(fcf_projections, terminal_growth,
+                                                                               discount_rate))
+
+
+def _random_inputs(n_paths, years=10, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(1, 100, n_paths), rng.uniform(-0.1, 0.4, (n_paths, years)),
+            rng.uniform(0.01, 0.04, n_paths), rng.uniform(0.07, 0.14, n_paths))
+
+
+def _check_cases(n_paths, years):
+    """Aligned, scalar and broadcast argument sets: (name, initial_fcf, growth, terminal_growth, discount_rate)."""
+    initial_fcf, growth, terminal_growth, discount_rate = _random_inputs(n_paths, years)
+    return [
+        ("aligned", initial_fcf, growth, terminal_growth, discount_rate),
+        ("scalar", float(initial_fcf[0]), growth[0].tolist(), float(terminal_growth[0]), float(discount_rate[0])),
+        # One path under three terminal growth rates, as in the scripts' scenarios
+        ("broadcast", 10.0, [0.1, 0.1], [0.02, 0.03, 0.04], 0.09),
+        # Paths x rates grid: (4, 1, years) growth against (3,) discount rates
+        ("grid", initial_fcf[:4, None], growth[:4, None], terminal_growth[:4, None], discount_rate[:3]),
+    ]
+
+
+def cross_check(n_paths=1000, years=10, rtol=1e-12):
+    """
+    Value the same random inputs on every backend and compare with NumPy, for
+    aligned, scalar and broadcast argument shapes. The loops accumulate
+    discount factors by division rather than powers, so results agree to
+    rounding, not bit for bit.
+
+    Returns:
+    dict: backend name -> max relative difference versus numpy, per kernel
+    """
+    report = {name: {"dcf_valuation": 0.0, "growth_valuation": 0.0, "yearly_dcf_valuations": 0.0}
+              for name in BACKENDS}
+    for case, initial_fcf, growth, terminal_growth, discount_rate in _check_cases(n_paths, years):
+        fcf_projections = calculate_fcf(initial_fcf, growth)
+        reference = {
+            "dcf_valuation": numpy_dcf_valuation(fcf_projections, terminal_growth, discount_rate),
+            "growth_valuation": _numpy_growth_valuation(initial_fcf, growth, terminal_growth, discount_rate),
+            "yearly_dcf_valuations": numpy_yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate),
+        }
+        for name in BACKENDS:
+            results = {
+                "dcf_valuation": dcf_valuation(fcf_projections, terminal_growth, discount_rate, backend=name),
+                "growth_valuation": growth_valuation(initial_fcf, growth, terminal_growth, discount_rate,
+                                                     backend=name),
+                "yearly_dcf_valuations": yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate,
+                                                               backend=name),
+            }
+            for kernel, values in results.items():
+                if values.shape != np.shape(reference[kernel]):
+                    raise AssertionError(f"{name}.{kernel} ({case}) returned shape {values.shape}, "
+                                         f"numpy {np.shape(reference[kernel])}")
+                difference = np.max(np.abs(values / reference[kernel] - 1))
+                if difference > rtol:
+                    raise AssertionError(f"{name}.{kernel} ({case}) differs from numpy by {difference:.3e}")
+                report[name][kernel] = max(report[name][kernel], float(difference))
+    return report
+
+
+def benchmark(sizes=(1, 3, 100, 10000, 1000000), years=10, repeat=5, python_max=10000):
+    """Best-of-repeat microseconds per growth_valuation call, per backend and path count."""
+    results = {}
+    for n_paths in sizes:
+        initial_fcf, growth, terminal_growth, discount_rate = _random_inputs(n_paths, years)
+        if n_paths == 1:
+            initial_fcf, growth, terminal_growth, discount_rate = (initial_fcf[0], growth[0], terminal_growth[0],
+                                                                   discount_rate[0])
+        results[n_paths] = {}
+        for name, backend in BACKENDS.items():
+            if name == "python" and n_paths > python_max:
+                results[n_paths][name] = None
+                continue
+            # Small inputs arrive as lists for the python backend, as in the scripts
+            args = (initial_fcf, growth, terminal_growth, discount_rate)
+            if name == "python":
+                args = tuple(np.asarray(a).tolist() for a in args)
+            backend.growth_valuation(*args)  # warm-up (JIT compilation)
+            loops = max(1, int(2000 / n_paths))
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    backend.growth_valuation(*args)
+                best = min(best, (time.perf_counter() - start) / loops)
+            results[n_paths][name] = best * 1e6
+    return results
+
+
+def record_benchmarks(path="compute_backends_benchmarks.json", **options):
+    """Run benchmark() and save it with the machine and library versions."""
+    record = {
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba.__version__ if numba is not None else None,
+        "microseconds_per_call": benchmark(**options),
+    }
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+    return record
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe(["MSFT"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+    # One ticker's three scenarios: dispatched to the python backend
+    scenarios = (universe["initial_fcf"][0].tolist(), universe["growth"][0].tolist(),
+                 universe["terminal_growth"][0].tolist(), wacc)
+    print(f"MSFT scenario EVs ({select_backend(3).name}):",
+          [f"{v:.1f}" for v in growth_valuation(*scenarios)])
+
+    print("Cross-check (max relative difference vs numpy):")
+    print(tabulate([[name] + [f"{v:.1e}" for v in kernels.values()] for name, kernels in cross_check().items()],
+                   ["Backend", "dcf_valuation", "growth_valuation", "yearly_dcf_valuations"], tablefmt="grid"))
+
+    results = benchmark()
+    names = list(BACKENDS)
+    table = [[f"{n:,}"] + [f"{r[name]:.1f}" if r[name] is not None else "-" for name in names]
+             + [select_backend(n).name] for n, r in results.items()]
+    print("Microseconds per growth_valuation call:")
+    print(tabulate(table, ["Paths"] + names + ["auto"], tablefmt="grid"))
@@ -0,0 +1,103 @@
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import SCENARIOS, calculate_fcf, calculate_wacc, dcf_valuation
+
+
+def solve_consistent_wacc(fcf_projections, terminal_growth, risk_free_rate, market_return, beta, market_cap,
+                          debt, cash, tax_rate=0.21, cost_of_debt=0.04, tolerance=1e-10, max_iterations=50,
+                          wacc_cash=None):
+    """
+    Solve for the WACC whose equity weight uses the DCF equity value it produces.
+
+    calculate_wacc weights equity by market_cap, but the DCF then implies a
+    different equity value. This iterates wacc -> DCF equity value -> wacc
+    to a fixed point for every element of the batch at once. Each sweep
+    evaluates the map twice and takes a Steffensen (Aitken delta-squared)
+    step, falling back to the plain iterate where the step is unusable.
+
+    Parameters:
+    fcf_projections (array): FCF projections, years on the last axis
+    terminal_growth (array): Terminal growth rate per path
+    risk_free_rate, market_return, beta, debt, cash (array): calculate_wacc inputs
+    market_cap (array): Starting equity value (the market-cap weighted WACC)
+    wacc_cash (array): Cash netted out of the WACC capital weights; defaults
+        to cash (net debt always subtracts all of the cash)
+    tolerance (float): Convergence tolerance on the WACC
+    max_iterations (int): Maximum number of vectorized sweeps
+
+    Returns:
+    dict: wacc, equity_value, iterations (sweeps per element), converged
+    """
+    fcf_projections = np.asarray(fcf_projections, dtype=float)
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
+    net_debt = np.subtract(debt, cash)
+    wacc_cash = cash if wacc_cash is None else wacc_cash
+
+    def implied_wacc(wacc):
+        equity_value = dcf_valuation(fcf_projections, terminal_growth, wacc) - net_debt
+        return calculate_wacc(risk_free_rate, market_return, beta, equity_value, debt, wacc_cash, tax_rate,
+                              cost_of_debt)
+
+    shape = np.broadcast_shapes(fcf_projections.shape[:-1], terminal_growth.shape, np.shape(market_cap),
+                                np.shape(beta), np.shape(risk_free_rate), np.shape(net_debt))
+    wacc = np.broadcast_to(
+        calculate_wacc(risk_free_rate, market_return, beta, market_cap, debt, wacc_cash, tax_rate, cost_of_debt),
+        shape).astype(float)
+    iterations = np.zeros(shape, dtype=int)
+    converged = np.zeros(shape, dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(max_iterations):
+            active = ~converged
+            if not active.any():
+                break
+            x1 = implied_wacc(wacc)
+            x2 = implied_wacc(x1)
+            denominator = x2 - 2 * x1 + wacc
+            accelerated = wacc - (x1 - wacc) ** 2 / denominator
+            usable = np.isfinite(accelerated) & (np.abs(denominator) > 1e-15) & (accelerated > terminal_growth)
+            step = np.where(usable, accelerated, x2)
+            step = np.where(np.isfinite(step), step, wacc)
+
+            done = np.abs(step - wacc) < tolerance
+            iterations = np.where(active, iterations + 1, iterations)
+            wacc = np.where(active, step, wacc)
+            converged = converged | (active & done)
+
+    equity_value = dcf_valuation(fcf_projections, terminal_growth, wacc) - net_debt
+    return {
+        "wacc": wacc,
+        "equity_value": equity_value,
+        "iterations": iterations,
+        "converged": converged
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+
+    universe = load_universe()
+    fcf_projections = calculate_fcf(universe["initial_fcf"], universe["growth"])
+    market_wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                                 universe["market_cap"], universe["debt"], wacc_cash(universe),
+                                 cost_of_debt=universe["cost_of_debt"])
+    result = solve_consistent_wacc(
+        fcf_projections, universe["terminal_growth"],
+        universe["risk_free_rate"][:, None], universe["market_return"][:, None], universe["beta"][:, None],
+        universe["market_cap"][:, None], universe["debt"][:, None], universe["cash"][:, None],
+        cost_of_debt=universe["cost_of_debt"][:, None], wacc_cash=wacc_cash(universe)[:, None]
+    )
+
+    headers = ["Ticker", "Market-Cap WACC"] + [f"{name} WACC (iters)" for name in SCENARIOS]
+    table = []
+    for i, ticker in enumerate(universe["tickers"]):
+        row = [ticker, f"{market_wacc[i]:.2%}"]
+        for s in range(len(SCENARIOS)):
+            flag = "" if result["converged"][i, s] else " !"
+            row.append(f"{result['wacc'][i, s]:.2%} ({result['iterations'][i, s]}){flag}")
+        table.append(row)
+
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"Sweeps for the whole universe: {result['iterations'].max()}")
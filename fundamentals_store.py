@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+# Point-in-time fundamentals on disk, one memory-mapped .npy column per field.
+#
+#   <path>/index.json   {"tickers": [...], "fields": [...]}
+#   <path>/dates.npy    sorted snapshot dates, datetime64[D]
+#   <path>/<field>.npy  float64 array of shape (dates, tickers)
+#
+# Values are carried forward when written, so the row for a date is the
+# as-of view of every ticker on that date and a cross-section is a single
+# contiguous row of each column: a zero-copy slice of the memory map.
+
+FIELDS = ("market_cap", "current_fcf", "cash", "debt", "initial_shares")
+
+
+def write_store(path, records, fields=FIELDS):
+    """
+    Build a store from (ticker, date, values) records.
+
+    values is a dict of field -> float; fields missing from a record keep
+    that ticker's previous value. Dates are ISO strings or datetime64.
+    """
+    record_dates = np.array([date for _, date, _ in records], dtype="datetime64[D]")
+    order = np.argsort(record_dates, kind="stable")
+    records = [records[i] for i in order]
+    record_dates = record_dates[order]
+    tickers = sorted({ticker for ticker, _, _ in records})
+    dates = np.unique(record_dates)
+    ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+    rows = np.searchsorted(dates, record_dates)
+    columns_of = np.array([ticker_index[ticker] for ticker, _, _ in records], dtype=int)
+
+    columns = {}
+    for field in fields:
+        values = np.array([record_values.get(field, np.nan) for _, _, record_values in records], dtype=float)
+        known = np.isfinite(values)
+        column = np.full((len(dates), len(tickers)), np.nan)
+        column[rows[known], columns_of[known]] = values[known]
+        columns[field] = column
+
+    os.makedirs(path, exist_ok=True)
+    for field, column in columns.items():
+        np.save(os.path.join(path, f"{field}.npy"), _carry_forward(column))
+    np.save(os.path.join(path, "dates.npy"), dates)
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump({"tickers": tickers, "fields": list(fields)}, f)
+
+
+def _carry_forward(column):
+    rows = np.arange(column.shape[0])[:, None]
+    last_seen = np.maximum.accumulate(np.where(np.isfinite(column), rows, -1), axis=0)
+    filled = column[np.maximum(last_seen, 0), np.arange(column.shape[1])]
+    return np.where(last_seen >= 0, filled, np.nan)
+
+
+class FundamentalsStore:
+    """Read-only, memory-mapped view of a store written by write_store."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        self.tickers = index["tickers"]
+        self.fields = index["fields"]
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(path, "dates.npy"))
+        self.columns = {
+            field: np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r") for field in self.fields
+        }
+
+    def row(self, as_of):
+        """Row index of the latest snapshot on or before as_of."""
+        row = np.searchsorted(self.dates, np.datetime64(as_of, "D"), side="right") - 1
+        if row < 0:
+            raise KeyError(f"No snapshot on or before {as_of}")
+        return row
+
+    def cross_section(self, as_of):
+        """Every ticker's fundamentals as of a date: field -> (tickers,) memmap view."""
+        row = self.row(as_of)
+        return {field: column[row] for field, column in self.columns.items()}
+
+    def snapshot(self, ticker, as_of):
+        row = self.row(as_of)
+        column = self.ticker_index[ticker]
+        return {field: float(values[row, column]) for field, values in self.columns.items()}
+
+    def history(self, ticker, field):
+        """(dates, values) for one ticker; values is a strided memmap view."""
+        return self.dates, self.columns[field][:, self.ticker_index[ticker]]
+
+    def panel(self, field, dates=None):
+        """Field values of shape (dates, tickers), as of each requested date."""
+        if dates is None:
+            return self.columns[field]
+        rows = np.searchsorted(self.dates, np.asarray(dates, dtype="datetime64[D]"), side="right") - 1
+        values = self.columns[field][np.maximum(rows, 0)]
+        return np.where((rows >= 0)[:, None], values, np.nan)
+
+    def as_universe(self, as_of, universe):
+        """Copy of a load_universe() dict with its fundamentals replaced by the as-of snapshot."""
+        row = self.row(as_of)
+        columns = [self.ticker_index.get(ticker) for ticker in universe["tickers"]]
+        updated = dict(universe)
+        for field, values in self.columns.items():
+            if field not in universe:
+                continue
+            current = np.array(universe[field], dtype=float)
+            for i, column in enumerate(columns):
+                if column is not None and np.isfinite(values[row, column]):
+                    current[i] = values[row, column]
+            updated[field] = current
+        if "initial_fcf" in universe:
+            # Scenario starting FCFs move with the snapshot's current FCF
+            ratio = updated["current_fcf"] / np.asarray(universe["current_fcf"], dtype=float)
+            updated["initial_fcf"] = universe["initial_fcf"] * ratio[:, None]
+        return updated
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe
+
+    # Seed a store with the inputs currently hard-coded in the ticker scripts
+    path = sys.argv[1] if len(sys.argv) > 1 else "fundamentals"
+    as_of = sys.argv[2] if len(sys.argv) > 2 else "2024-06-30"
+    universe = load_universe()
+    records = [
+        (ticker, as_of, {field: float(universe[field][i]) for field in FIELDS})
+        for i, ticker in enumerate(universe["tickers"])
+    ]
+    write_store(path, records)
+
+    store = FundamentalsStore(path)
+    section = store.cross_section(as_of)
+    print(f"Stored {len(store.tickers)} tickers x {len(store.dates)} dates in {path}")
+    for field in store.fields:
+        print(f"{field}: {np.asarray(section[field])}")
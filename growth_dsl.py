@@ -0,0 +1,193 @@
+import re
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_metrics import lru_cached
+
+# A small language for the hand-typed growth and margin fades, e.g.
+#
+#   "start 22% fade linearly to 11% by year 10"
+#   "start 37.7% exponential decay to 5% half-life 3y"
+#   "start 30% pin first 3 years; fade linearly to 8% by year 10"
+#   "pin first 3 years at 4.56%, 6.94%, 7.75%; rise linearly to 15% by year 10"
+#
+# Clauses may be separated by spaces, commas, semicolons, "and" or "then";
+# any other text is an error rather than being ignored.
+#
+# Every curve needs a level to start from: a start clause or pinned values.
+# A bare "exponential decay half-life 3y" is rejected, with a message saying
+# so. With pinned values the fade starts from the last pinned value, which
+# takes precedence over start. Half-lives must be positive.
+#
+# Any number may be a sweep written as {a, b, c}; the curve then compiles to
+# the full grid of parameter combinations and one call returns every path,
+# shape (combinations, years). Compiled curves are cached by their text, with
+# hits and misses recorded in valuation_metrics.REGISTRY.
+
+_NUMBER = r"(\{[^}]*\}|-?\d+(?:\.\d+)?%?)"
+_PATTERNS = {
+    "start": re.compile(r"(?:start|constant)\s+(?:at\s+)?" + _NUMBER),
+    "linear": re.compile(r"(?:fades?|rises?|moves?)\s+linearly\s+to\s+" + _NUMBER + r"\s+by\s+year\s+" + _NUMBER),
+    "exponential": re.compile(r"exponential(?:ly)?\s+(?:decay|fade)(?:\s+to\s+" + _NUMBER + r")?\s+half-life\s+"
+                              + _NUMBER + r"\s*y?"),
+    "pin": re.compile(r"pin\s+first\s+(\d+)\s+years?(?:\s+at\s+((?:-?\d+(?:\.\d+)?%?\s*,?\s*)+))?"),
+}
+# Allowed between clauses
+_SEPARATOR = re.compile(r"(?:[\s,;]+|\b(?:and|then)\b)+")
+
+
+def _parse_clauses(text):
+    """
+    Match every clause of the curve, requiring the grammar to consume the
+    whole text; leftover text raises ValueError naming it.
+    """
+    source = text.lower()
+    found = dict.fromkeys(_PATTERNS)
+    position = 0
+    while True:
+        separator = _SEPARATOR.match(source, position)
+        if separator:
+            position = separator.end()
+        if position >= len(source):
+            return found
+        for name, pattern in _PATTERNS.items():
+            match = pattern.match(source, position)
+            if match:
+                break
+        else:
+            raise ValueError(f"Could not parse growth curve {text!r} at {text[position:]!r}")
+        if found[name]:
+            raise ValueError(f"More than one {name} clause in growth curve")
+        found[name] = match
+        position = match.end()
+
+
+def _parse_number(token):
+    """A literal or {a, b, ...} sweep as a 1-D array; percentages become fractions."""
+    token = token.strip()
+    items = token[1:-1].split(",") if token.startswith("{") else [token]
+    values = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        values.append(float(item[:-1]) / 100 if item.endswith("%") else float(item))
+    if not values:
+        raise ValueError(f"Empty sweep: {token}")
+    return np.array(values)
+
+
+class GrowthCurve:
+    """A compiled growth/margin expression; call it with a horizon to get the paths."""
+
+    def __init__(self, text):
+        self.text = text
+        found = _parse_clauses(text)
+        if not any(found.values()):
+            raise ValueError(f"Could not parse growth curve: {text!r}")
+        if found["linear"] and found["exponential"]:
+            raise ValueError("A curve is either a linear or an exponential fade, not both")
+
+        self.pinned = np.zeros(0)
+        self.pin_years = 0
+        if found["pin"]:
+            self.pin_years = int(found["pin"].group(1))
+            if found["pin"].group(2):
+                self.pinned = np.concatenate([_parse_number(v) for v in found["pin"].group(2).split(",")
+                                              if v.strip()])
+                if len(self.pinned) != self.pin_years:
+                    raise ValueError(f"pin first {self.pin_years} years needs {self.pin_years} values")
+
+        sweeps = {}
+        if len(self.pinned):
+            # The fade continues from the last pinned year's value
+            sweeps["start"] = self.pinned[-1:]
+        elif found["start"]:
+            sweeps["start"] = _parse_number(found["start"].group(1))
+        else:
+            raise ValueError(f"Growth curve {text!r} needs a level to start from: add a start clause "
+                             f"(e.g. 'start 20% exponential decay half-life 3y') or pinned values")
+
+        self.shape = "constant"
+        if found["linear"]:
+            self.shape = "linear"
+            sweeps["end"] = _parse_number(found["linear"].group(1))
+            sweeps["by_year"] = _parse_number(found["linear"].group(2))
+        elif found["exponential"]:
+            self.shape = "exponential"
+            end = found["exponential"].group(1)
+            sweeps["end"] = _parse_number(end) if end else np.zeros(1)
+            sweeps["half_life"] = _parse_number(found["exponential"].group(2))
+            if np.any(sweeps["half_life"] <= 0):
+                raise ValueError(f"Half-life must be positive in growth curve {text!r}")
+
+        grids = np.meshgrid(*sweeps.values(), indexing="ij")
+        self.parameters = {name: grid.ravel() for name, grid in zip(sweeps, grids)}
+        self._paths = {}
+
+    def __len__(self):
+        return len(self.parameters["start"])
+
+    def __call__(self, years=10):
+        if years not in self._paths:
+            paths = self._generate(years)
+            paths.setflags(write=False)
+            self._paths[years] = paths
+        return self._paths[years]
+
+    def _generate(self, years):
+        p = {name: values[:, None] for name, values in self.parameters.items()}
+        t = np.arange(1, years + 1)
+        # The fade starts from the last pinned year (or year 1)
+        anchor = max(self.pin_years, 1)
+        if self.shape == "linear":
+            span = np.maximum(p["by_year"] - anchor, 1)
+            paths = p["start"] + (p["end"] - p["start"]) * np.clip((t - anchor) / span, 0, 1)
+        elif self.shape == "exponential":
+            paths = p["end"] + (p["start"] - p["end"]) * 0.5 ** (np.maximum(t - anchor, 0) / p["half_life"])
+        else:
+            paths = np.broadcast_to(p["start"], (len(self), years)).copy()
+
+        paths = np.array(np.broadcast_to(paths, (len(self), years)))
+        pinned = min(self.pin_years, years)
+        if len(self.pinned):
+            paths[:, :pinned] = self.pinned[:pinned]
+        elif pinned:
+            paths[:, :pinned] = p["start"]
+        return paths
+
+
+@lru_cached("compile_curve", maxsize=256)
+def compile_curve(text):
+    return GrowthCurve(text)
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import TICKERS
+    from valuation_core import calculate_wacc, run_scenarios
+
+    tost = TICKERS["TOST"]
+    wacc = calculate_wacc(tost["risk_free_rate"], tost["market_return"], tost["beta"], tost["market_cap"],
+                          tost["debt"], tost["cash"], cost_of_debt=tost["cost_of_debt"])
+
+    growth = compile_curve("start 22% fade linearly to {9%, 11%, 13%} by year {8, 10}")
+    margins = compile_curve("pin first 3 years at 4.56%, 6.94%, 7.75%; rise linearly to {11.5%, 15%, 16%} by year 10")
+    print("Base case growth (to 11% by year 10):", np.round(growth(10)[3], 4))
+    print("Base case margins (to 15% by year 10):", np.round(margins(10)[1], 4))
+
+    # Every growth fade against every margin fade, valued in one batch
+    growth_paths = growth(10)[:, None, :]
+    margin_paths = margins(10)[None, :, :]
+    result = run_scenarios(tost["current_revenue"], growth_paths, tost["terminal_growth"][1], wacc,
+                           tost["initial_shares"], tost["buyback_rate"], tost["debt"] - tost["cash"],
+                           fcf_margins=margin_paths)
+
+    headers = ["Growth Fade"] + [f"Margins to {m:.1%}" for m in margins.parameters["end"]]
+    table = [
+        [f"to {growth.parameters['end'][i]:.0%} by year {growth.parameters['by_year'][i]:.0f}"]
+        + [f"${v:.2f}" for v in result["yearly_share_prices"][i, :, 0]]
+        for i in range(len(growth))
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from universe import FIELDS
+from valuation_metrics import REGISTRY
+
+# Market inputs (market_cap, cash, debt, shares, beta, rates, FCF) fetched
+# from a data source instead of being copied into the scripts by hand.
+# Every provider deduplicates concurrent requests for the same ticker and
+# bounds concurrency; HTTPProvider reuses a small pool of keep-alive
+# connections and CachedProvider keeps quotes on disk for a TTL. Quotes use
+# the same units as universe.TICKERS (billions; shares in millions).
+#
+# StandInServer and FileProvider make the whole path testable offline.
+
+
+class MarketDataProvider:
+    """Base provider: subclasses implement _fetch(ticker) -> {field: value}."""
+
+    def __init__(self, concurrency=16):
+        self._semaphore = None
+        self.concurrency = concurrency
+        self._in_flight = {}
+        self.stats = {"requests": 0, "deduplicated": 0, "fetched": 0}
+
+    async def _fetch(self, ticker):
+        raise NotImplementedError
+
+    async def fetch(self, ticker):
+        self.stats["requests"] += 1
+        if ticker in self._in_flight:
+            self.stats["deduplicated"] += 1
+            return await asyncio.shield(self._in_flight[ticker])
+        task = asyncio.ensure_future(self._limited_fetch(ticker))
+        self._in_flight[ticker] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._in_flight.pop(ticker, None)
+
+    async def _limited_fetch(self, ticker):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self.stats["fetched"] += 1
+            quote = await self._fetch(ticker)
+        unknown = set(quote) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"{ticker}: unexpected fields {sorted(unknown)}")
+        return quote
+
+    async def fetch_many(self, tickers):
+        """Quotes for every ticker, fetched concurrently; duplicates share one fetch."""
+        quotes = await asyncio.gather(*[self.fetch(ticker) for ticker in tickers])
+        return dict(zip(tickers, quotes))
+
+    async def close(self):
+        pass
+
+
+class FileProvider(MarketDataProvider):
+    """Quotes from a JSON file {ticker: {field: value}}, re-read when it changes."""
+
+    def __init__(self, path, concurrency=16):
+        super().__init__(concurrency)
+        self.path = path
+        self._loaded = (None, {})
+
+    async def _fetch(self, ticker):
+        mtime = os.path.getmtime(self.path)
+        if self._loaded[0] != mtime:
+            with open(self.path) as f:
+                self._loaded = (mtime, json.load(f))
+        if ticker not in self._loaded[1]:
+            raise KeyError(f"No quote for {ticker} in {self.path}")
+        return dict(self._loaded[1][ticker])
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Connection closed by server")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+class HTTPProvider(MarketDataProvider):
+    """Quotes from GET {prefix}/{ticker} over a pool of keep-alive connections."""
+
+    def __init__(self, host, port, prefix="/quote", pool_size=8, concurrency=16):
+        super().__init__(concurrency)
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self._idle = []
+        self._open = 0
+        self._available = None
+        self.stats["connections"] = 0
+
+    async def _acquire(self):
+        """A (connection, reused) pair: an idle connection, or a new one while under pool_size."""
+        if self._available is None:
+            self._available = asyncio.Condition()
+        async with self._available:
+            while not self._idle and self._open >= self.pool_size:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop(), True
+            self._open += 1
+        self.stats["connections"] += 1
+        try:
+            return await asyncio.open_connection(self.host, self.port), False
+        except BaseException:
+            async with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+
+    async def _release(self, connection, reuse=True):
+        async with self._available:
+            if reuse:
+                self._idle.append(connection)
+            else:
+                self._open -= 1
+                connection[1].close()
+            self._available.notify()
+
+    async def _fetch(self, ticker):
+        # A reused keep-alive connection may have been closed by the server
+        # while idle; that EOF is retried once on a fresh connection
+        for attempt in range(2):
+            connection, reused = await self._acquire()
+            healthy = False
+            try:
+                reader, writer = connection
+                writer.write(f"GET {self.prefix}/{ticker} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+                await writer.drain()
+                status, payload = await _read_response(reader)
+                healthy = True
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if reused and attempt == 0:
+                    continue
+                raise
+            finally:
+                # Every path returns the slot; only a clean exchange keeps the connection
+                await self._release(connection, reuse=healthy)
+            break
+        if status != 200:
+            raise KeyError(f"{ticker}: HTTP {status} {payload.get('error', '')}")
+        return payload
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle, self._open = [], 0
+
+
+class CachedProvider(MarketDataProvider):
+    """On-disk TTL cache in front of another provider; one JSON file per ticker."""
+
+    def __init__(self, provider, cache_dir, ttl=900.0, concurrency=16):
+        super().__init__(concurrency)
+        self.provider = provider
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats["cache_hits"] = 0
+
+    def _path(self, ticker):
+        return os.path.join(self.cache_dir, f"{ticker}.json")
+
+    async def _fetch(self, ticker):
+        path = self._path(ticker)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if time.time() - entry["fetched_at"] < self.ttl:
+                self.stats["cache_hits"] += 1
+                REGISTRY.cache("market_data", hit=True)
+                return entry["quote"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+        REGISTRY.cache("market_data", hit=False)
+
+        quote = await self.provider.fetch(ticker)
+        # Write-then-rename so a concurrent reader never sees a partial file
+        fd, temporary = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"fetched_at": time.time(), "quote": quote}, f)
+        os.replace(temporary, path)
+        return quote
+
+    async def close(self):
+        await self.provider.close()
+
+
+def apply_quotes(universe, quotes):
+    """Copy of a load_universe() dict with the quoted fields replaced."""
+    filled = dict(universe)
+    for field in FIELDS:
+        if not any(field in quote for quote in quotes.values()):
+            continue
+        column = np.array(universe[field], dtype=float)
+        for i, ticker in enumerate(universe["tickers"]):
+            if field in quotes.get(ticker, {}):
+                column[i] = quotes[ticker][field]
+        filled[field] = column
+    if "current_fcf" in filled and filled["current_fcf"] is not universe["current_fcf"]:
+        # Rescale the per-scenario starting FCF with the quoted base-case FCF
+        scale = filled["current_fcf"] / universe["current_fcf"]
+        filled["initial_fcf"] = universe["initial_fcf"] * scale[:, None]
+    return filled
+
+
+class StandInServer:
+    """Local quote server for offline testing: GET /quote/<ticker> from a dict, with simulated latency."""
+
+    def __init__(self, quotes, latency=0.005):
+        self.quotes = quotes
+        self.latency = latency
+        self.requests = 0
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                path = request_line.decode("latin-1").split(" ")[1]
+                ticker = path.rsplit("/", 1)[-1]
+                await asyncio.sleep(self.latency)
+                status, payload = (200, self.quotes[ticker]) if ticker in self.quotes else \
+                    (404, {"error": f"Unknown ticker {ticker}"})
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe()
+    # Stand-in "live" quotes: the hard-coded inputs with market_cap and beta moved
+    rng = np.random.default_rng(0)
+    quotes = {
+        ticker: {"market_cap": float(universe["market_cap"][i] * rng.uniform(0.9, 1.1)),
+                 "beta": float(universe["beta"][i] + rng.normal(0, 0.05)),
+                 "cash": float(universe["cash"][i]), "debt": float(universe["debt"][i])}
+        for i, ticker in enumerate(universe["tickers"])
+    }
+    # Many callers asking for the same names at once
+    requested = universe["tickers"] * 50
+
+    async def main(cache_dir):
+        server = StandInServer(quotes, latency=0.01)
+        port = await server.start()
+        rows = []
+        provider = CachedProvider(HTTPProvider("127.0.0.1", port, pool_size=4), cache_dir, ttl=60)
+        for label in ("Cold (HTTP)", "Warm (disk cache)"):
+            start = time.perf_counter()
+            fetched = await provider.fetch_many(requested)
+            elapsed = time.perf_counter() - start
+            rows.append([label, len(requested), f"{elapsed * 1000:.1f}ms", server.requests,
+                         provider.stats["deduplicated"], provider.stats["cache_hits"]])
+        await provider.close()
+        await server.stop()
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(quotes, f)
+        file_provider = FileProvider(f.name)
+        start = time.perf_counter()
+        await file_provider.fetch_many(requested)
+        rows.append(["File provider", len(requested), f"{(time.perf_counter() - start) * 1000:.1f}ms", "-",
+                     file_provider.stats["deduplicated"], "-"])
+        os.unlink(f.name)
+        return fetched, rows
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetched, rows = asyncio.run(main(cache_dir))
+    print(tabulate(rows, ["Run", "Requests", "Elapsed", "Server Hits (total)", "Deduplicated (total)",
+                          "Cache Hits (total)"], tablefmt="grid"))
+
+    live = apply_quotes(universe, fetched)
+    args = ("risk_free_rate", "market_return", "beta", "market_cap", "debt")
+    hard_coded = calculate_wacc(*[universe[k] for k in args], wacc_cash(universe),
+                                cost_of_debt=universe["cost_of_debt"])
+    refreshed = calculate_wacc(*[live[k] for k in args], wacc_cash(live), cost_of_debt=live["cost_of_debt"])
+    table = [[t, f"{universe['market_cap'][i]:.1f}", f"{live['market_cap'][i]:.1f}", f"{hard_coded[i]:.2%}",
+              f"{refreshed[i]:.2%}"] for i, t in enumerate(universe["tickers"])]
+    print(tabulate(table, ["Ticker", "Market Cap (script)", "Market Cap (provider)", "WACC (script)",
+                           "WACC (provider)"], tablefmt="grid"))
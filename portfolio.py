@@ -0,0 +1,144 @@
+import numpy as np
+from tabulate import tabulate
+
+from universe import wacc_cash
+from valuation_core import SCENARIOS, calculate_wacc, run_scenarios
+
+# Portfolio view of the per-ticker valuations. Per-share values arrive as one
+# aligned array, tickers x outcomes (the three scenarios, every combination
+# of scenarios, or Monte Carlo paths), and every figure below is a reduction
+# over that array: position values, the distribution of the portfolio
+# total, and each position's share of the mean and of the downside tail.
+
+# Example holdings: shares held per ticker
+POSITIONS = {"AAPL": 120, "MSFT": 60, "NVDA": 200, "V": 80, "MA": 40, "META": 35, "DPZ": 25, "TOST": 400,
+             "ZM": 150}
+
+
+def align_positions(positions, tickers):
+    """Shares held as a (tickers,) array in universe order; unknown tickers raise."""
+    unknown = set(positions) - set(tickers)
+    if unknown:
+        raise ValueError(f"Positions in tickers outside the universe: {sorted(unknown)}")
+    return np.array([positions.get(ticker, 0.0) for ticker in tickers], dtype=float)
+
+
+def market_prices(universe):
+    """Current price per share implied by market_cap and shares outstanding."""
+    return universe["market_cap"] * 1000 / universe["initial_shares"]
+
+
+def scenario_prices(universe, year=0):
+    """Per-share value in year N for every ticker and scenario, shape (tickers, 3)."""
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    result = run_scenarios(universe["initial_fcf"], universe["growth"], universe["terminal_growth"], wacc[:, None],
+                           universe["initial_shares"][:, None], universe["buyback_rate"][:, None],
+                           (universe["debt"] - universe["cash"])[:, None])
+    return result["yearly_share_prices"][..., year]
+
+
+def scenario_combinations(prices, probabilities):
+    """
+    Every combination of per-ticker scenarios, treating tickers as independent.
+
+    Parameters:
+    prices (array): (tickers, scenarios) per-share values
+    probabilities (array): (scenarios,) or (tickers, scenarios) scenario weights
+
+    Returns:
+    (array, array): per-share values (tickers, scenarios ** tickers) and the
+    probability of each combination
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_tickers, n_scenarios = prices.shape
+    probabilities = np.broadcast_to(np.asarray(probabilities, dtype=float), prices.shape)
+    # Row t of the mixed-radix index gives ticker t's scenario in each combination
+    choice = np.indices((n_scenarios,) * n_tickers).reshape(n_tickers, -1)
+    rows = np.arange(n_tickers)[:, None]
+    return prices[rows, choice], probabilities[rows, choice].prod(axis=0)
+
+
+def portfolio_distribution(prices, shares, probabilities=None, tail=0.05):
+    """
+    Portfolio value across aligned outcomes and each position's contribution.
+
+    Parameters:
+    prices (array): (tickers, outcomes) per-share values
+    shares (array): (tickers,) shares held
+    probabilities (array): Optional (outcomes,) weights; equal weights by default
+    tail (float): Tail probability for the downside figures
+
+    Returns:
+    dict: position_values (tickers, outcomes), total (outcomes,), mean,
+    percentiles (5/25/50/75/95), expected_shortfall (mean total in the worst
+    `tail`), contribution_to_mean and contribution_to_shortfall per ticker
+    """
+    prices = np.asarray(prices, dtype=float)
+    outcomes = prices.shape[1]
+    weights = np.full(outcomes, 1 / outcomes) if probabilities is None else np.asarray(probabilities, dtype=float)
+    weights = weights / weights.sum()
+
+    position_values = prices * np.asarray(shares, dtype=float)[:, None]
+    total = position_values.sum(axis=0)
+
+    order = np.argsort(total, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    percentiles = {q: total[order][min(np.searchsorted(cumulative, q / 100), outcomes - 1)] for q in (5, 25, 50, 75, 95)}
+
+    # Worst outcomes holding `tail` of the probability; the boundary outcome is partly included
+    in_tail = np.clip((tail - (cumulative - weights[order])) / weights[order], 0, 1)
+    tail_weights = np.zeros(outcomes)
+    tail_weights[order] = weights[order] * in_tail
+    tail_weights /= tail_weights.sum()
+
+    return {
+        "position_values": position_values,
+        "total": total,
+        "mean": total @ weights,
+        "percentiles": percentiles,
+        "expected_shortfall": total @ tail_weights,
+        "contribution_to_mean": position_values @ weights,
+        "contribution_to_shortfall": position_values @ tail_weights
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    from macro_simulation import simulate_universe
+    from universe import load_universe
+
+    universe = load_universe(list(POSITIONS))
+    tickers = universe["tickers"]
+    shares = align_positions(POSITIONS, tickers)
+    market_value = market_prices(universe) * shares
+
+    # Three scenarios applied to every holding together
+    prices = scenario_prices(universe)
+    joint = portfolio_distribution(prices, shares)
+    headers = ["Portfolio"] + list(SCENARIOS) + ["Market Value"]
+    print(tabulate([["Total value"] + [f"${v:,.0f}" for v in joint["total"]] + [f"${market_value.sum():,.0f}"]],
+                   headers, tablefmt="grid"))
+
+    # Independent scenarios per holding (25% / 50% / 25%), all 3^9 combinations
+    combined_prices, combined_weights = scenario_combinations(prices, [0.25, 0.5, 0.25])
+    independent = portfolio_distribution(combined_prices, shares, combined_weights)
+
+    # Correlated Monte Carlo paths (shared rates / risk premium / GDP factors)
+    simulated = simulate_universe(universe, n_paths=20000, seed=0)
+    monte_carlo = portfolio_distribution(simulated["price_per_share"], shares)
+
+    headers = ["Distribution", "Mean", "5th", "50th", "95th", "Expected Shortfall (5%)"]
+    table = [[label, f"${d['mean']:,.0f}", f"${d['percentiles'][5]:,.0f}", f"${d['percentiles'][50]:,.0f}",
+              f"${d['percentiles'][95]:,.0f}", f"${d['expected_shortfall']:,.0f}"]
+             for label, d in [(f"Independent scenarios ({combined_prices.shape[1]:,})", independent),
+                              ("Macro Monte Carlo (20,000)", monte_carlo)]]
+    print(tabulate(table, headers, tablefmt="grid"))
+
+    headers = ["Ticker", "Shares", "Market Value", "Mean Value", "Share of Mean", "Share of Shortfall"]
+    table = [[t, f"{shares[i]:.0f}", f"${market_value[i]:,.0f}", f"${monte_carlo['contribution_to_mean'][i]:,.0f}",
+              f"{monte_carlo['contribution_to_mean'][i] / monte_carlo['mean']:.1%}",
+              f"{monte_carlo['contribution_to_shortfall'][i] / monte_carlo['expected_shortfall']:.1%}"]
+             for i, t in enumerate(tickers)]
+    print(tabulate(table, headers, tablefmt="grid"))
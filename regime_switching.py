@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import calculate_wacc, run_scenarios
+
+# Markov regime-switching growth paths. Each regime draws its yearly growth
+# (and optionally FCF margin) from its own normal distribution; the regime
+# itself moves from year to year according to a transition matrix, so a path
+# can go high growth -> steady -> decline the way NVDA's base case fades.
+
+NVDA_REGIMES = [
+    {"name": "High Growth", "growth": (0.30, 0.08)},
+    {"name": "Steady", "growth": (0.10, 0.04)},
+    {"name": "Decline", "growth": (-0.05, 0.08)},
+]
+
+NVDA_TRANSITIONS = [
+    [0.70, 0.25, 0.05],
+    [0.05, 0.85, 0.10],
+    [0.05, 0.35, 0.60],
+]
+
+
+def simulate_regimes(transition_matrix, initial_regime, n_paths, years, rng):
+    """
+    Regime of every path in every year, shape (n_paths, years).
+
+    initial_regime is a regime index or a probability vector over regimes.
+    Each year is sampled for all paths at once by inverting the cumulative
+    transition probabilities of the current regime.
+    """
+    transition_matrix = np.asarray(transition_matrix, dtype=float)
+    if not np.allclose(transition_matrix.sum(axis=1), 1):
+        raise ValueError("Each row of the transition matrix must sum to 1")
+    cumulative = np.cumsum(transition_matrix, axis=1)
+
+    if np.ndim(initial_regime) == 0:
+        state = np.full(n_paths, int(initial_regime))
+    else:
+        state = np.searchsorted(np.cumsum(initial_regime), rng.random(n_paths), side="right")
+    states = np.empty((n_paths, years), dtype=int)
+    draws = rng.random((n_paths, years))
+    for year in range(years):
+        states[:, year] = state
+        state = (cumulative[state] <= draws[:, year, None]).sum(axis=1)
+        state = np.minimum(state, len(transition_matrix) - 1)
+    return states
+
+
+def sample_regime_paths(regimes, transition_matrix, initial_regime, n_paths, years=10, seed=None):
+    """
+    Growth and margin paths for a batch of simulated regime sequences.
+
+    Returns (states, growth, margins); margins is None unless every regime
+    defines a "margin" (mean, std) entry.
+    """
+    rng = np.random.default_rng(seed)
+    states = simulate_regimes(transition_matrix, initial_regime, n_paths, years, rng)
+    growth_mean, growth_std = np.array([regime["growth"] for regime in regimes], dtype=float).T
+    growth = rng.normal(growth_mean[states], growth_std[states])
+
+    margins = None
+    if all("margin" in regime for regime in regimes):
+        margin_mean, margin_std = np.array([regime["margin"] for regime in regimes], dtype=float).T
+        margins = np.clip(rng.normal(margin_mean[states], margin_std[states]), 0, 1)
+    return states, growth, margins
+
+
+def regime_patterns(states):
+    """Collapse each path's yearly regimes into its sequence of distinct runs, padded with -1."""
+    changed = np.ones(states.shape, dtype=bool)
+    changed[:, 1:] = states[:, 1:] != states[:, :-1]
+    order = np.argsort(~changed, axis=1, kind="stable")
+    runs = np.take_along_axis(np.where(changed, states, -1), order, axis=1)
+    return runs
+
+
+def summarize_by_regime_path(states, values, regimes, top=10, percentiles=(5, 50, 95)):
+    """
+    Value distribution for each regime pattern (e.g. High Growth -> Steady),
+    most frequent first.
+    """
+    patterns, group, counts = np.unique(regime_patterns(states), axis=0, return_inverse=True, return_counts=True)
+    group = group.ravel()
+    order = np.lexsort((values, group))
+    sorted_values = values[order]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    means = np.bincount(group, weights=values) / counts
+
+    names = [regime["name"] for regime in regimes]
+    summary = []
+    for g in np.argsort(-counts)[:top]:
+        positions = starts[g] + np.round(np.asarray(percentiles) / 100 * (counts[g] - 1)).astype(int)
+        summary.append({
+            "pattern": " -> ".join(names[s] for s in patterns[g] if s >= 0),
+            "probability": counts[g] / len(values),
+            "mean": means[g],
+            "percentiles": sorted_values[positions]
+        })
+    return summary
+
+
+def regime_valuation(initial_fcf, regimes, transition_matrix, initial_regime, terminal_growth, discount_rate,
+                     initial_shares, buyback_rate, net_debt, n_paths=100000, years=10, initial_margin=None,
+                     seed=None):
+    """
+    Value one ticker over simulated regime paths.
+
+    With margin regimes, initial_fcf is the starting revenue and
+    initial_margin the current FCF margin, as in tost.py's revenue model.
+    """
+    states, growth, margins = sample_regime_paths(regimes, transition_matrix, initial_regime, n_paths, years, seed)
+    if margins is not None:
+        if initial_margin is None:
+            raise ValueError("initial_margin is required when regimes define margins")
+        margins = np.concatenate([np.full((n_paths, 1), initial_margin), margins], axis=1)
+    result = run_scenarios(np.full(n_paths, initial_fcf), growth, terminal_growth, discount_rate, initial_shares,
+                           buyback_rate, net_debt, fcf_margins=margins)
+    result["states"] = states
+    result["growth_paths"] = growth
+    result["price_per_share"] = result["yearly_share_prices"][..., 0]
+    return result
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+
+    universe = load_universe(["NVDA"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+
+    start = time.perf_counter()
+    result = regime_valuation(universe["current_fcf"][0], NVDA_REGIMES, NVDA_TRANSITIONS, 0,
+                              universe["terminal_growth"][0, 1], wacc, universe["initial_shares"][0],
+                              universe["buyback_rate"][0], universe["debt"][0] - universe["cash"][0], seed=0)
+    summary = summarize_by_regime_path(result["states"], result["price_per_share"], NVDA_REGIMES)
+    elapsed = time.perf_counter() - start
+
+    headers = ["Regime Path", "Probability", "Mean", "5th Pct", "Median", "95th Pct"]
+    table = [
+        [row["pattern"], f"{row['probability']:.1%}", f"${row['mean']:.2f}"]
+        + [f"${v:.2f}" for v in row["percentiles"]]
+        for row in summary
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
+    overall = np.percentile(result["price_per_share"], [5, 50, 95])
+    print(f"All paths: 5th ${overall[0]:.2f} | median ${overall[1]:.2f} | 95th ${overall[2]:.2f}")
+    print(f"{len(result['price_per_share'])} regime paths simulated and valued in {elapsed:.2f}s")
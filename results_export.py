@@ -0,0 +1,170 @@
+import json
+import os
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+# run_scenarios results as contiguous columns instead of printed grids.
+#
+#   flatten_result()  batch dims -> rows; every output becomes a C-contiguous
+#                     (rows,) or (rows, years) column (a view where possible)
+#   to_structured()   one structured array (row records, e.g. for a single .npy)
+#   save_columns()    <path>/index.json plus one .npy per column, which
+#                     open_columns() memory-maps without reading or parsing
+#   create_columns()  preallocated .npy memmaps that chunked runs write into
+#   save_npz()        the same columns in a single .npz for transport
+#
+# Labels (ticker, scenario, ...) are stored as fixed-width columns so they
+# map like the numbers.
+
+COLUMNS = ("ev", "equity_value", "final_price_per_share", "price_to_fcf", "fcf_projections", "share_count",
+           "yearly_share_prices")
+YEARLY_COLUMNS = ("fcf_projections", "share_count", "yearly_share_prices")
+
+
+def flatten_result(result, labels=None):
+    """
+    Columns of a run_scenarios result with the batch dimensions flattened to rows.
+
+    Parameters:
+    result (dict): run_scenarios output; batch shape from result["ev"]
+    labels (dict): Optional name -> array broadcastable to the batch shape
+        (e.g. tickers[:, None] and scenario names[None, :])
+
+    Returns:
+    dict: name -> contiguous array with rows first
+    """
+    batch = np.shape(result["ev"])
+    rows = int(np.prod(batch))
+    columns = {}
+    for name, values in (labels or {}).items():
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        columns[name] = np.ascontiguousarray(np.broadcast_to(values, batch)).reshape(rows)
+    for name in COLUMNS:
+        if name not in result:
+            continue
+        values = np.asarray(result[name], dtype=float)
+        if name in YEARLY_COLUMNS:
+            values = np.broadcast_to(values, batch + values.shape[-1:])
+            columns[name] = np.ascontiguousarray(values).reshape(rows, values.shape[-1])
+        else:
+            columns[name] = np.ascontiguousarray(np.broadcast_to(values, batch)).reshape(rows)
+    return columns
+
+
+def to_structured(columns):
+    """Pack columns into one structured array; yearly columns become sub-array fields."""
+    rows = len(next(iter(columns.values())))
+    dtype = np.dtype([(name, values.dtype, values.shape[1:]) for name, values in columns.items()])
+    records = np.empty(rows, dtype=dtype)
+    for name, values in columns.items():
+        records[name] = values
+    return records
+
+
+def _write_index(path, rows, columns):
+    index = {"rows": rows, "columns": {name: {"dtype": dtype, "shape": list(shape)}
+                                       for name, (dtype, shape) in columns.items()}}
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def save_columns(path, columns):
+    """Write one .npy per column plus index.json."""
+    os.makedirs(path, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    _write_index(path, len(next(iter(columns.values()))),
+                 {name: (values.dtype.str, values.shape[1:]) for name, values in columns.items()})
+
+
+def create_columns(path, rows, years, columns=COLUMNS[:4] + ("yearly_share_prices",), labels=None):
+    """
+    Preallocate .npy columns as writable memmaps, e.g. for run_scenarios_chunked(out=...).
+
+    labels maps a label column name to its dtype (e.g. {"ticker": "U8"}).
+    Returns the dict of memmaps; open_columns() reads them back once written.
+    """
+    os.makedirs(path, exist_ok=True)
+    specs = {name: (np.dtype(dtype).str, ()) for name, dtype in (labels or {}).items()}
+    specs.update({name: ("<f8", (years,) if name in YEARLY_COLUMNS else ()) for name in columns})
+    arrays = {name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode="w+", dtype=dtype,
+                                              shape=(rows,) + shape)
+              for name, (dtype, shape) in specs.items()}
+    _write_index(path, rows, specs)
+    return arrays
+
+
+def open_columns(path, columns=None, mode="r"):
+    """Memory-map saved columns: nothing is read until a column is indexed."""
+    with open(os.path.join(path, "index.json")) as f:
+        index = json.load(f)
+    names = columns or list(index["columns"])
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in names}
+
+
+def save_npz(path, columns):
+    """Single-file, uncompressed .npz of the columns (loaded eagerly; use save_columns to memory-map)."""
+    np.savez(path, **columns)
+
+
+# Example usage:
+if __name__ == "__main__":
+    import tempfile
+
+    from chunked_execution import run_scenarios_chunked
+    from universe import load_universe, wacc_cash
+    from valuation_core import SCENARIOS, calculate_wacc, run_scenarios
+
+    universe = load_universe()
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    result = run_scenarios(universe["initial_fcf"], universe["growth"], universe["terminal_growth"], wacc[:, None],
+                           universe["initial_shares"][:, None], universe["buyback_rate"][:, None],
+                           (universe["debt"] - universe["cash"])[:, None])
+    columns = flatten_result(result, {"ticker": np.array(universe["tickers"])[:, None],
+                                      "scenario": np.array(SCENARIOS)[None, :]})
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_columns(os.path.join(directory, "universe"), columns)
+        records = to_structured(columns)
+        np.save(os.path.join(directory, "universe_records.npy"), records)
+        save_npz(os.path.join(directory, "universe.npz"), columns)
+
+        mapped = open_columns(os.path.join(directory, "universe"))
+        mapped_records = np.load(os.path.join(directory, "universe_records.npy"), mmap_mode="r")
+        table = [[mapped["ticker"][i], mapped["scenario"][i], f"${mapped['equity_value'][i]:.1f}B",
+                  f"${mapped_records['yearly_share_prices'][i, 0]:.2f}", f"{mapped['price_to_fcf'][i]:.1f}"]
+                 for i in range(0, 9)]
+        print(tabulate(table, ["Ticker", "Scenario", "Equity Value", "Price Today", "Price/FCF"], tablefmt="grid"))
+
+        # A million-path sweep written straight into memmapped columns, then reopened
+        n_paths = 1000000
+        rng = np.random.default_rng(0)
+        msft = universe["tickers"].index("MSFT")
+        growth = universe["growth"][msft, 1] + rng.normal(0, 0.02, (n_paths, 10))
+        path = os.path.join(directory, "msft_sweep")
+        out = create_columns(path, n_paths, 11)
+        start = time.perf_counter()
+        run_scenarios_chunked(universe["initial_fcf"][msft, 1], growth, universe["terminal_growth"][msft, 1],
+                              wacc[msft], universe["initial_shares"][msft], universe["buyback_rate"][msft],
+                              universe["debt"][msft] - universe["cash"][msft],
+                              outputs=tuple(out), out=out)
+        for values in out.values():
+            values.flush()
+        del out
+        written = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sweep = open_columns(path)
+        opened = time.perf_counter() - start
+        start = time.perf_counter()
+        median = np.median(sweep["final_price_per_share"])
+        scanned = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"{n_paths:,} rows ({size / 2**20:.0f} MiB): written in {written:.2f}s, opened in "
+              f"{opened * 1000:.2f}ms, median final price ${median:.2f} in {scanned * 1000:.1f}ms")
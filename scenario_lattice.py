@@ -0,0 +1,125 @@
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import calculate_fcf, dcf_valuation
+
+# Branching scenario trees: growth follows a shared path for a few years,
+# then splits (accelerate / decay), and may split again later. A node is
+#
+#   {"name": str, "growth": [...], "children": [(probability, node), ...]}
+#
+# with each probability conditional on the parent. The same node object may
+# hang under several parents, which makes the tree a recombining lattice.
+#
+# Every node's contribution is linear in the FCF it starts from, so each
+# node is projected and discounted once, per unit of starting FCF, and
+# combined bottom-up. Cost grows with the number of nodes, not leaf paths.
+
+
+def _validate(node):
+    children = node.get("children", [])
+    if children and not np.isclose(sum(probability for probability, _ in children), 1):
+        raise ValueError(f"Branch probabilities under {node['name']} must sum to 1")
+
+
+def lattice_valuation(root, initial_fcf, terminal_growth, discount_rate, net_debt=0, initial_shares=None,
+                      per_share_scale=1000):
+    """
+    Probability-weighted DCF value of a scenario lattice.
+
+    terminal_growth and discount_rate may be arrays (e.g. a WACC sweep); the
+    whole lattice is evaluated for every element at once.
+
+    Returns:
+    dict: ev, equity_value, price_per_share (when initial_shares is given)
+    and nodes_evaluated
+    """
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    memo = {}
+
+    def unit_value(node, is_root):
+        key = (id(node), is_root)
+        if key in memo:
+            return memo[key]
+        _validate(node)
+        # Root projections start with the current FCF itself, like calculate_fcf
+        points = calculate_fcf(1.0, node["growth"])
+        if not is_root:
+            points = points[1:]
+        years = len(points)
+        discount = (1 + discount_rate[..., None]) ** -np.arange(1, years + 1)
+        value = np.sum(points * discount, axis=-1)
+        end = points[-1] if years else 1.0
+        end_discount = discount[..., -1] if years else 1.0
+
+        children = node.get("children", [])
+        if children:
+            continuation = sum(probability * unit_value(child, False) for probability, child in children)
+        else:
+            continuation = (1 + terminal_growth) / (discount_rate - terminal_growth)
+        value = value + end * end_discount * continuation
+        memo[key] = value
+        return value
+
+    ev = initial_fcf * unit_value(root, True)
+    result = {"ev": ev, "equity_value": ev - net_debt, "nodes_evaluated": len(memo)}
+    if initial_shares is not None:
+        result["price_per_share"] = result["equity_value"] * per_share_scale / initial_shares
+    return result
+
+
+def leaf_paths(root):
+    """Every root-to-leaf path as (probability, names, full growth list); exponential in depth."""
+    paths = []
+
+    def walk(node, probability, names, growth):
+        names = names + [node["name"]]
+        growth = growth + list(node["growth"])
+        if not node.get("children"):
+            paths.append((probability, names, growth))
+        for branch_probability, child in node.get("children", []):
+            walk(child, probability * branch_probability, names, growth)
+
+    walk(root, 1.0, [], [])
+    return paths
+
+
+def nvda_lattice():
+    """NVDA's 0.377 start, a split after year 2 and another after year 5."""
+    sustained = {"name": "Sustained", "growth": [0.14, 0.12, 0.10, 0.09, 0.08]}
+    mature = {"name": "Mature", "growth": [0.08, 0.07, 0.06, 0.05, 0.04]}
+    accelerate = {"name": "Accelerate", "growth": [0.30, 0.27, 0.24], "children": [(0.7, sustained), (0.3, mature)]}
+    decay = {"name": "Decay", "growth": [0.16, 0.12, 0.10], "children": [(0.3, sustained), (0.7, mature)]}
+    return {"name": "Current", "growth": [0.377, 0.25], "children": [(0.4, accelerate), (0.6, decay)]}
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe(["NVDA"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+    net_debt = universe["debt"][0] - universe["cash"][0]
+    terminal_growth = universe["terminal_growth"][0, 1]
+    lattice = nvda_lattice()
+
+    result = lattice_valuation(lattice, universe["current_fcf"][0], terminal_growth, wacc, net_debt,
+                               universe["initial_shares"][0])
+
+    headers = ["Path", "Probability", "Enterprise Value ($B)"]
+    table = []
+    for probability, names, growth in leaf_paths(lattice):
+        fcf_projections = calculate_fcf(universe["current_fcf"][0], growth)
+        ev = dcf_valuation(fcf_projections, terminal_growth, wacc)
+        table.append([" -> ".join(names), f"{probability:.1%}", f"${ev:.2f}"])
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"Probability-weighted EV: ${result['ev']:.2f}B | Price per share: ${result['price_per_share']:.2f} "
+          f"({result['nodes_evaluated']} nodes evaluated for {len(table)} leaf paths)")
+
+    sweep = lattice_valuation(lattice, universe["current_fcf"][0], terminal_growth,
+                              np.linspace(wacc - 0.02, wacc + 0.02, 5), net_debt, universe["initial_shares"][0])
+    print("WACC sweep price per share: " + ", ".join(f"${v:.2f}" for v in sweep["price_per_share"]))
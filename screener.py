@@ -0,0 +1,169 @@
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from universe import wacc_cash
+from valuation_core import calculate_implied_growth, calculate_wacc, run_scenarios
+
+# Screening over valuation outputs. ValuationIndex keeps, for every metric,
+# the row ids sorted by value; refreshing a set of tickers removes and
+# re-inserts only those rows, and top-k / range queries read from the sorted
+# arrays instead of rescanning every result.
+
+METRICS = ("upside", "price_to_fcf", "implied_growth")
+
+
+def value_universe(universe, scenario=1):
+    """Screening metrics for a load_universe() dict: upside vs market_cap, price_to_fcf, implied growth."""
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    net_debt = universe["debt"] - universe["cash"]
+    terminal_growth = universe["terminal_growth"][:, scenario]
+    result = run_scenarios(universe["initial_fcf"][:, scenario], universe["growth"][:, scenario], terminal_growth,
+                           wacc, universe["initial_shares"], universe["buyback_rate"], net_debt)
+    return {
+        "upside": result["equity_value"] / universe["market_cap"] - 1,
+        "price_to_fcf": result["price_to_fcf"],
+        "implied_growth": calculate_implied_growth(universe["market_cap"], net_debt, universe["current_fcf"], 10,
+                                                   terminal_growth, wacc)
+    }
+
+
+class ValuationIndex:
+    """Incrementally maintained sorted index of valuation metrics per ticker."""
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = tuple(metrics)
+        self.tickers = []
+        self.row_of = {}
+        self.sectors = np.empty(0, dtype=object)
+        self.values = {metric: np.empty(0) for metric in self.metrics}
+        self.order = {metric: np.empty(0, dtype=np.int64) for metric in self.metrics}
+        self.sorted_values = {metric: np.empty(0) for metric in self.metrics}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def update(self, tickers, values, sectors=None):
+        """
+        Insert or refresh rows. values maps each metric to an array aligned
+        with tickers. Rows whose metrics are unchanged are left alone.
+        Returns the number of rows re-indexed.
+        """
+        new = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.row_of]
+        if new:
+            for ticker in new:
+                self.row_of[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+            self.sectors = np.concatenate([self.sectors, np.full(len(new), None, dtype=object)])
+            for metric in self.metrics:
+                self.values[metric] = np.concatenate([self.values[metric], np.full(len(new), np.nan)])
+        rows = np.array([self.row_of[ticker] for ticker in tickers], dtype=np.int64)
+        # A ticker listed more than once takes its last values
+        _, last = np.unique(rows[::-1], return_index=True)
+        latest = np.sort(len(rows) - 1 - last)
+        rows = rows[latest]
+        if sectors is not None:
+            self.sectors[rows] = np.broadcast_to(np.asarray(sectors, dtype=object), (len(tickers),))[latest]
+
+        incoming = {metric: np.broadcast_to(np.asarray(values[metric], dtype=float), (len(tickers),))[latest]
+                    for metric in self.metrics}
+        fresh = np.isin(rows, [self.row_of[ticker] for ticker in new])
+        changed = fresh.copy()
+        for metric in self.metrics:
+            old = self.values[metric][rows]
+            changed |= ~((old == incoming[metric]) | (np.isnan(old) & np.isnan(incoming[metric])))
+        rows, fresh = rows[changed], fresh[changed]
+        if len(rows) == 0:
+            return 0
+
+        for metric in self.metrics:
+            order, sorted_values = self.order[metric], self.sorted_values[metric]
+            stale = rows[~fresh]
+            if len(stale):
+                keep = ~np.isin(order, stale)
+                order, sorted_values = order[keep], sorted_values[keep]
+            self.values[metric][rows] = incoming[metric][changed]
+            batch = np.argsort(incoming[metric][changed], kind="stable")
+            batch_values = incoming[metric][changed][batch]
+            positions = np.searchsorted(sorted_values, batch_values)
+            self.order[metric] = np.insert(order, positions, rows[batch])
+            self.sorted_values[metric] = np.insert(sorted_values, positions, batch_values)
+        return len(rows)
+
+    def _matches(self, rows, sector, ranges):
+        mask = np.ones(len(rows), dtype=bool)
+        if sector is not None:
+            sectors = {sector} if isinstance(sector, str) else set(sector)
+            mask &= np.isin(self.sectors[rows], list(sectors))
+        for metric, (low, high) in (ranges or {}).items():
+            values = self.values[metric][rows]
+            mask &= (values >= low) & (values <= high)
+        return mask
+
+    def top_k(self, metric, k=50, sector=None, ranges=None, ascending=False):
+        """
+        Best k tickers by metric that pass the filters, walking the sorted
+        index from the top in blocks until k rows qualify.
+        """
+        order, sorted_values = self.order[metric], self.sorted_values[metric]
+        valid = np.searchsorted(sorted_values, np.nan)  # NaNs sort last
+        ranked = order[:valid] if ascending else order[:valid][::-1]
+        found = []
+        block = max(2 * k, 64)
+        for start in range(0, len(ranked), block):
+            candidates = ranked[start:start + block]
+            found.extend(candidates[self._matches(candidates, sector, ranges)])
+            if len(found) >= k:
+                break
+        return [(self.tickers[row], self.values[metric][row]) for row in found[:k]]
+
+    def range_query(self, metric, low, high, sector=None, ranges=None):
+        """Tickers with low <= metric <= high (plus filters), in metric order."""
+        sorted_values = self.sorted_values[metric]
+        start = np.searchsorted(sorted_values, low, side="left")
+        stop = np.searchsorted(sorted_values, high, side="right")
+        rows = self.order[metric][start:stop]
+        rows = rows[self._matches(rows, sector, ranges)]
+        return [(self.tickers[row], self.values[metric][row]) for row in rows]
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import SECTORS, load_universe
+
+    universe = load_universe()
+    index = ValuationIndex()
+    index.update(universe["tickers"], value_universe(universe), [SECTORS[t] for t in universe["tickers"]])
+
+    headers = ["Ticker", "Upside vs Market Cap"]
+    table = [[ticker, f"{value:.1%}"] for ticker, value in index.top_k("upside", 5)]
+    print("Top 5 by upside:")
+    print(tabulate(table, headers, tablefmt="grid"))
+
+    table = [[ticker, f"{value:.1%}"] for ticker, value in
+             index.top_k("upside", 5, sector="Technology", ranges={"price_to_fcf": (10, 25)})]
+    print("Technology, price-to-FCF 10-25:")
+    print(tabulate(table, headers, tablefmt="grid"))
+
+    # Refresh a single ticker after an input change
+    msft = load_universe(["MSFT"])
+    msft["beta"] = msft["beta"] + 0.3
+    print(f"Rows re-indexed after MSFT beta change: {index.update(['MSFT'], value_universe(msft))}")
+
+    # Large synthetic universe: refresh 1% of the rows, then query
+    rng = np.random.default_rng(0)
+    names = [f"T{i}" for i in range(200000)]
+    big = ValuationIndex()
+    big.update(names, {metric: rng.normal(size=len(names)) for metric in METRICS},
+               rng.choice(list(set(SECTORS.values())), len(names)))
+    changed = rng.choice(len(names), 2000, replace=False)
+    start = time.perf_counter()
+    big.update([names[i] for i in changed], {metric: rng.normal(size=len(changed)) for metric in METRICS})
+    refresh = time.perf_counter() - start
+    start = time.perf_counter()
+    top = big.top_k("upside", 50, sector="Financials", ranges={"price_to_fcf": (-0.5, 0.5)})
+    query = time.perf_counter() - start
+    print(f"200k rows: refreshed 2000 in {refresh * 1000:.1f}ms, filtered top-50 in {query * 1000:.2f}ms")
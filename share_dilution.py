@@ -0,0 +1,135 @@
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import SCENARIOS
+
+# Share counts net of stock-based compensation and buybacks, instead of the
+# single constant rate in calculate_yearly_share_count (buybacks in most
+# scripts, 1 + dilution_rate in tost.py).
+#
+# Each year's grants vest over the following years according to a vesting
+# schedule, less forfeitures and shares withheld for taxes; buybacks retire
+# a fraction of the shares outstanding plus any fixed number of shares:
+#
+#   S_t = S_{t-1} * (1 - buyback_rate_t) + vested_t - buyback_shares_t
+#
+# Vesting is a matrix product (grants x vesting matrix) and the recursion has
+# the closed form S_t = P_t * (S_0 + sum_k net_k / P_k) with P_t the running
+# product of (1 - buyback_rate), so every input can vary by year and carry
+# any leading (scenario, ticker, path) dimensions without a loop over years.
+
+FOUR_YEAR_VESTING = (0.0, 0.25, 0.25, 0.25, 0.25)
+
+
+def vesting_matrix(years, vesting=FOUR_YEAR_VESTING, forfeiture_rate=0.0):
+    """
+    (years, years) matrix M with M[s, t] the fraction of a year-s grant that
+    vests in year t. vesting[k] is the fraction vesting k years after the
+    grant year; each year an unvested unit survives with 1 - forfeiture_rate.
+    """
+    vesting = np.asarray(vesting, dtype=float)
+    lag = np.arange(years)[None, :] - np.arange(years)[:, None]
+    inside = (lag >= 0) & (lag < len(vesting))
+    fractions = np.where(inside, vesting[np.clip(lag, 0, len(vesting) - 1)], 0.0)
+    return fractions * (1 - forfeiture_rate) ** np.maximum(lag, 0)
+
+
+def share_count_schedule(initial_shares, years, grants=0.0, grant_rate=0.0, vesting=FOUR_YEAR_VESTING,
+                         unvested=0.0, forfeiture_rate=0.0, withholding=0.0, buyback_rate=0.0, buyback_shares=0.0):
+    """
+    Per-year share counts from grant, vesting and buyback schedules.
+
+    Year 0 is today (initial_shares); schedules cover years 1..years-1 and are
+    scalars or arrays whose last axis has years - 1 entries. Any leading
+    dimensions (e.g. scenarios) broadcast.
+
+    Parameters:
+    initial_shares (array): Shares outstanding today, in millions
+    years (int): Number of share counts, matching the FCF projections
+    grants (array): Units granted each year, in millions
+    grant_rate (array): Additional grants as a fraction of initial_shares per year
+    vesting (sequence): Fraction vesting 0, 1, 2, ... years after the grant year
+    unvested (array): Units granted before today and still unvested; they vest
+        along the same schedule as a grant made in year 0, with the year-0
+        tranche (vesting[0]) counted in year 1 since year 0 is initial_shares
+    forfeiture_rate (float): Yearly forfeiture of unvested units
+    withholding (float): Fraction of vested shares withheld for taxes (net settlement)
+    buyback_rate (array): Fraction of shares outstanding retired each year (below 1; negative to dilute)
+    buyback_shares (array): Shares repurchased each year, in millions
+
+    Returns:
+    dict: share_count, vested and retired, each (..., years)
+    """
+    initial_shares = np.asarray(initial_shares, dtype=float)
+
+    def schedule(values):
+        values = np.asarray(values, dtype=float)
+        if values.ndim and values.shape[-1] not in (1, years - 1):
+            raise ValueError(f"Schedules need {years - 1} yearly values, got {values.shape[-1]}")
+        return values
+
+    granted = schedule(grants) + schedule(grant_rate) * initial_shares[..., None]
+    # Grants by year, with today's unvested pool as the year-0 grant
+    shape = np.broadcast_shapes(granted.shape[:-1] if granted.ndim else (), np.shape(unvested))
+    all_grants = np.concatenate([np.broadcast_to(np.asarray(unvested, dtype=float), shape)[..., None],
+                                 np.broadcast_to(granted, shape + (years - 1,))], axis=-1)
+    vested = all_grants @ vesting_matrix(years, vesting, forfeiture_rate) * (1 - withholding)
+    if years > 1:
+        vested[..., 1] += vested[..., 0]
+    vested[..., 0] = 0.0
+
+    def with_year_zero(values, first):
+        values = np.broadcast_to(values, values.shape[:-1] + (years - 1,) if values.ndim else (years - 1,))
+        return np.concatenate([np.full(values.shape[:-1] + (1,), first), values], axis=-1)
+
+    buyback_rate = schedule(buyback_rate)
+    if np.any(buyback_rate >= 1):
+        # The closed form divides by the running product of 1 - buyback_rate
+        raise ValueError("buyback_rate must be below 1")
+    kept = with_year_zero(1 - buyback_rate, 1.0)
+    running = np.cumprod(kept, axis=-1)
+    bought = with_year_zero(schedule(buyback_shares), 0.0)
+    net = vested - bought
+    share_count = running * (initial_shares[..., None] + np.cumsum(net / running, axis=-1))
+
+    previous = np.concatenate([share_count[..., :1], share_count[..., :-1]], axis=-1)
+    retired = previous * (1 - kept) + bought
+    return {"share_count": share_count, "vested": vested, "retired": retired}
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+    from valuation_core import calculate_wacc, run_scenarios
+
+    universe = load_universe(["TOST"])
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+    initial_shares = universe["initial_shares"][0]
+
+    # Per scenario (pessimistic, base, optimistic): SBC grants as a share of
+    # today's count fading over the years, 4-year vesting, and buybacks that
+    # start in year 3 in the better cases
+    years = 11
+    fade = np.linspace(1.0, 0.5, years - 1)
+    grant_rate = np.array([0.045, 0.035, 0.03])[:, None] * fade
+    buyback_rate = np.array([0.0, 0.01, 0.02])[:, None] * (np.arange(1, years) >= 3)
+    schedule = share_count_schedule(initial_shares, years, grant_rate=grant_rate, unvested=40.0,
+                                    forfeiture_rate=0.05, withholding=0.35, buyback_rate=buyback_rate)
+
+    args = (universe["initial_fcf"][0], universe["growth"][0], universe["terminal_growth"][0], wacc,
+            np.full(3, initial_shares), universe["buyback_rate"][0], universe["debt"][0] - universe["cash"][0])
+    flat = run_scenarios(*args)
+    sbc = run_scenarios(*args, share_count=schedule["share_count"])
+
+    headers = ["TOST"] + list(SCENARIOS)
+    table = [
+        ["Shares in year 10 (2% dilution)"] + [f"{v:.0f}M" for v in flat["share_count"][:, -1]],
+        ["Shares in year 10 (SBC schedule)"] + [f"{v:.0f}M" for v in schedule["share_count"][:, -1]],
+        ["Vested over 10 years"] + [f"{v:.0f}M" for v in schedule["vested"].sum(axis=-1)],
+        ["Retired over 10 years"] + [f"{v:.0f}M" for v in schedule["retired"].sum(axis=-1)],
+        ["Final price (2% dilution)"] + [f"${v:.2f}" for v in flat["final_price_per_share"]],
+        ["Final price (SBC schedule)"] + [f"${v:.2f}" for v in sbc["final_price_per_share"]],
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from universe import wacc_cash
+from valuation_core import SCENARIOS, calculate_wacc, run_scenarios
+
+# Universe-wide stress tests. A shock set is a dict of adjustments to the
+# calculate_wacc and run_scenario inputs:
+#
+#   rates                shift in risk_free_rate and market_return (premium unchanged)
+#   equity_risk_premium  shift in market_return
+#   beta                 shift in beta
+#   cost_of_debt         shift in cost_of_debt
+#   growth_scale         growth rates multiplied by this for the first growth_years
+#   growth_shift         growth rates shifted by this for the first growth_years
+#   growth_years         years affected by the growth shock (all by default)
+#   terminal_growth      shift in terminal growth
+#   fcf_scale            starting FCF multiplied by this
+#
+# Every shock set becomes one row of per-shock parameter arrays, so all
+# (shock x ticker x scenario) combinations are valued in one batched
+# calculate_wacc / run_scenarios pass, with the unshocked run as shock 0.
+
+NEUTRAL = {"rates": 0.0, "equity_risk_premium": 0.0, "beta": 0.0, "cost_of_debt": 0.0, "growth_scale": 1.0,
+           "growth_shift": 0.0, "growth_years": np.inf, "terminal_growth": 0.0, "fcf_scale": 1.0}
+
+SHOCKS = {
+    "Rates +200bp": {"rates": 0.02},
+    "Growth -30% for 2 years": {"growth_scale": 0.7, "growth_years": 2},
+    "Beta +0.3": {"beta": 0.3},
+    "Rates +200bp, growth -30% (2y), beta +0.3": {"rates": 0.02, "growth_scale": 0.7, "growth_years": 2,
+                                                   "beta": 0.3},
+    "Risk premium +150bp": {"equity_risk_premium": 0.015},
+    "Recession: FCF -20%, growth -5pt for 3 years": {"fcf_scale": 0.8, "growth_shift": -0.05, "growth_years": 3},
+    "Terminal growth -1pt": {"terminal_growth": -0.01},
+    "Rates -100bp": {"rates": -0.01},
+}
+
+
+def shock_arrays(shocks):
+    """
+    Stack shock sets into one (shocks,) array per parameter, neutral where a
+    set leaves a parameter alone. Unknown parameters raise ValueError.
+    """
+    for name, shock in shocks.items():
+        unknown = set(shock) - set(NEUTRAL)
+        if unknown:
+            raise ValueError(f"Unknown shock parameters in {name!r}: {sorted(unknown)}")
+    return {key: np.array([shock.get(key, neutral) for shock in shocks.values()], dtype=float)
+            for key, neutral in NEUTRAL.items()}
+
+
+def run_stress_tests(universe, shocks=SHOCKS, min_spread=0.005):
+    """
+    Value every ticker and scenario under every shock set in one pass.
+
+    Parameters:
+    universe (dict): Output of load_universe()
+    shocks (dict): Name -> shock set
+    min_spread (float): WACC is floored at terminal growth + min_spread so the
+        Gordon terminal value stays finite; floored cells are reported
+
+    Returns:
+    dict: names ("Unshocked" first), wacc (shocks, tickers, scenarios), result
+    (run_scenarios output, shocks x tickers x scenarios), price_per_share,
+    price_change and price_change_pct relative to the unshocked run,
+    equity_value_change (shocks, tickers, scenarios), universe_equity_value_change
+    (shocks, scenarios) and wacc_floored
+    """
+    names = ("Unshocked",) + tuple(shocks)
+    params = shock_arrays({"Unshocked": {}, **shocks})
+    rates = params["rates"][:, None]
+
+    risk_free_rate = universe["risk_free_rate"] + rates
+    market_return = universe["market_return"] + rates + params["equity_risk_premium"][:, None]
+    wacc = calculate_wacc(risk_free_rate, market_return, universe["beta"] + params["beta"][:, None],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"] + params["cost_of_debt"][:, None])
+
+    growth = universe["growth"]
+    affected = np.arange(growth.shape[-1]) < params["growth_years"][:, None]
+    scale = np.where(affected, params["growth_scale"][:, None], 1.0)[:, None, None, :]
+    shift = np.where(affected, params["growth_shift"][:, None], 0.0)[:, None, None, :]
+    growth = growth * scale + shift
+
+    terminal_growth = universe["terminal_growth"] + params["terminal_growth"][:, None, None]
+    wacc = np.broadcast_to(wacc[:, :, None], terminal_growth.shape)
+    floored = wacc < terminal_growth + min_spread
+    wacc = np.where(floored, terminal_growth + min_spread, wacc)
+
+    result = run_scenarios(universe["initial_fcf"] * params["fcf_scale"][:, None, None], growth, terminal_growth,
+                           wacc, universe["initial_shares"][:, None], universe["buyback_rate"][:, None],
+                           (universe["debt"] - universe["cash"])[:, None])
+    price = result["yearly_share_prices"][..., 0]
+    equity_value_change = result["equity_value"] - result["equity_value"][0]
+    return {
+        "names": names,
+        "wacc": wacc,
+        "result": result,
+        "price_per_share": price,
+        "price_change": price - price[0],
+        "price_change_pct": price / price[0] - 1,
+        "equity_value_change": equity_value_change,
+        "universe_equity_value_change": equity_value_change.sum(axis=1),
+        "wacc_floored": floored
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe
+
+    universe = load_universe()
+    tickers = universe["tickers"]
+    start = time.perf_counter()
+    stress = run_stress_tests(universe)
+    elapsed = time.perf_counter() - start
+
+    base = SCENARIOS.index("Base Case")
+    headers = ["Base Case"] + tickers
+    table = [[name] + [f"{v:+.1%}" for v in stress["price_change_pct"][k, :, base]]
+             for k, name in enumerate(stress["names"]) if k]
+    print(tabulate(table, headers, tablefmt="grid"))
+
+    unshocked = stress["result"]["equity_value"][0].sum(axis=0)
+    headers = ["Universe Equity Value"] + list(SCENARIOS)
+    table = [["Unshocked"] + [f"${v:,.0f}B" for v in unshocked]]
+    table += [[name] + [f"{d:+,.0f}B ({d / v:+.1%})" for d, v in zip(stress["universe_equity_value_change"][k],
+                                                                     unshocked)]
+              for k, name in enumerate(stress["names"]) if k]
+    print(tabulate(table, headers, tablefmt="grid"))
+    cells = stress["price_per_share"].size
+    print(f"{len(stress['names'])} shock sets x {len(tickers)} tickers x {len(SCENARIOS)} scenarios "
+          f"({cells} valuations) in {elapsed * 1000:.1f}ms; WACC floored in {stress['wacc_floored'].sum()} cells")
+
+    # A grid of rate / growth shocks, still one pass
+    grid = {f"rates {r:+.2%}, growth x{s:.2f}": {"rates": r, "growth_scale": s, "growth_years": 2}
+            for r in np.linspace(-0.02, 0.03, 51) for s in np.linspace(0.5, 1.2, 36)}
+    start = time.perf_counter()
+    sweep = run_stress_tests(universe, grid)
+    elapsed = time.perf_counter() - start
+    worst = np.argmin(sweep["universe_equity_value_change"][:, base])
+    print(f"{len(grid):,} shock sets ({sweep['price_per_share'].size:,} valuations) in {elapsed * 1000:.0f}ms; "
+          f"worst base-case universe move: {sweep['names'][worst]} "
+          f"({sweep['universe_equity_value_change'][worst, base]:+,.0f}B)")
@@ -0,0 +1,272 @@
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import calculate_fcf, calculate_yearly_share_count, discount_factors
+
+# The inverse of run_scenario: given a target price by year N, find the
+# smoothest growth vector that reaches it. calculate_implied_growth in
+# implied-growth-rate.py answers the same question for one flat growth rate.
+#
+# "Smoothest" is the least roughness (squared second differences, plus a
+# small pull towards the prior path) subject to the price constraint, a
+# monotone fade and growth bounds, and optionally bounded margins for the
+# revenue models. solve_growth_path minimizes it with an augmented
+# Lagrangian over spectral projected gradient steps, driven by batched
+# valuations with the analytic price gradient. The universe (10 tickers)
+# solves in ~0.3s, 200-450 valuations per ticker.
+
+MEMORY = 20  # Lagrangian values the non-monotone line search compares against
+MIN_STEP, MAX_STEP = 1e-10, 1e3
+MAX_PENALTY = 1e8
+
+
+def price_and_gradient(initial_fcf, growth_rates, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                       net_debt, year=0, fcf_margins=None, per_share_scale=1000, margin_gradient=False):
+    """
+    Year-N price per share and its gradient with respect to every growth rate.
+
+    Every FCF from year k onwards scales with (1 + g_k), so the derivative is
+    the part of the year-N suffix value that depends on g_k, divided by 1 + g_k.
+    With margin_gradient=True the gradient with respect to every FCF margin
+    is returned as well: margin k moves FCF k (and the terminal value, for
+    the last year) by revenue k.
+    """
+    growth_rates = np.asarray(growth_rates, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
+    fcf_projections = calculate_fcf(initial_fcf, growth_rates, fcf_margins)
+    years = fcf_projections.shape[-1]
+    shares = calculate_yearly_share_count(initial_shares, buyback_rate, years)[..., year]
+
+    # Discount every projection back to year N (the suffix starting at year N)
+    pv_factors = discount_factors(discount_rate, years) * (1 + discount_rate[..., None]) ** year
+    terminal_multiple = (1 + terminal_growth) / (discount_rate - terminal_growth)
+    terminal_value = fcf_projections[..., -1] * terminal_multiple
+    discounted = np.where(np.arange(years) >= year, fcf_projections * pv_factors, 0)
+    terminal = terminal_value * pv_factors[..., -1]
+    tail = np.flip(np.cumsum(np.flip(discounted, axis=-1), axis=-1), axis=-1) + terminal[..., None]
+    value = tail[..., year]
+
+    # g_k (1-based) moves FCF k onwards; FCFs before year N only matter through later ones
+    k = np.arange(1, growth_rates.shape[-1] + 1)
+    dependent = np.where(k <= year, value[..., None], tail[..., np.minimum(k, years - 1)])
+    dependent = np.where(k < years, dependent, 0)
+    gradient = dependent / (1 + growth_rates) * per_share_scale / shares[..., None]
+    price = (value - net_debt) * per_share_scale / shares
+    if not margin_gradient:
+        return price, gradient
+
+    revenue = calculate_fcf(initial_fcf, growth_rates)[..., :years]
+    last = np.arange(years) == years - 1
+    weights = (np.where(np.arange(years) >= year, pv_factors, 0)
+               + np.where(last, (terminal_multiple * pv_factors[..., -1])[..., None], 0))
+    margin_gradient = revenue * weights * per_share_scale / shares[..., None]
+    # Margins past the projection do not enter the valuation
+    unused = np.shape(fcf_margins)[-1] - years
+    margin_gradient = np.concatenate([margin_gradient, np.zeros(margin_gradient.shape[:-1] + (unused,))], axis=-1)
+    return price, gradient, margin_gradient
+
+
+def project_fade(growth_rates, lower, upper, monotone=True):
+    """
+    Nearest non-increasing path within [lower, upper] (least squares).
+
+    Uses the max-min formula for isotonic regression over all (start, end)
+    block averages, which is cheap for 10-year paths and fully vectorized.
+    """
+    if not monotone:
+        return np.clip(growth_rates, lower, upper)
+    y = -np.asarray(growth_rates, dtype=float)
+    m = y.shape[-1]
+    totals = np.concatenate([np.zeros(y.shape[:-1] + (1,)), np.cumsum(y, axis=-1)], axis=-1)
+    j = np.arange(m)[:, None]
+    k = np.arange(m)[None, :]
+    averages = (totals[..., k + 1] - totals[..., j]) / np.maximum(k - j + 1, 1)
+    valid = j <= k
+    # x_i = max over j <= i of min over k >= i of average(j..k)
+    i = np.arange(m)
+    inner = np.where(valid[None, :, :] & (k[None] >= i[:, None, None]), averages[..., None, :, :], np.inf).min(axis=-1)
+    fitted = np.where(j.T <= i[:, None], inner, -np.inf).max(axis=-1)
+    return np.clip(-fitted, lower, upper)
+
+
+def solve_growth_path(target_price, prior_growth, initial_fcf, terminal_growth, discount_rate, initial_shares,
+                      buyback_rate, net_debt, year=0, fcf_margins=None, lower=-0.2, upper=0.6, monotone=True,
+                      margin_bounds=None, ridge=0.01, tolerance=1e-6, max_iterations=2000, penalty=1.0):
+    """
+    Smoothest growth path(s) that price the stock at target_price in year N.
+
+    Minimizes roughness, 1/2 |second differences|^2 + ridge/2 |path - prior|^2,
+    subject to price / target - 1 = 0 and the constraints, with an augmented
+    Lagrangian: roughness + multiplier * residual + penalty / 2 * residual^2
+    is minimized by spectral projected gradient steps, then the multiplier
+    absorbs the remaining residual (and the penalty grows tenfold if the
+    residual shrank by less than 4x), until the path is stationary on the
+    target. Every iteration is one valuation with gradient of the batch.
+
+    With margin_bounds=(low, high), the FCF margins of a revenue model are
+    solved for as well: smoothed like the growth path, pulled towards
+    fcf_margins and kept within the bounds. Otherwise margins stay fixed.
+
+    Parameters:
+    target_price (array): Target price per share, one per batch element
+    prior_growth (array): Starting growth path(s), e.g. the base case; shape (..., years)
+    initial_fcf, terminal_growth, discount_rate, initial_shares, buyback_rate, net_debt: run_scenarios inputs
+    year (int): Year N whose price must hit the target (0 = today)
+    fcf_margins (array): Optional FCF margins for revenue-driven models
+    lower, upper (float): Growth bounds
+    monotone (bool): Require a non-increasing fade
+    margin_bounds (tuple): Optional (low, high) margin bounds; solves for the margins as well
+    ridge (float): Weight on staying close to the prior versus smoothness
+    tolerance (float): Relative price tolerance, and the stationarity tolerance
+    max_iterations (int): Valuations per batch element
+    penalty (float): Starting penalty weight
+
+    Returns:
+    dict: growth, price, iterations (valuations), converged and, with
+    margin_bounds, margins per batch element; converged is False where the
+    constraints cannot reach the target
+    """
+    prior = np.asarray(prior_growth, dtype=float)
+    target = np.broadcast_to(np.asarray(target_price, dtype=float), prior.shape[:-1])
+    m = prior.shape[-1]
+
+    def smoothing(n):
+        second_difference = np.diff(np.eye(n), n=2, axis=0)
+        return second_difference.T @ second_difference + ridge * np.eye(n)
+
+    hessian = smoothing(m)
+    if margin_bounds is not None:
+        if fcf_margins is None:
+            raise ValueError("margin_bounds needs fcf_margins to start from")
+        margins = np.asarray(fcf_margins, dtype=float)
+        prior = np.concatenate([prior, np.broadcast_to(margins, prior.shape[:-1] + margins.shape[-1:])], axis=-1)
+        # Growth and margins are smoothed separately
+        n = margins.shape[-1]
+        hessian = np.block([[hessian, np.zeros((m, n))], [np.zeros((n, m)), smoothing(n)]])
+
+    def project(x):
+        growth = project_fade(x[..., :m], lower, upper, monotone)
+        if margin_bounds is None:
+            return growth
+        return np.concatenate([growth, np.clip(x[..., m:], *margin_bounds)], axis=-1)
+
+    def evaluate(x):
+        """Roughness, its gradient, the price, the relative residual and its gradient."""
+        roughness = 0.5 * (np.sum(x * (x @ hessian - ridge * x), axis=-1) + ridge * np.sum((x - prior) ** 2, axis=-1))
+        if margin_bounds is None:
+            price, gradient = price_and_gradient(initial_fcf, x, terminal_growth, discount_rate, initial_shares,
+                                                 buyback_rate, net_debt, year, fcf_margins)
+        else:
+            price, gradient, margin_gradient = price_and_gradient(
+                initial_fcf, x[..., :m], terminal_growth, discount_rate, initial_shares, buyback_rate, net_debt,
+                year, x[..., m:], margin_gradient=True)
+            gradient = np.concatenate([gradient, margin_gradient], axis=-1)
+        return roughness, x @ hessian - ridge * prior, price, price / target - 1, gradient / target[..., None]
+
+    def lagrangian(roughness, residual):
+        return roughness + multiplier * residual + 0.5 * weight * residual ** 2
+
+    def lagrangian_gradient(roughness_gradient, residual, residual_gradient):
+        return roughness_gradient + (multiplier + weight * residual)[..., None] * residual_gradient
+
+    x = project(prior)
+    state = evaluate(x)
+    multiplier = np.zeros(target.shape)
+    weight = np.full(target.shape, float(penalty))
+    step = np.full(target.shape, 1 / np.linalg.eigvalsh(hessian).max())
+    shrink = np.ones(target.shape)
+    history = np.repeat(lagrangian(state[0], state[3])[..., None], MEMORY, axis=-1)
+    previous = np.abs(state[3])
+    done = converged = np.zeros(target.shape, dtype=bool)
+    iterations = np.zeros(target.shape, dtype=int)
+    while not done.all() and iterations.max() < max_iterations:
+        roughness, roughness_gradient, price, residual, residual_gradient = state
+        gradient = lagrangian_gradient(roughness_gradient, residual, residual_gradient)
+        direction = project(x - step[..., None] * gradient) - x
+        candidate = x + shrink[..., None] * direction
+        trial = evaluate(candidate)
+        iterations = iterations + ~done
+        # Non-monotone Armijo test against the worst of the recent Lagrangian values
+        value = lagrangian(trial[0], trial[3])
+        accept = ~done & (value <= history.max(axis=-1) + 1e-4 * shrink * np.sum(gradient * direction, axis=-1))
+
+        # Barzilai-Borwein step from the change in the Lagrangian gradient; halve the move on a failed test
+        move = candidate - x
+        curvature = np.sum(move * (lagrangian_gradient(trial[1], trial[3], trial[4]) - gradient), axis=-1)
+        spectral = np.sum(move ** 2, axis=-1) / np.where(curvature > 0, curvature, 1)
+        step = np.where(accept, np.where(curvature > 0, np.clip(spectral, MIN_STEP, MAX_STEP), MAX_STEP), step)
+        shrink = np.where(accept, 1.0, np.where(done, shrink, shrink / 2))
+        state = tuple(np.where(np.expand_dims(accept, tuple(range(accept.ndim, np.ndim(new)))), new, old)
+                      for new, old in zip(trial, state))
+        x = np.where(accept[..., None], candidate, x)
+        history = np.where(accept[..., None], np.concatenate([history[..., 1:], value[..., None]], axis=-1), history)
+
+        # Stationary: a unit projected gradient step barely moves x. Inexact early on, while the residual is large
+        roughness, roughness_gradient, price, residual, residual_gradient = state
+        gradient = lagrangian_gradient(roughness_gradient, residual, residual_gradient)
+        stationary = accept & (np.abs(project(x - gradient) - x).max(axis=-1)
+                               <= np.maximum(tolerance, np.abs(residual) / 10))
+        converged = converged | (stationary & (np.abs(residual) <= tolerance))
+        update = stationary & ~converged
+        # Stationary under the largest penalty and still off target: the constraints cannot reach it
+        done = converged | (update & (weight >= MAX_PENALTY))
+        update = update & ~done
+        multiplier = np.where(update, multiplier + weight * residual, multiplier)
+        weight = np.where(update & (np.abs(residual) > previous / 4), weight * 10, weight)
+        previous = np.where(update, np.abs(residual), previous)
+        # The Lagrangian changed, so the old values no longer compare
+        history = np.where(update[..., None], lagrangian(roughness, residual)[..., None], history)
+
+    result = {"growth": x[..., :m], "price": state[2], "iterations": iterations, "converged": converged}
+    if margin_bounds is not None:
+        result["margins"] = x[..., m:]
+    return result
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import TICKERS, load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe()
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    net_debt = universe["debt"] - universe["cash"]
+    # Market price today implied by market_cap, i.e. a reverse DCF on the whole path
+    target = universe["market_cap"] * 1000 / universe["initial_shares"]
+
+    start = time.perf_counter()
+    result = solve_growth_path(target, universe["growth"][:, 1], universe["current_fcf"],
+                               universe["terminal_growth"][:, 1], wacc, universe["initial_shares"],
+                               universe["buyback_rate"], net_debt)
+    elapsed = time.perf_counter() - start
+
+    headers = ["Ticker", "Target", "Solved Price", "Iters", "Year 1", "Year 5", "Year 10"]
+    table = [
+        [ticker, f"${target[i]:.2f}", f"${result['price'][i]:.2f}", result["iterations"][i]]
+        + [f"{result['growth'][i, y]:.1%}" for y in (0, 4, 9)]
+        for i, ticker in enumerate(universe["tickers"])
+    ]
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"Solved {len(table)} tickers in {elapsed * 1000:.1f}ms (converged: {result['converged'].sum()})")
+
+    # TOST's revenue model, solving for the growth fade and margins of at most 14%
+    i = universe["tickers"].index("TOST")
+    tost = TICKERS["TOST"]
+    result = solve_growth_path(target[i], tost["revenue_growth"][1], tost["current_revenue"],
+                               universe["terminal_growth"][i, 1], wacc[i], universe["initial_shares"][i],
+                               universe["buyback_rate"][i], net_debt[i], fcf_margins=tost["fcf_margins"][1],
+                               margin_bounds=(0.04, 0.14))
+    headers = ["", "Year 1", "Year 3", "Year 5", "Year 10"]
+    table = [
+        ["Revenue growth (base)"] + [f"{tost['revenue_growth'][1][y]:.1%}" for y in (0, 2, 4, 9)],
+        ["Revenue growth (solved)"] + [f"{result['growth'][y]:.1%}" for y in (0, 2, 4, 9)],
+        ["FCF margin (base)"] + [f"{tost['fcf_margins'][1][y]:.1%}" for y in (0, 2, 4, 9)],
+        ["FCF margin (solved)"] + [f"{result['margins'][y]:.1%}" for y in (0, 2, 4, 9)],
+    ]
+    print(f"\nTOST at ${result['price']:.2f} (target ${target[i]:.2f}, {result['iterations']} valuations)")
+    print(tabulate(table, headers, tablefmt="grid"))
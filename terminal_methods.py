@@ -0,0 +1,151 @@
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import SCENARIOS, calculate_fcf, gordon_terminal_value, run_scenarios
+
+# Terminal value methods besides Gordon growth, valued side by side.
+#
+#   gordon       FCF_N * (1 + g) / (r - g), explodes as r approaches g
+#   exit_fcf     EV/FCF multiple * FCF_N
+#   exit_ebitda  EV/EBITDA multiple * EBITDA_N (given, or FCF_N / FCF conversion)
+#   blended      weighted average of the above
+#
+# The terminal values are stacked on a leading method axis and passed to
+# run_scenarios as one batch, so every method is valued for every ticker and
+# scenario in the same pass. Each method's EV is compared with Gordon's, and
+# each terminal value is translated into the perpetual growth it implies, so
+# scenarios where the methods disagree by more than a threshold, or where
+# r - g is too thin to trust, are flagged with no extra per-scenario work.
+
+METHODS = ("gordon", "exit_fcf", "exit_ebitda", "blended")
+
+# Example exit multiples by sector: (EV/FCF, EV/EBITDA)
+SECTOR_MULTIPLES = {
+    "Technology": (25.0, 18.0),
+    "Communication Services": (20.0, 12.0),
+    "Financials": (24.0, 20.0),
+    "Consumer Discretionary": (20.0, 15.0),
+}
+
+
+def terminal_values(final_fcf, terminal_growth, discount_rate, fcf_multiple=None, ebitda_multiple=None,
+                    final_ebitda=None, fcf_conversion=None, blend=None):
+    """
+    Terminal values at the final projection year, one row per method.
+
+    Parameters:
+    final_fcf (array): FCF in the final projection year
+    terminal_growth (array): Perpetual growth for Gordon growth
+    discount_rate (array): Discount rate (WACC)
+    fcf_multiple (array): Optional exit EV/FCF multiple
+    ebitda_multiple (array): Optional exit EV/EBITDA multiple
+    final_ebitda (array): EBITDA in the final year; defaults to final_fcf / fcf_conversion
+    fcf_conversion (array): FCF as a fraction of EBITDA
+    blend (dict): Method -> weight for the blended value; equal weights over
+        the available methods by default
+
+    Returns:
+    (tuple, array): method names and terminal values of shape (methods, ...)
+    """
+    final_fcf = np.asarray(final_fcf, dtype=float)
+    values = {"gordon": gordon_terminal_value(final_fcf, terminal_growth, discount_rate)}
+    if fcf_multiple is not None:
+        values["exit_fcf"] = np.asarray(fcf_multiple, dtype=float) * final_fcf
+    if ebitda_multiple is not None:
+        if final_ebitda is None:
+            if fcf_conversion is None:
+                raise ValueError("EV/EBITDA exit needs final_ebitda or fcf_conversion")
+            final_ebitda = final_fcf / np.asarray(fcf_conversion, dtype=float)
+        values["exit_ebitda"] = np.asarray(ebitda_multiple, dtype=float) * final_ebitda
+    if len(values) > 1:
+        weights = blend or {method: 1.0 for method in values}
+        unknown = set(weights) - set(values)
+        if unknown:
+            raise ValueError(f"Blend weights for methods without inputs: {sorted(unknown)}")
+        total = sum(weights.values())
+        values["blended"] = sum(weight / total * values[method] for method, weight in weights.items())
+
+    methods = tuple(method for method in METHODS if method in values)
+    return methods, np.stack(np.broadcast_arrays(*[values[method] for method in methods]))
+
+
+def compare_terminal_methods(initial_fcf, growth_rates, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                             net_debt, fcf_multiple=None, ebitda_multiple=None, final_ebitda=None,
+                             fcf_conversion=None, blend=None, threshold=0.25, min_spread=0.02, fcf_margins=None):
+    """
+    run_scenarios under every terminal value method at once, with cross-checks.
+
+    Takes run_scenarios' inputs plus the terminal_values options.
+    threshold is the largest tolerated |EV / Gordon EV - 1| of any exit
+    method; min_spread the smallest discount_rate - terminal_growth trusted.
+
+    Returns:
+    dict: methods, result (run_scenarios output with a leading method axis),
+    terminal_value (methods, ...), deviation (EV / Gordon EV - 1 per method),
+    implied_terminal_growth (the perpetual growth each terminal value implies),
+    implied_fcf_multiple (the EV/FCF Gordon growth implies), disagree and
+    near_singular flags
+    """
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
+    final_fcf = calculate_fcf(initial_fcf, growth_rates, fcf_margins)[..., -1]
+    methods, values = terminal_values(final_fcf, terminal_growth, discount_rate, fcf_multiple, ebitda_multiple,
+                                      final_ebitda, fcf_conversion, blend)
+    result = run_scenarios(initial_fcf, growth_rates, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                           net_debt, fcf_margins, terminal_value=values)
+
+    deviation = result["ev"] / result["ev"][0] - 1
+    exits = [i for i, method in enumerate(methods) if method.startswith("exit_")]
+    spread = np.abs(deviation[exits]).max(axis=0) if exits else np.zeros(deviation.shape[1:])
+    return {
+        "methods": methods,
+        "result": result,
+        "terminal_value": values,
+        "deviation": deviation,
+        # TV = FCF_N (1 + g) / (r - g) solved for g
+        "implied_terminal_growth": (values * discount_rate - final_fcf) / (values + final_fcf),
+        "implied_fcf_multiple": values[0] / final_fcf,
+        "disagree": spread > threshold,
+        "near_singular": np.broadcast_to(discount_rate - terminal_growth < min_spread, spread.shape)
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import SECTORS, load_universe, wacc_cash
+    from valuation_core import calculate_wacc
+
+    universe = load_universe()
+    tickers = universe["tickers"]
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    fcf_multiple, ebitda_multiple = np.array([SECTOR_MULTIPLES[SECTORS[t]] for t in tickers]).T
+    # Illustrative FCF / EBITDA conversion per ticker
+    fcf_conversion = np.array([{"DPZ": 0.55, "TOST": 0.6, "ZM": 0.8}.get(t, 0.7) for t in tickers])
+
+    comparison = compare_terminal_methods(universe["initial_fcf"], universe["growth"], universe["terminal_growth"],
+                                          wacc[:, None], universe["initial_shares"][:, None],
+                                          universe["buyback_rate"][:, None],
+                                          (universe["debt"] - universe["cash"])[:, None],
+                                          fcf_multiple=fcf_multiple[:, None], ebitda_multiple=ebitda_multiple[:, None],
+                                          fcf_conversion=fcf_conversion[:, None])
+    methods = comparison["methods"]
+    prices = comparison["result"]["yearly_share_prices"][..., 0]
+
+    for s, scenario in enumerate(SCENARIOS):
+        headers = [scenario, "WACC - g"] + [f"Price ({m})" for m in methods] + ["Gordon EV/FCF", "Flags"]
+        table = []
+        for t, ticker in enumerate(tickers):
+            flags = [name for name, key in (("disagree", "disagree"), ("r-g thin", "near_singular"))
+                     if comparison[key][t, s]]
+            table.append([ticker, f"{wacc[t] - universe['terminal_growth'][t, s]:.2%}"]
+                         + [f"${prices[m, t, s]:.2f}" for m in range(len(methods))]
+                         + [f"{comparison['implied_fcf_multiple'][t, s]:.1f}x", ", ".join(flags)])
+        print(tabulate(table, headers, tablefmt="grid"))
+
+    # Perpetual growth implied by each exit multiple, base case
+    implied = comparison["implied_terminal_growth"][:, :, 1]
+    headers = ["Base Case"] + [f"g implied ({m})" for m in methods]
+    print(tabulate([[t] + [f"{implied[m, i]:.2%}" for m in range(len(methods))] for i, t in enumerate(tickers)],
+                   headers, tablefmt="grid"))
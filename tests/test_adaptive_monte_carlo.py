@@ -0,0 +1,35 @@
+import numpy as np
+
+from adaptive_monte_carlo import QuantileSketch, percentile_intervals
+
+
+def sketch_of(values, relative_accuracy=0.002):
+    sketch = QuantileSketch(relative_accuracy)
+    sketch.add(values)
+    return sketch
+
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(4, 0.3, 200000)
+    values[:1000] *= -1
+    sketch = sketch_of(values)
+    q = np.array([0.001, 0.05, 0.5, 0.95, 0.999])
+    exact = np.quantile(values, q)
+    assert (np.abs(sketch.quantile(q) / exact - 1) <= 2 * sketch.relative_accuracy).all()
+
+
+def test_estimates_move_within_buckets():
+    values = np.random.default_rng(1).normal(100, 10, 100000)
+    sketch = sketch_of(values, relative_accuracy=0.01)
+    estimate, lower, upper = percentile_intervals(sketch, [5, 50, 95])
+    assert (lower < estimate).all() and (estimate < upper).all()
+    # Neighbouring ranks in one bucket give distinct, increasing values
+    steps = np.diff(sketch.quantile(np.linspace(0.5, 0.5001, 5)))
+    assert (steps > 0).all()
+
+
+def test_merge_matches_single_sketch():
+    values = np.random.default_rng(2).lognormal(3, 0.5, 50000)
+    merged = sketch_of(values[:20000]).merge(sketch_of(values[20000:]))
+    q = np.linspace(0.01, 0.99, 9)
+    np.testing.assert_allclose(merged.quantile(q), sketch_of(values).quantile(q))
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from bootstrap_growth import block_bootstrap, historical_growth
+
+
+def test_non_positive_years_become_nan_in_place():
+    growth = historical_growth([1.0, 2.0, -1.0, 3.0, 6.0, 9.0])
+    np.testing.assert_allclose(growth, [1.0, np.nan, np.nan, 1.0, 0.5])
+
+
+def test_blocks_skip_unknown_years_and_gaps():
+    history = np.array([0.1, 0.2, np.nan, 0.3, 0.4, 0.5])
+    paths = block_bootstrap([history], 2000, years=9, block_length=3, seed=0)[0]
+    assert np.isfinite(paths).all()
+    # Only the blocks starting at 0.3, 0.4 or 0.5 avoid the gap (circularly)
+    blocks = {tuple(block) for block in np.round(paths.reshape(-1, 3), 2)}
+    assert blocks == {(0.3, 0.4, 0.5), (0.4, 0.5, 0.1), (0.5, 0.1, 0.2)}
+
+
+def test_complete_history_draws_every_start():
+    history = np.array([0.01, 0.02, 0.03, 0.04])
+    paths = block_bootstrap([history], 1000, years=4, block_length=2, seed=1)[0]
+    assert set(np.round(paths[:, 0], 2)) == {0.01, 0.02, 0.03, 0.04}
+
+
+def test_history_without_a_complete_block_is_rejected():
+    with pytest.raises(ValueError, match="consecutive known growth rates"):
+        block_bootstrap([np.array([0.1, np.nan, 0.2, np.nan])], 10, block_length=2)
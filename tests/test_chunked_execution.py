@@ -0,0 +1,41 @@
+import numpy as np
+
+from chunked_execution import run_scenarios_chunked
+from universe import load_universe, wacc_cash
+from valuation_core import calculate_wacc, run_scenarios
+
+
+def msft_args(rates, growth=None):
+    universe = load_universe(["MSFT"])
+    growth = universe["growth"][0, 1] if growth is None else growth
+    return (universe["initial_fcf"][0, 1], growth, universe["terminal_growth"][0, 1], rates,
+            universe["initial_shares"][0], universe["buyback_rate"][0], universe["debt"][0] - universe["cash"][0])
+
+
+def msft_wacc():
+    universe = load_universe(["MSFT"])
+    return calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])[0]
+
+
+def test_shared_growth_path_over_several_chunks():
+    rates = msft_wacc() + np.random.default_rng(0).normal(0, 0.005, 5000)
+    args = msft_args(rates)
+    shared = run_scenarios_chunked(*args, memory_budget=2**20, outputs=("equity_value", "yearly_share_prices"))
+    assert shared["plan"]["n_chunks"] > 1
+    expected = run_scenarios(*args[:3], rates[:, None], *args[4:])
+    np.testing.assert_allclose(shared["equity_value"], expected["equity_value"][:, 0])
+    np.testing.assert_allclose(shared["yearly_share_prices"], expected["yearly_share_prices"][:, 0])
+
+
+def test_per_path_growth_matches_run_scenarios():
+    rng = np.random.default_rng(1)
+    base_growth = load_universe(["MSFT"])["growth"][0, 1]
+    growth = base_growth + rng.normal(0, 0.02, (3000, base_growth.shape[0]))
+    args = msft_args(msft_wacc() + rng.normal(0, 0.005, 3000), growth)
+    chunked = run_scenarios_chunked(*args, memory_budget=2**20, outputs=("equity_value", "final_price_per_share"))
+    assert chunked["plan"]["n_chunks"] > 1
+    expected = run_scenarios(*args)
+    np.testing.assert_allclose(chunked["equity_value"], expected["equity_value"])
+    np.testing.assert_allclose(chunked["final_price_per_share"], expected["final_price_per_share"])
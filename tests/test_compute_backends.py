@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import valuation_core
+from compute_backends import BACKENDS, cross_check, growth_valuation, select_backend, yearly_dcf_valuations
+from universe import load_universe, wacc_cash
+
+
+def msft_scenarios():
+    universe = load_universe(["MSFT"])
+    wacc = valuation_core.calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                                         universe["market_cap"], universe["debt"], wacc_cash(universe),
+                                         cost_of_debt=universe["cost_of_debt"])[0]
+    return (universe["initial_fcf"][0].tolist(), universe["growth"][0].tolist(),
+            universe["terminal_growth"][0].tolist(), wacc)
+
+
+def test_three_scenarios_dispatch_to_python_and_match_numpy():
+    scenarios = msft_scenarios()
+    assert select_backend(3).name == "python"
+    np.testing.assert_allclose(growth_valuation(*scenarios), growth_valuation(*scenarios, backend="numpy"),
+                               rtol=1e-12)
+
+
+def test_backends_agree():
+    report = cross_check(n_paths=200)
+    assert set(report) == set(BACKENDS)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_yearly_kernel_broadcasts_like_numpy(backend):
+    rng = np.random.default_rng(1)
+    fcf = valuation_core.calculate_fcf(rng.uniform(1, 50, (4, 1)), rng.uniform(-0.1, 0.3, (4, 1, 10)))
+    terminal_growth, discount_rate = np.array([0.02, 0.03, 0.04]), rng.uniform(0.07, 0.12, (4, 1))
+    expected = valuation_core.yearly_dcf_valuations(fcf, terminal_growth, discount_rate)
+    np.testing.assert_allclose(yearly_dcf_valuations(fcf, terminal_growth, discount_rate, backend=backend),
+                               expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("paths", [1, 3, 100, 5000])
+def test_run_scenarios_matches_numpy_at_every_size(paths):
+    rng = np.random.default_rng(paths)
+    growth = rng.uniform(-0.1, 0.3, (paths, 10))
+    discount_rate = rng.uniform(0.07, 0.12, paths)
+    result = valuation_core.run_scenarios(20.0, growth, 0.03, discount_rate, 1000.0, 0.01, 5.0)
+    fcf = valuation_core.calculate_fcf(20.0, growth)
+    yearly_ev = valuation_core.yearly_dcf_valuations(fcf, 0.03, discount_rate)
+    np.testing.assert_allclose(result["ev"], yearly_ev[..., 0], rtol=1e-12)
+    np.testing.assert_allclose(result["yearly_share_prices"],
+                               (yearly_ev - 5.0) * 1000 / result["share_count"], rtol=1e-12)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from growth_dsl import GrowthCurve, compile_curve
+
+
+def test_fade_starts_from_last_pinned_value():
+    path = GrowthCurve("start 22%, pin first 2 years at 5%, 6%, fade linearly to 15% by year 11")(11)[0]
+    np.testing.assert_allclose(path[:2], [0.05, 0.06])
+    # One ninth of the way from 6% to 15% in year 3
+    np.testing.assert_allclose(path[2], 0.07)
+    np.testing.assert_allclose(path[-1], 0.15)
+
+
+def test_pin_without_values_holds_start():
+    path = GrowthCurve("start 30% pin first 3 years; fade linearly to 8% by year 10")(10)[0]
+    np.testing.assert_allclose(path[:3], 0.30)
+    np.testing.assert_allclose(path[-1], 0.08)
+
+
+@pytest.mark.parametrize("half_life", ["0", "-2", "{2, 0}"])
+def test_non_positive_half_life_is_rejected(half_life):
+    with pytest.raises(ValueError, match="Half-life must be positive"):
+        GrowthCurve(f"start 20% exponential decay half-life {half_life}")
+
+
+def test_curve_without_a_level_says_what_is_missing():
+    with pytest.raises(ValueError, match="needs a level to start from"):
+        GrowthCurve("exponential decay half-life 3y")
+
+
+def test_exponential_decay_halves_the_gap_each_half_life():
+    path = GrowthCurve("start 37.7% exponential decay to 5% half-life 3y")(10)[0]
+    np.testing.assert_allclose(path[[0, 3, 6]] - 0.05, [0.327, 0.1635, 0.08175])
+
+
+def test_unparsed_text_is_rejected():
+    with pytest.raises(ValueError, match="Could not parse"):
+        GrowthCurve("start 22% fade quickly to 11% by year 10")
+
+
+def test_sweeps_compile_to_every_combination_and_are_cached():
+    curve = compile_curve("start 22% fade linearly to {9%, 11%, 13%} by year {8, 10}")
+    assert curve(10).shape == (6, 10)
+    assert compile_curve("start 22% fade linearly to {9%, 11%, 13%} by year {8, 10}") is curve
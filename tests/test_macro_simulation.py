@@ -0,0 +1,21 @@
+import numpy as np
+
+from macro_simulation import FACTOR_VOLATILITY, simulate_universe
+from universe import load_universe
+
+
+def test_floored_paths_are_reported():
+    universe = load_universe()
+    # Large rate shocks push some WACCs below terminal growth
+    result = simulate_universe(universe, n_paths=2000, volatility=FACTOR_VOLATILITY * 6, min_spread=0.005, seed=0)
+    floored = result["wacc_floored"]
+    assert floored.shape == result["wacc"].shape == (len(universe["tickers"]), 2000)
+    assert floored.any() and not floored.all()
+    floor = universe["terminal_growth"][:, 1, None] + 0.005
+    np.testing.assert_allclose(result["wacc"][floored], np.broadcast_to(floor, floored.shape)[floored])
+    assert (result["wacc"][~floored] >= np.broadcast_to(floor, floored.shape)[~floored]).all()
+
+
+def test_nothing_floored_under_default_volatility():
+    result = simulate_universe(load_universe(), n_paths=2000, seed=0)
+    assert not result["wacc_floored"].any()
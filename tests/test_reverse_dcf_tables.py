@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from reverse_dcf_tables import build_tables, ev_multiple, open_tables
+from valuation_core import calculate_implied_growth
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    return open_tables(build_tables(str(tmp_path_factory.mktemp("tables")), horizons=(5, 10)))
+
+
+def test_lookup_matches_bisection(tables):
+    lookup = tables.implied_growth(600, -16.3, 19, 10, 0.03, 0.095)
+    assert abs(lookup - calculate_implied_growth(600, -16.3, 19, 10, 0.03, 0.095)) < 1e-4
+
+
+# q = 0.55 / 1.6 is below the grid; 25 years is not tabulated
+@pytest.mark.parametrize("growth, discount_rate, years", [(-0.45, 0.6, 10), (0.08, 0.095, 25)])
+def test_scalar_inputs_round_trip_through_fallback(tables, growth, discount_rate, years):
+    ev = 19 * ev_multiple(growth, discount_rate, 0.02, years)
+    assert np.isnan(tables.implied_growth(ev, 0, 19, years, 0.02, discount_rate))
+    solved, fell_back = tables.implied_growth(ev, 0, 19, years, 0.02, discount_rate, fallback=True)
+    assert solved.shape == fell_back.shape == ()
+    assert fell_back
+    assert abs(solved - growth) < 1e-4
+
+
+def test_fallback_mask_marks_only_elements_outside_the_tables(tables):
+    growth = np.array([0.05, -0.45])
+    discount_rate = np.array([0.095, 0.6])
+    ev = 19 * ev_multiple(growth, discount_rate, 0.02, 10)
+    solved, fell_back = tables.implied_growth(ev, 0, 19, 10, 0.02, discount_rate, fallback=True)
+    np.testing.assert_array_equal(fell_back, [False, True])
+    np.testing.assert_allclose(solved, growth, atol=1e-4)
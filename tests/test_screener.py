@@ -0,0 +1,33 @@
+import numpy as np
+
+from screener import ValuationIndex
+
+
+def build(tickers, values, sectors=None):
+    index = ValuationIndex(metrics=("upside",))
+    index.update(tickers, {"upside": np.asarray(values, dtype=float)}, sectors)
+    return index
+
+
+def test_duplicate_ticker_keeps_last_value():
+    index = build(["A", "B", "A"], [0.5, 0.2, -0.1], ["Tech", "Tech", "Energy"])
+    assert index.top_k("upside", k=5) == [("B", 0.2), ("A", -0.1)]
+    assert len(index.order["upside"]) == len(index) == 2
+    assert index.sectors[index.row_of["A"]] == "Energy"
+
+
+def test_duplicate_ticker_on_refresh():
+    index = build(["A", "B"], [0.5, 0.2])
+    assert index.update(["A", "A"], {"upside": np.array([0.1, 0.9])}) == 1
+    assert index.top_k("upside", k=5) == [("A", 0.9), ("B", 0.2)]
+    np.testing.assert_array_equal(index.sorted_values["upside"], [0.2, 0.9])
+
+
+def test_range_query_matches_scan():
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i}" for i in range(200)]
+    index = build(tickers, rng.normal(size=200))
+    index.update(tickers[::3], {"upside": rng.normal(size=len(tickers[::3]))})
+    values = index.values["upside"]
+    expected = sorted((values[i], tickers[i]) for i in range(200) if -0.5 <= values[i] <= 0.5)
+    assert [t for t, _ in index.range_query("upside", -0.5, 0.5)] == [t for _, t in expected]
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from share_dilution import share_count_schedule
+from valuation_core import calculate_yearly_share_count
+
+
+def test_constant_rate_matches_calculate_yearly_share_count():
+    constant = share_count_schedule(562.0, 11, buyback_rate=-0.02)["share_count"]
+    np.testing.assert_allclose(constant, calculate_yearly_share_count(562.0, -0.02, 11))
+
+
+def test_unvested_pool_year_zero_tranche_vests_in_year_one():
+    pool = share_count_schedule(100.0, 4, vesting=(0.5, 0.5), unvested=10.0)
+    np.testing.assert_allclose(pool["share_count"], [100.0, 110.0, 110.0, 110.0])
+    np.testing.assert_allclose(pool["vested"].sum(), 10.0)
+
+
+@pytest.mark.parametrize("buyback_rate", [1.0, 1.5, [0.0, 0.0, 1.0]])
+def test_buyback_rate_of_one_or_more_is_rejected(buyback_rate):
+    with pytest.raises(ValueError, match="below 1"):
+        share_count_schedule(100.0, 4, buyback_rate=buyback_rate)
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from target_growth_path import price_and_gradient, solve_growth_path
+from universe import TICKERS
+from valuation_core import calculate_wacc, run_scenarios
+
+TOST = TICKERS["TOST"]
+WACC = calculate_wacc(TOST["risk_free_rate"], TOST["market_return"], TOST["beta"], TOST["market_cap"], TOST["debt"],
+                      TOST["cash"], cost_of_debt=TOST["cost_of_debt"])
+TARGET = TOST["market_cap"] * 1000 / TOST["initial_shares"]
+GROWTH = np.array(TOST["revenue_growth"][1])
+MARGINS = np.array(TOST["fcf_margins"][1])
+INPUTS = (TOST["current_revenue"], TOST["terminal_growth"][1], WACC, TOST["initial_shares"], TOST["buyback_rate"],
+          TOST["debt"] - TOST["cash"])
+
+
+def solve(target=TARGET, **options):
+    return solve_growth_path(target, GROWTH, *INPUTS, fcf_margins=MARGINS, **options)
+
+
+def year_price(result, year=0):
+    margins = result.get("margins", MARGINS)
+    initial, terminal_growth, wacc, shares, buyback_rate, net_debt = INPUTS
+    return run_scenarios(initial, result["growth"], terminal_growth, wacc, shares, buyback_rate, net_debt,
+                         fcf_margins=margins)["yearly_share_prices"][year]
+
+
+@pytest.mark.parametrize("year", [0, 3])
+def test_gradients_match_finite_differences(year):
+    def price(growth, margins):
+        return price_and_gradient(INPUTS[0], growth, *INPUTS[1:], year, margins)[0]
+
+    _, growth_gradient, margin_gradient = price_and_gradient(INPUTS[0], GROWTH, *INPUTS[1:], year, MARGINS,
+                                                             margin_gradient=True)
+    h = 1e-6
+    bumps = np.eye(len(GROWTH)) * h
+    numeric = [(price(GROWTH + b, MARGINS) - price(GROWTH - b, MARGINS)) / (2 * h) for b in bumps]
+    np.testing.assert_allclose(growth_gradient, numeric, rtol=1e-6, atol=1e-6)
+    numeric = [(price(GROWTH, MARGINS + b) - price(GROWTH, MARGINS - b)) / (2 * h) for b in bumps]
+    np.testing.assert_allclose(margin_gradient, numeric, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize("year", [0, 3])
+def test_solved_path_hits_target_within_constraints(year):
+    result = solve(year=year, lower=-0.1, upper=0.3)
+    assert result["converged"]
+    assert year_price(result, year) == pytest.approx(TARGET, rel=1e-6)
+    assert np.all(np.diff(result["growth"]) <= 1e-12)
+    assert result["growth"].min() >= -0.1 and result["growth"].max() <= 0.3
+
+
+def test_unconstrained_optimum_is_stationary():
+    # Without active bounds, roughness gradient and price gradient must be parallel (KKT)
+    ridge = 0.01
+    result = solve(1.5 * TARGET, monotone=False, lower=-1.0, upper=2.0, ridge=ridge, tolerance=1e-9,
+                   max_iterations=20000)
+    assert result["converged"]
+    growth = result["growth"]
+    second_difference = np.diff(np.eye(len(growth)), n=2, axis=0)
+    roughness_gradient = second_difference.T @ second_difference @ growth + ridge * (growth - GROWTH)
+    _, price_gradient = price_and_gradient(INPUTS[0], growth, *INPUTS[1:], 0, MARGINS)
+    # The last growth rate does not enter a margin model's price: only smoothness pulls on it
+    used = slice(0, len(growth) - 1)
+    cosine = roughness_gradient[used] @ price_gradient[used] / (
+        np.linalg.norm(roughness_gradient[used]) * np.linalg.norm(price_gradient[used]))
+    assert abs(cosine) == pytest.approx(1, abs=1e-6)
+
+
+def test_smoother_than_shifting_the_prior():
+    result = solve(1.3 * TARGET)
+    growth = result["growth"]
+
+    def roughness(path):
+        return 0.5 * (np.sum(np.diff(path, n=2) ** 2) + 0.01 * np.sum((path - GROWTH) ** 2))
+
+    # A parallel shift of the prior that hits the same target
+    low, high = 0.0, 0.5
+    for _ in range(100):
+        shift = (low + high) / 2
+        if year_price({"growth": GROWTH + shift}) < 1.3 * TARGET:
+            low = shift
+        else:
+            high = shift
+    assert roughness(growth) < roughness(GROWTH + shift)
+
+
+def test_margin_bounds():
+    result = solve(1.4 * TARGET, margin_bounds=(0.04, 0.14))
+    assert result["converged"]
+    assert year_price(result) == pytest.approx(1.4 * TARGET, rel=1e-6)
+    assert result["margins"].min() >= 0.04 and result["margins"].max() <= 0.14
+    assert not np.allclose(result["margins"], MARGINS)
+
+
+def test_margin_bounds_need_margins():
+    with pytest.raises(ValueError, match="fcf_margins"):
+        solve_growth_path(TARGET, GROWTH, *INPUTS, margin_bounds=(0.04, 0.14))
+
+
+def test_unreachable_target_stops_at_the_bound():
+    result = solve(50 * TARGET, upper=0.3)
+    assert not result["converged"]
+    # The last growth rate does not enter a margin model's price
+    np.testing.assert_allclose(result["growth"][:-1], 0.3)
+    assert result["iterations"] < 2000
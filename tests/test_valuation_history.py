@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from valuation_history import RECORD, ValuationHistory
+
+
+def records(ticker, wacc, count=2):
+    rows = np.zeros(count, dtype=RECORD)
+    rows["ticker"] = ticker
+    rows["wacc"] = wacc
+    rows["timestamp"] = np.datetime64("2024-01-01T00:00:00") + np.arange(count)
+    return rows
+
+
+def test_append_after_torn_record_keeps_records_aligned(tmp_path):
+    history = ValuationHistory(str(tmp_path))
+    history.append(records("AAA", 0.1))
+    with open(os.path.join(tmp_path, history.manifest["log"]), "ab") as f:
+        f.write(b"x" * 50)
+
+    reopened = ValuationHistory(str(tmp_path))
+    assert len(reopened) == 2
+    reopened.append(records("BBB", 0.2))
+
+    log = ValuationHistory(str(tmp_path))._log()
+    np.testing.assert_array_equal(log["ticker"], [b"AAA", b"AAA", b"BBB", b"BBB"])
+    np.testing.assert_allclose(log["wacc"], [0.1, 0.1, 0.2, 0.2])
+    np.testing.assert_allclose(reopened.history("BBB")["wacc"], [0.2, 0.2])
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import numpy as np
+
+import valuation_core
+import valuation_metrics
+from growth_dsl import compile_curve
+from market_data import CachedProvider, FileProvider
+from universe import load_universe, wacc_cash
+from valuation_metrics import REGISTRY, MetricsRegistry
+from valuation_service import ValuationService
+
+
+def cache_lookups(cache):
+    return {result: REGISTRY.counters.get(("valuation_cache_requests_total", (("cache", cache), ("result", result))), 0)
+            for result in ("hit", "miss")}
+
+
+def solver_histogram(solver):
+    return dict(REGISTRY.histograms.get(("valuation_solver_iterations", (("solver", solver),)), {"sum": 0, "count": 0}))
+
+
+def test_implied_growth_records_the_iterations_it_ran():
+    before = solver_histogram("calculate_implied_growth")
+    growth = valuation_metrics.calculate_implied_growth(600, -16.3, 19, 10, 0.03, 0.095)
+    expected, steps = valuation_core.calculate_implied_growth(600, -16.3, 19, 10, 0.03, 0.095,
+                                                              return_iterations=True)
+    after = solver_histogram("calculate_implied_growth")
+    assert growth == expected
+    assert (after["count"] - before["count"], after["sum"] - before["sum"]) == (1, steps)
+
+
+def test_batched_solvers_record_iterations():
+    universe = load_universe()
+    wacc = valuation_core.calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                                         universe["market_cap"], universe["debt"], wacc_cash(universe),
+                                         cost_of_debt=universe["cost_of_debt"])
+    net_debt = universe["debt"] - universe["cash"]
+    before = {solver: solver_histogram(solver)["count"] for solver in ("solve_consistent_wacc", "solve_growth_path")}
+    valuation_metrics.solve_consistent_wacc(
+        valuation_core.calculate_fcf(universe["initial_fcf"], universe["growth"]), universe["terminal_growth"],
+        universe["risk_free_rate"][:, None], universe["market_return"][:, None], universe["beta"][:, None],
+        universe["market_cap"][:, None], universe["debt"][:, None], universe["cash"][:, None],
+        cost_of_debt=universe["cost_of_debt"][:, None], wacc_cash=wacc_cash(universe)[:, None])
+    valuation_metrics.solve_growth_path(universe["market_cap"] * 1000 / universe["initial_shares"],
+                                        universe["growth"][:, 1], universe["current_fcf"],
+                                        universe["terminal_growth"][:, 1], wacc, universe["initial_shares"],
+                                        universe["buyback_rate"], net_debt)
+    for solver, count in before.items():
+        assert solver_histogram(solver)["count"] == count + 1
+
+
+def test_prometheus_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("valuation_calls_total", step='say "hi"\\\nnow')
+    assert 'valuation_calls_total{step="say \\"hi\\"\\\\\\nnow"} 1' in registry.to_prometheus().splitlines()
+
+
+def test_lru_cached_records_hits_and_misses():
+    registry = MetricsRegistry()
+    calls = []
+
+    @valuation_metrics.lru_cached("squares", maxsize=4, registry=registry)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(x) for x in (2, 3, 2, 2)] == [4, 9, 4, 4]
+    assert calls == [2, 3]
+    counters = registry.counters
+    assert counters[("valuation_cache_requests_total", (("cache", "squares"), ("result", "hit")))] == 2
+    assert counters[("valuation_cache_requests_total", (("cache", "squares"), ("result", "miss")))] == 2
+
+
+def test_compile_curve_reports_cache_lookups():
+    text = "start 17% fade linearly to 4% by year 9"
+    before = cache_lookups("compile_curve")
+    compile_curve(text)
+    compile_curve(text)
+    after = cache_lookups("compile_curve")
+    assert after["hit"] - before["hit"] >= 1
+    assert after["hit"] + after["miss"] - before["hit"] - before["miss"] == 2
+
+
+def test_service_uses_instrumented_steps_and_reports_its_cache():
+    service = ValuationService(universe=load_universe())
+    calls = REGISTRY.counters.get(("valuation_calls_total", (("step", "run_scenarios"),)), 0)
+    before = cache_lookups("valuation_service")
+
+    async def twice():
+        first = await service.value({"ticker": "MSFT"})
+        second = await service.value({"ticker": "MSFT"})
+        return first, second
+
+    first, second = asyncio.run(twice())
+    after = cache_lookups("valuation_service")
+    assert first is second
+    assert REGISTRY.counters[("valuation_calls_total", (("step", "run_scenarios"),))] == calls + 1
+    assert (after["hit"] - before["hit"], after["miss"] - before["miss"]) == (1, 1)
+
+
+def test_cached_provider_reports_its_cache(tmp_path):
+    quotes = tmp_path / "quotes.json"
+    quotes.write_text(json.dumps({"MSFT": {"beta": 0.9}}))
+    before = cache_lookups("market_data")
+
+    async def fetch_twice():
+        provider = CachedProvider(FileProvider(str(quotes)), str(tmp_path / "cache"))
+        first = await provider.fetch("MSFT")
+        second = await provider.fetch("MSFT")
+        return provider, first, second
+
+    provider, first, second = asyncio.run(fetch_twice())
+    after = cache_lookups("market_data")
+    assert first == second == {"beta": 0.9}
+    assert provider.stats["cache_hits"] == 1
+    assert (after["hit"] - before["hit"], after["miss"] - before["miss"]) == (1, 1)
+
+
+def test_snapshot_hit_ratio():
+    registry = MetricsRegistry()
+    registry.cache("results", hit=True, count=3)
+    registry.cache("results", hit=False)
+    gauges = {g["name"]: g["value"] for g in registry.snapshot()["gauges"]}
+    assert np.isclose(gauges["valuation_cache_hit_ratio"], 0.75)
@@ -0,0 +1,260 @@
+import numpy as np
+
+# Ticker inputs copied from the per-ticker scripts, in one place so the
+# universe can be valued as a batch. Amounts are in billions, shares in
+# millions (META's 2.534 billion shares become 2534 million).
+#
+# Every ticker is normalised to the FCF-growth model of AAPL-2024.py:
+# a starting FCF plus 10 FCF growth rates per scenario. Revenue/margin
+# models (META, TOST), MA's margin expansion and ZM's segments are converted
+# to the FCF growth they imply; where their scripts stop after 10 FCF years
+# the final year's growth is held for the 11th, so those tickers are valued
+# one year further out than their scripts. That is expected to move their
+# numbers, not a regression. Base-case EV here vs the script, at the
+# script's WACC:
+#
+#   META  $863.54B vs $846.52B     MA  $322.13B vs $320.26B
+#   TOST   $11.56B vs  $10.65B     ZM   $21.87B vs  $21.91B
+#
+# The shared calculate_wacc nets cash out of the capital weights, as most
+# scripts do. ZM-2024.py leaves cash out of its WACC (10.00%); netting its
+# $6.5B against a $20.7B market cap would lift the equity weight to 1.46 and
+# the WACC to 14.58% and cut its base-case EV from $21.9B to $13.0B. Tickers
+# flagged "wacc_nets_cash": False keep their script's WACC: wacc_cash() gives
+# the cash to pass to calculate_wacc, while net debt still subtracts all of
+# the cash.
+#
+# ZM's per-share values are not comparable with the script's. ZM-2024.py
+# prints $50.03 a share in the base case, (EV - cash) / shares, so it
+# subtracts its $6.5B of cash instead of adding it back. run_scenarios takes
+# equity as EV - net debt, which adds the cash, so today's base-case value is
+# $92.10 at the script's 10.00% WACC (it would be $63.46 at 14.58%).
+
+TICKERS = {
+    "AAPL": {
+        "market_cap": 3403, "current_fcf": 109, "cash": 65, "debt": 21, "initial_shares": 15170,
+        "beta": 1.24, "risk_free_rate": 0.04457, "market_return": 0.095, "buyback_rate": 0.037,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.0125, 0.05, 0.20, 0.07, 0.06, 0.05, 0.04, 0.03, 0.03, 0.03],
+            [0.135, 0.06, 0.21, 0.08, 0.07, 0.06, 0.05, 0.04, 0.04, 0.03],
+            [0.145, 0.07, 0.22, 0.09, 0.08, 0.07, 0.06, 0.05, 0.05, 0.04],
+        ],
+        "terminal_growth": [0.02, 0.03, 0.04],
+    },
+    "GOOGL": {
+        "market_cap": 2110, "current_fcf": 67, "cash": 110, "debt": 0, "initial_shares": 12300,
+        "beta": 0.96, "risk_free_rate": 0.04457, "market_return": 0.095, "buyback_rate": 0.02,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.17, 0.14, 0.08, 0.07, 0.06, 0.05, 0.04, 0.04, 0.03, 0.03],
+            [0.195, 0.15, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.05, 0.04],
+            [0.21, 0.16, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.06, 0.05],
+        ],
+        "terminal_growth": [0.03, 0.04, 0.045],
+    },
+    "MSFT": {
+        "market_cap": 3098, "current_fcf": 68, "cash": 75.5, "debt": 9, "initial_shares": 7433,
+        "beta": 0.9, "risk_free_rate": 0.04457, "market_return": 0.092, "buyback_rate": 0.01,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.20, 0.26, 0.11, 0.1, 0.09, 0.08, 0.07, 0.06, 0.05, 0.04],
+            [0.22, 0.28, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05],
+            [0.24, 0.30, 0.13, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06],
+        ],
+        "terminal_growth": [0.02, 0.03, 0.04],
+    },
+    "NVDA": {
+        "market_cap": 3064, "current_fcf": 61, "cash": 26, "debt": 1.25, "initial_shares": 24578,
+        "beta": 1.5, "risk_free_rate": 0.04, "market_return": 0.1, "buyback_rate": 0.01,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.35, 0.23, 0.20, 0.18, 0.16, 0.14, 0.12, 0.10, 0.08, 0.06],
+            [0.377, 0.25, 0.22, 0.20, 0.18, 0.16, 0.14, 0.12, 0.10, 0.08],
+            [0.40, 0.27, 0.24, 0.22, 0.20, 0.18, 0.16, 0.14, 0.12, 0.10],
+        ],
+        "terminal_growth": [0.02, 0.03, 0.04],
+    },
+    "V": {
+        "market_cap": 600, "current_fcf": 18.96, "cash": 16.3, "debt": 0, "initial_shares": 1950,
+        "beta": 0.96, "risk_free_rate": 0.04457, "market_return": 0.095, "buyback_rate": 0.02,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.20, 0.05, 0.08, 0.07, 0.06, 0.05, 0.04, 0.04, 0.03, 0.03],
+            [0.20, 0.05, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.05, 0.04],
+            [0.20, 0.05, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.06, 0.05],
+        ],
+        "terminal_growth": [0.03, 0.04, 0.045],
+    },
+    "DPZ": {
+        "market_cap": 14.332, "current_fcf": 0.485, "cash": 0.114, "debt": 0.056, "initial_shares": 36.52,
+        "beta": 0.86, "risk_free_rate": 0.04, "market_return": 0.1, "buyback_rate": 0.038,
+        "cost_of_debt": 0.04,
+        "growth": [
+            [0.12, 0.13, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.04, 0.03],
+            [0.156, 0.156, 0.17, 0.14, 0.13, 0.12, 0.11, 0.1, 0.09, 0.08],
+            [0.14, 0.16, 0.15, 0.14, 0.13, 0.12, 0.11, 0.10, 0.09, 0.08],
+        ],
+        "terminal_growth": [0.03, 0.04, 0.05],
+    },
+    "META": {
+        "market_cap": 1424, "current_revenue": 156, "cash": 65, "debt": 0, "initial_shares": 2534,
+        "beta": 1.22, "risk_free_rate": 0.04457, "market_return": 0.10, "buyback_rate": 0.02,
+        "cost_of_debt": 0,
+        "revenue_growth": [
+            [0.08, 0.13, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05],
+            [0.09, 0.14, 0.13, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06],
+            [0.09, 0.15, 0.14, 0.13, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07],
+        ],
+        "fcf_margins": [[0.28] * 10, [0.30] * 10, [0.32] * 10],
+        "terminal_growth": [0.02, 0.03, 0.04],
+    },
+    "TOST": {
+        "market_cap": 15.82, "current_revenue": 4.899, "cash": 1.1, "debt": 0, "initial_shares": 562,
+        "beta": 1.77, "risk_free_rate": 0.0406, "market_return": 0.10, "buyback_rate": -0.02,
+        "cost_of_debt": 0,
+        "revenue_growth": [
+            [0.20, 0.17, 0.16, 0.15, 0.14, 0.13, 0.12, 0.11, 0.10, 0.09],
+            [0.22, 0.19, 0.18, 0.17, 0.16, 0.15, 0.14, 0.13, 0.12, 0.11],
+            [0.24, 0.21, 0.20, 0.19, 0.18, 0.17, 0.16, 0.15, 0.14, 0.13],
+        ],
+        "fcf_margins": [
+            [0.0456, 0.0694, 0.0775, 0.085, 0.09, 0.095, 0.10, 0.105, 0.11, 0.115],
+            [0.0456, 0.0694, 0.0775, 0.09, 0.10, 0.11, 0.12, 0.13, 0.14, 0.15],
+            [0.0456, 0.0694, 0.0775, 0.10, 0.11, 0.12, 0.13, 0.14, 0.15, 0.16],
+        ],
+        "terminal_growth": [0.03, 0.04, 0.05],
+    },
+    "MA": {
+        "market_cap": 477.823, "cash": 9.2, "debt": 1.3, "initial_shares": 930,
+        "beta": 1.1, "risk_free_rate": 0.04457, "market_return": 0.095, "buyback_rate": 0.02,
+        "cost_of_debt": 0.04,
+        # FCF path produced by MA-2024.py's calculate_fcf_with_margin_expansion
+        "fcf_path": "ma",
+        "terminal_growth": [0.03, 0.04, 0.05],
+    },
+    "ZM": {
+        "market_cap": 20.68, "cash": 6.5, "debt": 0, "initial_shares": 308,
+        "beta": 1.0, "risk_free_rate": 0.035, "market_return": 0.10, "buyback_rate": 0,
+        "cost_of_debt": 0, "wacc_nets_cash": False,
+        # Sum of the Enterprise, SMB and Consumer segments in ZM-2024.py
+        "fcf_path": "zm",
+        "terminal_growth": [0.02, 0.03, 0.04],
+    },
+}
+
+SECTORS = {
+    "AAPL": "Technology", "GOOGL": "Communication Services", "MSFT": "Technology", "NVDA": "Technology",
+    "V": "Financials", "DPZ": "Consumer Discretionary", "META": "Communication Services", "TOST": "Technology",
+    "MA": "Financials", "ZM": "Technology",
+}
+
+FIELDS = ("market_cap", "current_fcf", "cash", "debt", "initial_shares", "beta",
+          "risk_free_rate", "market_return", "buyback_rate", "cost_of_debt")
+
+
+def _ma_fcf_paths():
+    known_fcf_values = [13.0, 14.7, 16.5]
+    initial_margin, target_margin, years_to_target = 0.45, 0.55, 5
+    growth_2025 = 14.7 / 13.0 - 1
+    growth_2026 = 16.5 / 14.7 - 1
+    cases = [
+        [growth_2025, growth_2026, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.04, 0.04],
+        [growth_2025, growth_2026, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.05],
+        [growth_2025, growth_2026, 0.12, 0.11, 0.10, 0.09, 0.08, 0.07, 0.06, 0.06],
+    ]
+    known = len(known_fcf_values)
+    margin_step = (target_margin - initial_margin) / years_to_target
+    paths = []
+    for revenue_growth_rates in cases:
+        fcf = list(known_fcf_values)
+        current_revenue = known_fcf_values[-1] / (initial_margin + margin_step * (known - 1))
+        current_margin = initial_margin + margin_step * known
+        for year, growth in enumerate(revenue_growth_rates[known:]):
+            if year + known < years_to_target:
+                current_margin += margin_step
+            else:
+                current_margin = target_margin
+            current_revenue = current_revenue * (1 + growth)
+            fcf.append(current_revenue * current_margin)
+        paths.append(fcf)
+    return np.array(paths)
+
+
+def _zm_fcf_paths():
+    segments = [
+        (2.7051, [
+            [0.04, 0.05, 0.06, 0.05, 0.04, 0.03, 0.02, 0.02, 0.02],
+            [0.06, 0.07, 0.08, 0.07, 0.06, 0.05, 0.04, 0.03, 0.03],
+            [0.08, 0.09, 0.10, 0.09, 0.08, 0.07, 0.06, 0.05, 0.04],
+        ], [0.28, 0.32, 0.35]),
+        (1.3525, [
+            [0.02, 0.03, 0.04, 0.03, 0.02, 0.02, 0.01, 0.01, 0.01],
+            [0.04, 0.05, 0.06, 0.05, 0.04, 0.03, 0.02, 0.02, 0.02],
+            [0.06, 0.07, 0.08, 0.07, 0.06, 0.05, 0.04, 0.03, 0.03],
+        ], [0.25, 0.28, 0.30]),
+        (0.4509, [
+            [0.00, 0.01, 0.02, 0.01, 0.00, 0.00, -0.01, -0.01, -0.01],
+            [0.02, 0.03, 0.04, 0.03, 0.02, 0.02, 0.01, 0.01, 0.01],
+            [0.04, 0.05, 0.06, 0.05, 0.04, 0.03, 0.02, 0.02, 0.02],
+        ], [0.22, 0.25, 0.28]),
+    ]
+    total = 0
+    for initial_revenue, growth, margins in segments:
+        revenue = initial_revenue * np.cumprod(np.hstack([np.ones((3, 1)), 1 + np.array(growth)]), axis=1)
+        total = total + revenue * np.array(margins)[:, None]
+    return total
+
+
+def _growth_from_fcf_path(fcf_path, years=10):
+    """Starting FCF and FCF growth implied by an explicit path, holding the last growth."""
+    fcf_path = np.asarray(fcf_path, dtype=float)
+    growth = fcf_path[:, 1:] / fcf_path[:, :-1] - 1
+    while growth.shape[1] < years:
+        growth = np.hstack([growth, growth[:, -1:]])
+    return fcf_path[:, 0], growth[:, :years]
+
+
+def ticker_growth(ticker):
+    """Starting FCF (per scenario) and the 3 x 10 FCF growth matrix for one ticker."""
+    inputs = TICKERS[ticker]
+    if "growth" in inputs:
+        return np.full(3, float(inputs["current_fcf"])), np.array(inputs["growth"], dtype=float)
+    if "revenue_growth" in inputs:
+        revenue_growth = np.array(inputs["revenue_growth"], dtype=float)
+        revenue = inputs["current_revenue"] * np.cumprod(
+            np.hstack([np.ones((3, 1)), 1 + revenue_growth]), axis=1)
+        return _growth_from_fcf_path(revenue[:, :10] * np.array(inputs["fcf_margins"]))
+    if inputs["fcf_path"] == "ma":
+        return _growth_from_fcf_path(_ma_fcf_paths())
+    return _growth_from_fcf_path(_zm_fcf_paths())
+
+
+def load_universe(tickers=None):
+    """
+    Stack the ticker inputs into arrays for the batched valuation core.
+
+    Returns a dict with "tickers", one (T,) array per field in FIELDS,
+    "growth" of shape (T, 3, 10) and "terminal_growth" of shape (T, 3).
+    current_fcf is the base-case starting FCF; "initial_fcf" holds the
+    per-scenario starting FCF with shape (T, 3). "wacc_nets_cash" is 1.0 for
+    tickers whose WACC nets out cash and 0.0 otherwise (see wacc_cash).
+    """
+    tickers = list(TICKERS) if tickers is None else list(tickers)
+    universe = {"tickers": tickers}
+    initial_fcf, growth = zip(*(ticker_growth(ticker) for ticker in tickers))
+    universe["initial_fcf"] = np.array(initial_fcf)
+    universe["growth"] = np.array(growth)
+    universe["terminal_growth"] = np.array([TICKERS[t]["terminal_growth"] for t in tickers], dtype=float)
+    for field in FIELDS:
+        if field == "current_fcf":
+            universe[field] = universe["initial_fcf"][:, 1].copy()
+        else:
+            universe[field] = np.array([TICKERS[t][field] for t in tickers], dtype=float)
+    universe["wacc_nets_cash"] = np.array([TICKERS[t].get("wacc_nets_cash", True) for t in tickers], dtype=float)
+    return universe
+
+
+def wacc_cash(universe):
+    """Cash to pass to calculate_wacc: each ticker's cash, or 0 where its script leaves cash out of the WACC."""
+    return universe["cash"] * universe["wacc_nets_cash"]
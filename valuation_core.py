@@ -0,0 +1,174 @@
+import math
+
+import numpy as np
+
+# Vectorized versions of the functions copied into every ticker script.
+# Every function broadcasts over leading batch dimensions (tickers, scenarios,
+# simulated paths, ...) and keeps the projection years on the last axis, so a
+# whole universe of scenarios is valued in one pass instead of one
+# run_scenario call at a time.
+
+SCENARIOS = ("Pessimistic Case", "Base Case", "Optimistic Case")
+
+
+def calculate_wacc(risk_free_rate, market_return, beta, market_cap, debt, cash, tax_rate=0.21, cost_of_debt=0.04):
+    risk_free_rate = np.asarray(risk_free_rate, dtype=float)
+    cost_of_equity = risk_free_rate + beta * (market_return - risk_free_rate)
+    total_value = market_cap + np.subtract(debt, cash)
+    weight_equity = market_cap / total_value
+    weight_debt = np.subtract(debt, cash) / total_value
+    wacc = weight_equity * cost_of_equity + weight_debt * cost_of_debt * (1 - np.asarray(tax_rate))
+    return wacc
+
+
+def calculate_fcf(initial_fcf, growth_rates, fcf_margins=None):
+    """
+    Project FCF for a batch of growth paths.
+
+    With fcf_margins=None this matches the FCF-growth scripts (AAPL, MSFT, ...):
+    n growth rates give n + 1 projections. With margins it matches the
+    revenue-driven scripts (META, TOST): initial_fcf is then the starting
+    revenue and the path is truncated to the number of margins, like zip().
+    """
+    growth_rates = np.asarray(growth_rates, dtype=float)
+    initial_fcf = np.asarray(initial_fcf, dtype=float)[..., None]
+    ones = np.ones(growth_rates.shape[:-1] + (1,))
+    path = initial_fcf * np.cumprod(np.concatenate([ones, 1 + growth_rates], axis=-1), axis=-1)
+    if fcf_margins is None:
+        return path
+    fcf_margins = np.asarray(fcf_margins, dtype=float)
+    years = min(path.shape[-1], fcf_margins.shape[-1])
+    return path[..., :years] * fcf_margins[..., :years]
+
+
+def calculate_yearly_share_count(initial_shares, buyback_rate, years):
+    # A negative buyback_rate is dilution (tost.py's 1 + dilution_rate).
+    exponents = np.arange(years)
+    initial_shares = np.asarray(initial_shares, dtype=float)[..., None]
+    return initial_shares * (1 - np.asarray(buyback_rate, dtype=float)[..., None]) ** exponents
+
+
+def discount_factors(discount_rate, years):
+    return (1 + np.asarray(discount_rate, dtype=float)[..., None]) ** -np.arange(1, years + 1)
+
+
+def gordon_terminal_value(final_fcf, terminal_growth, discount_rate):
+    terminal_growth = np.asarray(terminal_growth, dtype=float)
+    return np.asarray(final_fcf, dtype=float) * (1 + terminal_growth) / (discount_rate - terminal_growth)
+
+
+def dcf_valuation(fcf_projections, terminal_growth, discount_rate):
+    fcf_projections = np.asarray(fcf_projections, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    years = fcf_projections.shape[-1]
+    terminal_value = gordon_terminal_value(fcf_projections[..., -1], terminal_growth, discount_rate)
+    pv_factors = discount_factors(discount_rate, years)
+    pv_fcf = np.sum(fcf_projections * pv_factors, axis=-1)
+    pv_terminal = terminal_value * pv_factors[..., -1]
+    return pv_fcf + pv_terminal
+
+
+def yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate, terminal_value=None):
+    """
+    EV of every suffix of the projection, i.e. dcf_valuation(fcf[i:]) for each
+    year i, computed with one reverse cumulative sum instead of n DCF calls.
+    terminal_value (value at the final year) replaces the Gordon growth value
+    when given, e.g. from terminal_methods.terminal_values.
+    """
+    fcf_projections = np.asarray(fcf_projections, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    years = fcf_projections.shape[-1]
+    if terminal_value is None:
+        terminal_value = gordon_terminal_value(fcf_projections[..., -1], terminal_growth, discount_rate)
+    terminal_value = np.asarray(terminal_value, dtype=float)
+    pv_factors = discount_factors(discount_rate, years)
+    discounted = fcf_projections * pv_factors
+    remaining = np.flip(np.cumsum(np.flip(discounted, axis=-1), axis=-1), axis=-1)
+    remaining = remaining + (terminal_value * pv_factors[..., -1])[..., None]
+    # Re-base each suffix so its first year is discounted one period.
+    return remaining * (1 + discount_rate[..., None]) ** np.arange(years)
+
+
+def run_scenarios(initial_fcf, growth_rates, terminal_growth, discount_rate, initial_shares, buyback_rate,
+                  net_debt, fcf_margins=None, per_share_scale=1000, share_count=None, terminal_value=None):
+    """
+    Batched run_scenario.
+
+    Parameters:
+    initial_fcf (array): Starting FCF (or revenue when fcf_margins is given), in billions
+    growth_rates (array): Growth paths, years on the last axis
+    terminal_growth (array): Terminal growth rate per path
+    discount_rate (array): Discount rate (WACC) per path
+    initial_shares (array): Shares outstanding, in millions
+    buyback_rate (array): Annual share reduction (negative for dilution)
+    net_debt (array): Debt minus cash, in billions
+    fcf_margins (array): Optional FCF margins for revenue-driven models
+    per_share_scale (float): Billions-to-millions conversion used for per-share figures
+    share_count (array): Optional per-year share counts (..., years), e.g. from
+        share_dilution.share_count_schedule; replaces initial_shares and buyback_rate
+    terminal_value (array): Optional terminal value at the final year in place of
+        Gordon growth; extra leading dimensions (e.g. one per method) broadcast.
+        Gordon-growth EVs run on compute_backends.select_backend's backend for
+        the number of paths; a given terminal_value stays on NumPy
+
+    Returns:
+    dict: The same keys as the scripts' run_scenario, holding arrays
+    """
+    fcf_projections = calculate_fcf(initial_fcf, growth_rates, fcf_margins)
+    years = fcf_projections.shape[-1]
+    if share_count is None:
+        share_count = calculate_yearly_share_count(initial_shares, buyback_rate, years)
+    share_count = np.asarray(share_count, dtype=float)
+    net_debt = np.asarray(net_debt, dtype=float)
+
+    if terminal_value is None:
+        # compute_backends builds on this module, so it is imported on first use
+        from compute_backends import select_backend
+        paths = np.broadcast_shapes(fcf_projections.shape[:-1], np.shape(terminal_growth), np.shape(discount_rate))
+        yearly_ev = select_backend(math.prod(paths)).yearly_dcf_valuations(fcf_projections, terminal_growth,
+                                                                               discount_rate)
+    else:
+        yearly_ev = yearly_dcf_valuations(fcf_projections, terminal_growth, discount_rate, terminal_value)
+    ev = yearly_ev[..., 0]
+    equity_value = ev - net_debt
+
+    yearly_share_prices = (yearly_ev - net_debt[..., None]) * per_share_scale / share_count
+    final_price_per_share = yearly_share_prices[..., -1]
+    price_to_fcf = final_price_per_share / (fcf_projections[..., -1] * per_share_scale / share_count[..., -1])
+
+    return {
+        "ev": ev,
+        "equity_value": equity_value,
+        "final_price_per_share": final_price_per_share,
+        "price_to_fcf": price_to_fcf,
+        "fcf_projections": fcf_projections,
+        "share_count": share_count,
+        "yearly_share_prices": yearly_share_prices
+    }
+
+
+def calculate_implied_growth(market_cap, net_debt, base_fcf, years, terminal_growth, discount_rate, tolerance=0.0001,
+                             return_iterations=False):
+    """
+    Batched calculate_implied_growth from implied-growth-rate.py: the flat
+    growth rate whose DCF (projections starting one year out) equals
+    market_cap + net_debt, by bisection on every element at once.
+    With return_iterations=True, returns (growth, bisection steps taken).
+    """
+    target_ev = np.asarray(market_cap, dtype=float) + net_debt
+    base_fcf = np.asarray(base_fcf, dtype=float)
+    shape = np.broadcast_shapes(target_ev.shape, base_fcf.shape, np.shape(terminal_growth), np.shape(discount_rate))
+    exponents = np.arange(1, years + 1)
+
+    # Binary search for the growth rate, between -50% and 50% as in the script
+    low, high = np.full(shape, -0.5), np.full(shape, 0.5)
+    iterations = 0
+    while (high - low).max() > tolerance:
+        iterations += 1
+        mid = (low + high) / 2
+        fcf_projections = base_fcf[..., None] * (1 + mid[..., None]) ** exponents
+        below = dcf_valuation(fcf_projections, terminal_growth, discount_rate) < target_ev
+        low = np.where(below, mid, low)
+        high = np.where(below, high, mid)
+    growth = (low + high) / 2
+    return (growth, iterations) if return_iterations else growth
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import SCENARIOS
+
+# Append-only history of valuation runs, so fair values are kept instead of
+# being overwritten on stdout.
+#
+#   <path>/manifest.json      {"segments": [...], "log": "log-000002.bin", "next": 3}
+#   <path>/log-000002.bin     fixed-width records appended as runs finish
+#   <path>/segment-000001.npy records sorted by (ticker, timestamp), memory-mapped
+#
+# compact() turns the log into a sorted segment (and merges segments once
+# there are more than max_segments). Segments need no index file: tickers are
+# sorted, so each ticker's rows are one contiguous range (found once when the
+# segment is opened) with its timestamps sorted inside it. History and as-of
+# queries are binary searches on the memory maps plus a scan of the current
+# log, which is kept short by compacting every compact_every rows.
+#
+# inputs_hash ties each record to the exact inputs it came from, so reruns on
+# unchanged inputs can be recognised.
+
+RECORD = np.dtype([
+    ("ticker", "S8"),
+    ("timestamp", "datetime64[s]"),
+    ("inputs_hash", "<u8"),
+    ("wacc", "<f8"),
+    ("equity_value", "<f8", (3,)),
+    ("price_per_share", "<f8", (3,)),
+    ("final_price_per_share", "<f8", (3,)),
+])
+
+
+def inputs_hash(inputs):
+    """64-bit hash of a dict of inputs (names, dtypes and values), stable across runs."""
+    digest = hashlib.blake2b(digest_size=8)
+    for key in sorted(inputs):
+        value = np.ascontiguousarray(inputs[key], dtype=float)
+        digest.update(key.encode())
+        digest.update(str(value.shape).encode())
+        digest.update(value.tobytes())
+    return int.from_bytes(digest.digest(), "little")
+
+
+def records_from_run(tickers, result, wacc, inputs=None, timestamp=None):
+    """
+    History records for one batched run (tickers x scenarios).
+
+    Parameters:
+    tickers (list): Tickers in batch order
+    result (dict): run_scenarios output with shape (tickers, 3)
+    wacc (array): (tickers,) discount rates
+    inputs (dict): Optional name -> (tickers, ...) inputs to hash per ticker
+    timestamp: Run time (datetime64 or ISO string); now by default
+    """
+    records = np.zeros(len(tickers), dtype=RECORD)
+    records["ticker"] = tickers
+    records["timestamp"] = np.datetime64(timestamp or "now", "s")
+    records["wacc"] = wacc
+    records["equity_value"] = result["equity_value"]
+    records["price_per_share"] = result["yearly_share_prices"][..., 0]
+    records["final_price_per_share"] = result["final_price_per_share"]
+    if inputs is not None:
+        records["inputs_hash"] = [inputs_hash({key: values[i] for key, values in inputs.items()})
+                                  for i in range(len(tickers))]
+    return records
+
+
+def _sort_records(records):
+    return records[np.lexsort((records["timestamp"], records["ticker"]))]
+
+
+class ValuationHistory:
+    """Append-only valuation log with sorted, memory-mapped segments."""
+
+    def __init__(self, path, compact_every=1000000, max_segments=8):
+        self.path = path
+        self.compact_every = compact_every
+        self.max_segments = max_segments
+        os.makedirs(path, exist_ok=True)
+        manifest = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"segments": [], "log": "log-000000.bin", "next": 1}
+            self._write_manifest()
+        self._segments = {}
+        self._tail = (None, np.zeros(0, dtype=RECORD))
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _write_manifest(self):
+        temporary = self._file("manifest.json.tmp")
+        with open(temporary, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(temporary, self._file("manifest.json"))
+
+    def _segment(self, name):
+        if name not in self._segments:
+            segment = np.load(self._file(name), mmap_mode="r")
+            # Ticker index: distinct tickers and where each one's rows start
+            names = segment["ticker"]
+            starts = np.flatnonzero(np.append(True, names[1:] != names[:-1]))
+            self._segments[name] = (segment, names[starts], np.append(starts, len(names)))
+        return self._segments[name][0]
+
+    def _ticker_ranges(self, name, tickers=None):
+        """(first, last) row bounds per ticker in a segment; every ticker in it by default."""
+        self._segment(name)
+        _, keys, bounds = self._segments[name]
+        if tickers is None:
+            return bounds[:-1], bounds[1:]
+        position = np.searchsorted(keys, tickers)
+        present = (position < len(keys)) & (keys[np.minimum(position, len(keys) - 1)] == tickers)
+        return np.where(present, bounds[position], 0), np.where(present, bounds[np.minimum(position + 1, len(keys))], 0)
+
+    def _log(self):
+        """
+        Records in the current log, reading only bytes appended since the last
+        call; a torn trailing record from a crash is ignored (and truncated
+        away by the next append).
+        """
+        name, records = self._tail
+        if name != self.manifest["log"]:
+            name, records = self.manifest["log"], np.zeros(0, dtype=RECORD)
+        path = self._file(name)
+        count = os.path.getsize(path) // RECORD.itemsize if os.path.exists(path) else 0
+        if count > len(records):
+            new = np.fromfile(path, dtype=RECORD, count=count - len(records), offset=len(records) * RECORD.itemsize)
+            records = np.concatenate([records, new])
+        self._tail = (name, records)
+        return records
+
+    def append(self, records):
+        """Append records (RECORD dtype) to the log; compacts when the log reaches compact_every rows."""
+        records = np.ascontiguousarray(records, dtype=RECORD)
+        with open(self._file(self.manifest["log"]), "ab") as f:
+            # Drop a torn trailing record left by a crash, so new records stay aligned
+            size = f.seek(0, os.SEEK_END)
+            if size % RECORD.itemsize:
+                f.truncate(size // RECORD.itemsize * RECORD.itemsize)
+            f.write(records.tobytes())
+        if os.path.getsize(self._file(self.manifest["log"])) >= self.compact_every * RECORD.itemsize:
+            self.compact()
+
+    def compact(self):
+        """Seal the log into a sorted segment; merge all segments once there are more than max_segments."""
+        log = self._log()
+        if not len(log) and len(self.manifest["segments"]) <= self.max_segments:
+            return
+        old_files = [self.manifest["log"]]
+        segments = list(self.manifest["segments"])
+        parts = [log]
+        if len(segments) + 1 > self.max_segments:
+            parts = [np.asarray(self._segment(name)) for name in segments] + parts
+            old_files += segments
+            segments = []
+
+        number = self.manifest["next"]
+        merged = _sort_records(np.concatenate(parts))
+        if len(merged):
+            name = f"segment-{number:06d}.npy"
+            np.save(self._file(name + ".tmp.npy"), merged)
+            os.replace(self._file(name + ".tmp.npy"), self._file(name))
+            segments.append(name)
+        self.manifest = {"segments": segments, "log": f"log-{number + 1:06d}.bin", "next": number + 2}
+        self._write_manifest()
+        for name in old_files:
+            self._segments.pop(name, None)
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+
+    def __len__(self):
+        return sum(len(self._segment(name)) for name in self.manifest["segments"]) + len(self._log())
+
+    def history(self, ticker, start=None, end=None):
+        """Every record for ticker with start <= timestamp <= end, in time order."""
+        key = np.array(ticker, dtype="S8")
+        low = np.datetime64(start, "s") if start is not None else np.datetime64(-2**62, "s")
+        high = np.datetime64(end, "s") if end is not None else np.datetime64(2**62, "s")
+        parts = []
+        for name in self.manifest["segments"]:
+            segment = self._segment(name)
+            (first,), (last,) = self._ticker_ranges(name, key[None])
+            times = segment["timestamp"][first:last]
+            parts.append(segment[first + np.searchsorted(times, low, side="left"):
+                                 first + np.searchsorted(times, high, side="right")])
+        log = self._log()
+        parts.append(log[(log["ticker"] == key) & (log["timestamp"] >= low) & (log["timestamp"] <= high)])
+        records = np.concatenate(parts)
+        return records[np.argsort(records["timestamp"], kind="stable")]
+
+    def as_of(self, timestamp, tickers=None):
+        """Latest record per ticker at or before timestamp, sorted by ticker."""
+        moment = np.datetime64(timestamp, "s")
+        wanted = None if tickers is None else np.array(tickers, dtype="S8")
+        candidates = []
+        for name in self.manifest["segments"]:
+            segment = self._segment(name)
+            times = segment["timestamp"]
+            # One binary search per ticker range, all tickers at once
+            first, high = self._ticker_ranges(name, wanted)
+            low = first.copy()
+            while (high > low).any():
+                middle = (low + high) // 2
+                searching = high > low
+                after = times[np.minimum(middle, len(times) - 1)] <= moment
+                low = np.where(searching & after, middle + 1, low)
+                high = np.where(searching & ~after, middle, high)
+            found = low > first
+            candidates.append(segment[low[found] - 1])
+        log = self._log()
+        log = log[log["timestamp"] <= moment]
+        if wanted is not None:
+            log = log[np.isin(log["ticker"], wanted)]
+        candidates.append(log)
+        records = _sort_records(np.concatenate(candidates))
+        if not len(records):
+            return records
+        # The last record of each ticker run is the latest
+        last_of_ticker = np.append(records["ticker"][1:] != records["ticker"][:-1], True)
+        return records[last_of_ticker]
+
+
+# Example usage:
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    from universe import FIELDS, load_universe, wacc_cash
+    from valuation_core import calculate_wacc, run_scenarios
+
+    universe = load_universe()
+    directory = tempfile.mkdtemp()
+    history = ValuationHistory(directory, compact_every=500000)
+
+    # Three years of nightly runs for the universe plus 990 synthetic names, with drifting inputs
+    rng = np.random.default_rng(0)
+    names = universe["tickers"] + [f"X{i:04d}" for i in range(990)]
+    base = {key: np.resize(universe[key], len(names)) for key in FIELDS}
+    cash = np.resize(wacc_cash(universe), len(names))
+    growth = np.resize(universe["growth"], (len(names), 3, 10))
+    initial_fcf = np.resize(universe["initial_fcf"], (len(names), 3))
+    terminal = np.resize(universe["terminal_growth"], (len(names), 3))
+    days = np.arange(np.datetime64("2022-01-03"), np.datetime64("2025-01-01"))
+    drift = np.cumsum(rng.normal(0, 0.01, (len(days), len(names))), axis=0)
+    start = time.perf_counter()
+    for d, day in enumerate(days):
+        beta = base["beta"] * np.exp(drift[d])
+        rates = calculate_wacc(base["risk_free_rate"], base["market_return"], beta, base["market_cap"], base["debt"],
+                               cash, cost_of_debt=base["cost_of_debt"])
+        result = run_scenarios(initial_fcf, growth, terminal, rates[:, None], base["initial_shares"][:, None],
+                               base["buyback_rate"][:, None], (base["debt"] - base["cash"])[:, None])
+        history.append(records_from_run(names, result, rates, timestamp=day + np.timedelta64(22, "h")))
+    elapsed = time.perf_counter() - start
+    print(f"Appended {len(history):,} rows in {elapsed:.1f}s "
+          f"({len(history.manifest['segments'])} segments, {RECORD.itemsize} bytes per row)")
+
+    start = time.perf_counter()
+    msft = history.history("MSFT", "2023-01-01", "2024-12-31")
+    history_time = time.perf_counter() - start
+    start = time.perf_counter()
+    snapshot = history.as_of("2024-06-30T23:59:59")
+    as_of_time = time.perf_counter() - start
+    print(f"MSFT two-year history: {len(msft)} rows in {history_time * 1000:.2f}ms; "
+          f"as-of 2024-06-30 for {len(snapshot):,} tickers in {as_of_time * 1000:.1f}ms")
+
+    monthly = msft[::90]
+    table = [[str(r["timestamp"])[:10]] + [f"${v:.2f}" for v in r["price_per_share"]] for r in monthly]
+    print(tabulate(table, ["MSFT"] + list(SCENARIOS), tablefmt="grid"))
+
+    # Tonight's run on the real inputs, tagged with an inputs hash per ticker
+    universe_inputs = {key: universe[key] for key in ("initial_fcf", "growth", "terminal_growth", "beta")}
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    result = run_scenarios(universe["initial_fcf"], universe["growth"], universe["terminal_growth"], wacc[:, None],
+                           universe["initial_shares"][:, None], universe["buyback_rate"][:, None],
+                           (universe["debt"] - universe["cash"])[:, None])
+    tonight = records_from_run(universe["tickers"], result, wacc, universe_inputs, "2025-01-01T22:00:00")
+    history.append(tonight)
+    rerun = records_from_run(universe["tickers"], result, wacc, universe_inputs)
+    print(f"Rerun has the same inputs hash for {(rerun['inputs_hash'] == tonight['inputs_hash']).sum()} "
+          f"of {len(rerun)} tickers")
+
+    start = time.perf_counter()
+    history.compact()
+    print(f"Compacted to {len(history.manifest['segments'])} segment(s) in {time.perf_counter() - start:.2f}s")
+    shutil.rmtree(directory)
@@ -0,0 +1,318 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache, wraps
+
+import numpy as np
+from tabulate import tabulate
+
+import fixed_point_wacc
+import target_growth_path
+import valuation_core
+
+# Operational metrics for valuation runs: scenarios valued, per-step and
+# per-ticker latency histograms, solver iterations and cache hit ratios.
+# Recording is a dict update and a bisect into fixed buckets under a lock,
+# a few microseconds, so it can stay on in nightly jobs. Exported as a
+# Prometheus text file (for node_exporter's textfile collector) and as a
+# JSON snapshot.
+#
+# The instrumented entry points take the same arguments as valuation_core
+# (or fixed_point_wacc / target_growth_path for the solvers) plus an optional
+# ticker= label:
+#
+#   from valuation_metrics import run_scenarios, calculate_wacc, render_report
+#
+# The caches report into the same registry: the service's result cache,
+# CachedProvider's quote cache, and compile_curve / open_tables through
+# lru_cached below.
+#
+# Solver iterations are the loop iterations each call actually ran: bisection
+# steps in calculate_implied_growth, Steffensen sweeps in
+# solve_consistent_wacc, and projected gradient steps (each a valuation) in
+# solve_growth_path.
+
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+ITERATION_BUCKETS = (1, 2, 3, 5, 8, 10, 15, 20, 30, 50, 100, 200, 500, 1000, 2000)
+
+HELP = {
+    "valuation_scenarios_total": "Scenario paths valued",
+    "valuation_calls_total": "Calls per valuation step",
+    "valuation_step_seconds": "Latency per valuation step and ticker",
+    "valuation_solver_iterations": "Iterations per solver call",
+    "valuation_cache_requests_total": "Cache lookups by cache and result",
+    "valuation_cache_hit_ratio": "Cache hits / lookups",
+    "valuation_scenarios_per_second": "Scenario paths valued per second of uptime, per step",
+}
+
+
+class MetricsRegistry:
+    """Counters, gauges and fixed-bucket histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1),
+                                                    "sum": 0.0, "count": 0}
+            histogram["counts"][bisect_left(buckets, value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def cache(self, cache, hit, count=1):
+        self.inc("valuation_cache_requests_total", count, cache=cache, result="hit" if hit else "miss")
+
+    def _derived(self, counters):
+        """Gauges computed at export time: throughput and cache hit ratios."""
+        derived = {}
+        uptime = max(time.time() - self.started, 1e-9)
+        for (name, labels), value in counters.items():
+            if name == "valuation_scenarios_total":
+                derived[("valuation_scenarios_per_second", labels)] = value / uptime
+        lookups = {}
+        for (name, labels), value in counters.items():
+            if name == "valuation_cache_requests_total":
+                labels = dict(labels)
+                hits, total = lookups.get(labels["cache"], (0, 0))
+                lookups[labels["cache"]] = (hits + value * (labels["result"] == "hit"), total + value)
+        for cache, (hits, total) in lookups.items():
+            derived[("valuation_cache_hit_ratio", (("cache", cache),))] = hits / total if total else math.nan
+        return derived
+
+    def to_prometheus(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            histograms = {key: dict(h, counts=list(h["counts"])) for key, h in self.histograms.items()}
+        gauges.update(self._derived(counters))
+
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def labels_text(labels, extra=()):
+            items = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges), ("histogram", histograms)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series_name, labels), value in sorted(series.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    if kind != "histogram":
+                        lines.append(f"{name}{labels_text(labels)} {value:.10g}")
+                        continue
+                    cumulative = np.cumsum(value["counts"])
+                    for bound, count in zip(list(value["buckets"]) + ["+Inf"], cumulative):
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        lines.append(f"{name}_bucket{labels_text(labels, [('le', le)])} {count}")
+                    lines.append(f"{name}_sum{labels_text(labels)} {value['sum']:.10g}")
+                    lines.append(f"{name}_count{labels_text(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """JSON-serializable view of every series, with histogram quantile estimates."""
+        with self._lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            histograms = {key: dict(h, counts=list(h["counts"])) for key, h in self.histograms.items()}
+        gauges.update(self._derived(counters))
+
+        def rows(series, convert=lambda v: v):
+            return [{"name": name, "labels": dict(labels), "value": convert(value)}
+                    for (name, labels), value in sorted(series.items())]
+
+        def summarize(histogram):
+            summary = {"count": histogram["count"], "sum": histogram["sum"],
+                       "buckets": dict(zip([str(b) for b in histogram["buckets"]] + ["+Inf"], histogram["counts"]))}
+            cumulative = np.cumsum(histogram["counts"])
+            bounds = list(histogram["buckets"]) + [math.inf]
+            for q in (0.5, 0.95, 0.99):
+                # Upper bound of the bucket holding the quantile
+                summary[f"p{int(q * 100)}"] = bounds[int(np.searchsorted(cumulative, q * histogram["count"]))]
+            return summary
+
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started,
+            "counters": rows(counters),
+            "gauges": rows(gauges, lambda v: None if isinstance(v, float) and math.isnan(v) else v),
+            "histograms": rows(histograms, summarize)
+        }
+
+    def write(self, prometheus_path=None, json_path=None):
+        """Write the exports atomically (write-then-rename) so scrapers never read a partial file."""
+        for path, text in ((prometheus_path, self.to_prometheus), (json_path,
+                                                                   lambda: json.dumps(self.snapshot(), indent=2))):
+            if path is None:
+                continue
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(text())
+            os.replace(temporary, path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def instrument(step, scenarios=None, iterations=None, unpack=None, registry=None):
+    """
+    Wrap a valuation function to record calls and latency per step and ticker.
+
+    scenarios(result, args, kwargs) and iterations(result, args, kwargs)
+    optionally return the number of scenario paths valued and solver
+    iterations. unpack(result), if given, is what the caller gets back, for
+    functions that return their iteration count alongside the result. The
+    wrapper accepts an extra ticker= keyword for the label.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, ticker="all", **kwargs):
+            metrics = registry or REGISTRY
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            metrics.inc("valuation_calls_total", step=step)
+            metrics.observe("valuation_step_seconds", elapsed, step=step, ticker=ticker)
+            if scenarios is not None:
+                metrics.inc("valuation_scenarios_total", scenarios(result, args, kwargs), step=step)
+            if iterations is not None:
+                metrics.observe("valuation_solver_iterations", iterations(result, args, kwargs),
+                                buckets=ITERATION_BUCKETS, solver=step)
+            return result if unpack is None else unpack(result)
+        return wrapper
+    return decorator
+
+
+def lru_cached(cache, maxsize=128, registry=None):
+    """
+    functools.lru_cache that also records each lookup as a hit or miss of
+    cache. cache_info() and cache_clear() are passed through.
+    """
+    def decorator(function):
+        # The wrapped function only runs on a miss; the flag is per thread so concurrent callers don't mix
+        state = threading.local()
+
+        def compute(*args, **kwargs):
+            state.missed = True
+            return function(*args, **kwargs)
+        cached = lru_cache(maxsize=maxsize)(compute)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            state.missed = False
+            result = cached(*args, **kwargs)
+            (registry or REGISTRY).cache(cache, hit=not state.missed)
+            return result
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+    return decorator
+
+
+@wraps(valuation_core.calculate_implied_growth)
+def _implied_growth_with_iterations(*args, **kwargs):
+    return valuation_core.calculate_implied_growth(*args, return_iterations=True, **kwargs)
+
+
+calculate_wacc = instrument("calculate_wacc")(valuation_core.calculate_wacc)
+run_scenarios = instrument("run_scenarios",
+                           scenarios=lambda r, a, k: np.size(r["ev"]))(valuation_core.run_scenarios)
+calculate_implied_growth = instrument("calculate_implied_growth", scenarios=lambda r, a, k: np.size(r[0]),
+                                      iterations=lambda r, a, k: r[1],
+                                      unpack=lambda r: r[0])(_implied_growth_with_iterations)
+# The batched solvers run until every element converges, so a call's loop
+# iterations are the most any element needed
+solve_consistent_wacc = instrument("solve_consistent_wacc", scenarios=lambda r, a, k: np.size(r["wacc"]),
+                                   iterations=lambda r, a, k: int(np.max(r["iterations"]))
+                                   )(fixed_point_wacc.solve_consistent_wacc)
+solve_growth_path = instrument("solve_growth_path", scenarios=lambda r, a, k: np.size(r["price"]),
+                               iterations=lambda r, a, k: int(np.max(r["iterations"]))
+                               )(target_growth_path.solve_growth_path)
+
+
+@instrument("render_report")
+def render_report(table, headers, tablefmt="grid"):
+    return tabulate(table, headers, tablefmt=tablefmt)
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe, wacc_cash
+
+    universe = load_universe()
+    # A nightly job valuing each ticker separately, with a small result cache
+    cache = {}
+    start = time.perf_counter()
+    for night in range(200):
+        for i, ticker in enumerate(universe["tickers"]):
+            beta = universe["beta"][i] + 0.01 * (night % 20)
+            key = (ticker, round(beta, 4))
+            if key in cache:
+                REGISTRY.cache("valuation_results", hit=True)
+                continue
+            REGISTRY.cache("valuation_results", hit=False)
+            wacc = calculate_wacc(universe["risk_free_rate"][i], universe["market_return"][i], beta,
+                                  universe["market_cap"][i], universe["debt"][i], wacc_cash(universe)[i],
+                                  cost_of_debt=universe["cost_of_debt"][i], ticker=ticker)
+            net_debt = universe["debt"][i] - universe["cash"][i]
+            result = run_scenarios(universe["initial_fcf"][i], universe["growth"][i], universe["terminal_growth"][i],
+                                   wacc, universe["initial_shares"][i], universe["buyback_rate"][i], net_debt,
+                                   ticker=ticker)
+            implied = calculate_implied_growth(universe["market_cap"][i], net_debt, universe["current_fcf"][i], 10,
+                                               universe["terminal_growth"][i, 1], wacc, ticker=ticker)
+            cache[key] = (result["final_price_per_share"], implied)
+        report = render_report([[t, f"${v[0][1]:.2f}", f"{v[1]:.1%}"] for (t, _), v in list(cache.items())[-10:]],
+                               ["Ticker", "Base Final Price", "Implied Growth"])
+    elapsed = time.perf_counter() - start
+    print(report)
+
+    # The batched solvers, once across the universe
+    wacc = calculate_wacc(universe["risk_free_rate"], universe["market_return"], universe["beta"],
+                          universe["market_cap"], universe["debt"], wacc_cash(universe),
+                          cost_of_debt=universe["cost_of_debt"])
+    net_debt = universe["debt"] - universe["cash"]
+    solve_consistent_wacc(valuation_core.calculate_fcf(universe["initial_fcf"], universe["growth"]),
+                          universe["terminal_growth"], universe["risk_free_rate"][:, None],
+                          universe["market_return"][:, None], universe["beta"][:, None],
+                          universe["market_cap"][:, None], universe["debt"][:, None], universe["cash"][:, None],
+                          cost_of_debt=universe["cost_of_debt"][:, None], wacc_cash=wacc_cash(universe)[:, None])
+    solve_growth_path(universe["market_cap"] * 1000 / universe["initial_shares"], universe["growth"][:, 1],
+                      universe["current_fcf"], universe["terminal_growth"][:, 1], wacc, universe["initial_shares"],
+                      universe["buyback_rate"], net_debt)
+
+    with tempfile.TemporaryDirectory() as directory:
+        REGISTRY.write(os.path.join(directory, "valuation.prom"), os.path.join(directory, "valuation.json"))
+        with open(os.path.join(directory, "valuation.prom")) as f:
+            prometheus = f.read()
+    print("\n".join(line for line in prometheus.splitlines() if "_bucket{" not in line))
+    snapshot = REGISTRY.snapshot()
+    gauges = {(g["name"], tuple(g["labels"].values())): g["value"] for g in snapshot["gauges"]}
+    print(f"\nJob took {elapsed:.2f}s; cache hit ratio {gauges[('valuation_cache_hit_ratio', ('valuation_results',))]:.1%}")
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from tabulate import tabulate
+
+from universe import FIELDS, load_universe
+from valuation_core import SCENARIOS
+from valuation_metrics import REGISTRY, calculate_wacc, run_scenarios
+
+# On-demand valuations over HTTP/JSON, so other tools don't have to spawn a
+# ticker script per request. Requests that arrive within a short window are
+# valued together in one run_scenarios call; identical requests already in
+# flight share one result, and results are cached for a TTL.
+#
+#   POST /value    {"ticker": "MSFT", "overrides": {"beta": 1.0}}
+#                  or {"requests": [{...}, {...}]}
+#   GET  /metrics  counters, batch sizes, latency percentiles, throughput
+#   GET  /health
+#
+# Only the standard library serves HTTP; there is no outside dependency.
+# The WACC and scenario steps and the result cache also report into
+# valuation_metrics.REGISTRY.
+
+OVERRIDABLE = FIELDS + ("initial_fcf", "growth", "terminal_growth")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def _request_inputs(universe, request):
+    """Universe row for the requested ticker with any overrides applied."""
+    if not isinstance(request, dict):
+        raise ValueError(f"Each request must be a JSON object, got {type(request).__name__}")
+    ticker = request.get("ticker")
+    if ticker not in universe["tickers"]:
+        raise ValueError(f"Unknown ticker: {ticker!r}")
+    i = universe["tickers"].index(ticker)
+    overrides = request.get("overrides", {})
+    if not isinstance(overrides, dict):
+        raise ValueError("overrides must be a JSON object")
+    unknown = set(overrides) - set(OVERRIDABLE)
+    if unknown:
+        raise ValueError(f"Cannot override: {sorted(unknown)}")
+    inputs = {}
+    for key in OVERRIDABLE:
+        default = universe[key][i]
+        value = np.asarray(overrides.get(key, default), dtype=float)
+        # A single growth path or terminal rate applies to every scenario
+        inputs[key] = np.broadcast_to(value, np.shape(default))
+    inputs["wacc_nets_cash"] = universe["wacc_nets_cash"][i]
+    return inputs
+
+
+def value_requests(universe, requests):
+    """Value a batch of requests in one vectorized pass; returns one JSON-ready dict per request."""
+    inputs = [_request_inputs(universe, request) for request in requests]
+    batch = {key: np.stack([row[key] for row in inputs]) for key in OVERRIDABLE + ("wacc_nets_cash",)}
+    wacc = calculate_wacc(batch["risk_free_rate"], batch["market_return"], batch["beta"], batch["market_cap"],
+                          batch["debt"], batch["cash"] * batch["wacc_nets_cash"], cost_of_debt=batch["cost_of_debt"])
+    net_debt = batch["debt"] - batch["cash"]
+    result = run_scenarios(batch["initial_fcf"], batch["growth"], batch["terminal_growth"], wacc[:, None],
+                           batch["initial_shares"][:, None], batch["buyback_rate"][:, None], net_debt[:, None])
+
+    responses = []
+    for b, request in enumerate(requests):
+        scenarios = {
+            name: {
+                "equity_value": float(result["equity_value"][b, s]),
+                "price_per_share": float(result["yearly_share_prices"][b, s, 0]),
+                "final_price_per_share": float(result["final_price_per_share"][b, s]),
+                "price_to_fcf": float(result["price_to_fcf"][b, s])
+            }
+            for s, name in enumerate(SCENARIOS)
+        }
+        responses.append({"ticker": request["ticker"], "wacc": float(wacc[b]), "scenarios": scenarios})
+    return responses
+
+
+class ValuationService:
+    """Batches, coalesces and caches valuation requests; serves them over HTTP."""
+
+    def __init__(self, universe=None, batch_window=0.002, max_batch=256, ttl=60.0, max_cache=10000,
+                 latency_samples=10000):
+        self.universe = universe if universe is not None else load_universe()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.ttl = ttl
+        self.max_cache = max_cache
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.pending = []
+        self._flush_handle = None
+        self.counters = {"requests": 0, "cache_hits": 0, "coalesced": 0, "evaluated": 0, "batches": 0,
+                         "errors": 0}
+        self.latencies = deque(maxlen=latency_samples)
+        self.started = time.perf_counter()
+
+    async def value(self, request):
+        start = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            return await self._value(request)
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    async def _value(self, request):
+        loop = asyncio.get_running_loop()
+        key = json.dumps(request, sort_keys=True)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if cached[0] > loop.time():
+                self.counters["cache_hits"] += 1
+                REGISTRY.cache("valuation_service", hit=True)
+                self.cache.move_to_end(key)
+                return cached[1]
+            del self.cache[key]
+        REGISTRY.cache("valuation_service", hit=False)
+        if key in self.in_flight:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        future = loop.create_future()
+        self.in_flight[key] = future
+        self.pending.append((key, request, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._evaluate(batch))
+
+    async def _evaluate(self, batch):
+        loop = asyncio.get_running_loop()
+        valid = []
+        try:
+            for key, request, future in batch:
+                try:
+                    _request_inputs(self.universe, request)
+                    valid.append((key, request, future))
+                except Exception as error:
+                    future.set_exception(ValueError(str(error)))
+
+            if valid:
+                self.counters["batches"] += 1
+                self.counters["evaluated"] += len(valid)
+                try:
+                    # Off the event loop, so connections keep being served during a large batch
+                    results = await loop.run_in_executor(None, value_requests, self.universe,
+                                                         [request for _, request, _ in valid])
+                except Exception as error:
+                    results = [error] * len(valid)
+                expires = loop.time() + self.ttl
+                for (key, _, future), result in zip(valid, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                        continue
+                    future.set_result(result)
+                    if self.ttl > 0:
+                        self.cache[key] = (expires, result)
+                while len(self.cache) > self.max_cache:
+                    self.cache.popitem(last=False)
+        finally:
+            # Whatever failed above, no request in the batch may be left waiting
+            for key, _, future in batch:
+                self.in_flight.pop(key, None)
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch evaluation failed"))
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        uptime = time.perf_counter() - self.started
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [float("nan")] * 3
+        return {
+            **self.counters,
+            "cache_entries": len(self.cache),
+            "mean_batch_size": self.counters["evaluated"] / max(self.counters["batches"], 1),
+            "latency_ms": {"p50": float(percentiles[0]), "p95": float(percentiles[1]), "p99": float(percentiles[2])},
+            "throughput_rps": self.counters["requests"] / uptime if uptime > 0 else 0.0,
+            "uptime_s": uptime
+        }
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path != "/value":
+            return 404, {"error": f"No route for {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST for /value"}
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as error:
+            return 400, {"error": f"Invalid JSON: {error}"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "Body must be a JSON object"}
+        batched = "requests" in payload
+        requests = payload["requests"] if batched else [payload]
+        if not isinstance(requests, list) or not all(isinstance(request, dict) for request in requests):
+            return 400, {"error": "requests must be a list of JSON objects"}
+        results = await asyncio.gather(*[self.value(request) for request in requests], return_exceptions=True)
+        results = [{"error": str(r)} if isinstance(r, Exception) else r for r in results]
+        if batched:
+            return 200, {"results": results}
+        return (400 if "error" in results[0] else 200), results[0]
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive; enough for local JSON clients."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, path.split("?")[0], body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def _http_post(reader, writer, path, payload):
+    data = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load_test(host, port, requests, concurrency=32):
+    """
+    Fire requests at a running service from concurrency keep-alive connections.
+
+    Returns:
+    dict: request count, errors, elapsed seconds, throughput and latency percentiles (ms)
+    """
+    queue = deque(requests)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                request = queue.popleft()
+                start = time.perf_counter()
+                status, _ = await _http_post(reader, writer, "/value", request)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {"requests": len(latencies), "errors": errors, "elapsed_s": elapsed,
+            "throughput_rps": len(latencies) / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+async def serve(host="127.0.0.1", port=8080, **options):
+    service = ValuationService(**options)
+    server = await service.start(host, port)
+    print(f"Serving valuations on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def _run_load(ttl, requests, concurrency=64):
+    service = ValuationService(ttl=ttl)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        client = await load_test("127.0.0.1", port, requests, concurrency)
+        await asyncio.sleep(0.01)  # let the server see the clients disconnect
+    return client, service.metrics()
+
+
+async def _demo():
+    universe = load_universe()
+    rows = value_requests(universe, [{"ticker": "MSFT"}])[0]["scenarios"]
+    print(tabulate([[name, f"${v['price_per_share']:.2f}", f"${v['final_price_per_share']:.2f}"]
+                    for name, v in rows.items()], ["MSFT", "Price Today", "Final Price"], tablefmt="grid"))
+
+    # 60 distinct requests (tickers x beta overrides), repeated, so the mix
+    # exercises coalescing and the cache as well as batching
+    rng = np.random.default_rng(0)
+    distinct = [{"ticker": t, "overrides": {"beta": round(b, 2)}}
+                for t in universe["tickers"] for b in np.linspace(0.8, 1.5, 6)]
+    requests = [distinct[i] for i in rng.integers(len(distinct), size=5000)]
+
+    headers = ["Run", "Client req/s", "Client p50", "Client p99", "Evaluated", "Batches", "Mean Batch",
+               "Coalesced", "Cache Hits"]
+    table = []
+    for label, ttl in [("TTL cache 30s", 30.0), ("No cache", 0.0)]:
+        client, metrics = await _run_load(ttl, requests)
+        table.append([label, f"{client['throughput_rps']:.0f}", f"{client['p50_ms']:.1f}ms",
+                      f"{client['p99_ms']:.1f}ms", metrics["evaluated"], metrics["batches"],
+                      f"{metrics['mean_batch_size']:.1f}", metrics["coalesced"], metrics["cache_hits"]])
+    print(tabulate(table, headers, tablefmt="grid"))
+
+
+# Example usage:
+#   python valuation_service.py            local load test against an in-process server
+#   python valuation_service.py serve 8080
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        asyncio.run(serve(port=int(sys.argv[2]) if len(sys.argv) > 2 else 8080))
+    else:
+        asyncio.run(_demo())
@@ -0,0 +1,138 @@
+from math import factorial
+
+import numpy as np
+from tabulate import tabulate
+
+from valuation_core import SCENARIOS, calculate_fcf, calculate_wacc, calculate_yearly_share_count, yearly_dcf_valuations
+
+# Explains why a ticker's fair value moved between two runs. Inputs are
+# grouped (beta, rates, growth, balance sheet, shares, FCF); every one of the
+# 2^k mixes of old and new groups is valued in one batch and the change is
+# split with Shapley values. Each intermediate (WACC, FCF projections, share
+# counts) is computed once per distinct combination of the groups it
+# actually depends on, not once per subset.
+
+INPUT_GROUPS = {
+    "beta": ["beta"],
+    "rates": ["risk_free_rate", "market_return"],
+    "growth": ["growth", "terminal_growth"],
+    "balance_sheet": ["cash", "debt", "market_cap", "cost_of_debt", "wacc_nets_cash"],
+    "shares": ["initial_shares", "buyback_rate"],
+    "fcf": ["initial_fcf"],
+}
+
+METRICS = ("final_price_per_share", "price_per_share", "equity_value", "ev")
+
+
+def ticker_inputs(universe, ticker):
+    """One ticker's slice of a load_universe() dict, in the form attribute_change expects."""
+    i = universe["tickers"].index(ticker)
+    keys = [key for keys in INPUT_GROUPS.values() for key in keys]
+    return {key: np.array(universe[key][i], dtype=float) for key in keys}
+
+
+def attribute_change(old, new, groups=INPUT_GROUPS, metric="final_price_per_share"):
+    """
+    Shapley decomposition of new[metric] - old[metric] over input groups.
+
+    Parameters:
+    old, new (dict): Ticker inputs (see ticker_inputs); growth is (scenarios, years)
+    groups (dict): Group name -> input keys; every input key must be in one group
+    metric (str): One of METRICS
+
+    Returns:
+    dict: old, new and per-group contributions (arrays over scenarios; the
+    contributions sum to new - old), plus evaluations per intermediate step
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    names = list(groups)
+    k = len(names)
+    bit = {key: 1 << g for g, name in enumerate(names) for key in groups[name]}
+    missing = set(old) - set(bit)
+    if missing:
+        raise ValueError(f"Inputs not assigned to a group: {sorted(missing)}")
+    codes = np.arange(2 ** k)
+    evaluations = {}
+
+    def inputs(subset, *keys):
+        values = []
+        for key in keys:
+            take_new = (subset & bit[key]) != 0
+            shape = (-1,) + (1,) * np.ndim(old[key])
+            values.append(np.where(take_new.reshape(shape), new[key], old[key]))
+        return values
+
+    def memoized(step, keys, compute, depends=0):
+        mask = depends
+        for key in keys:
+            mask |= bit[key]
+        unique, inverse = np.unique(codes & mask, return_inverse=True)
+        evaluations[step] = len(unique)
+        return compute(unique)[inverse], mask
+
+    def subset_wacc(subset):
+        risk_free_rate, market_return, beta, market_cap, debt, cash, nets_cash, cost_of_debt = inputs(
+            subset, "risk_free_rate", "market_return", "beta", "market_cap", "debt", "cash", "wacc_nets_cash",
+            "cost_of_debt")
+        return calculate_wacc(risk_free_rate, market_return, beta, market_cap, debt, cash * nets_cash,
+                              cost_of_debt=cost_of_debt)
+
+    wacc, wacc_mask = memoized("wacc", ["risk_free_rate", "market_return", "beta", "market_cap", "debt", "cash",
+                                        "wacc_nets_cash", "cost_of_debt"], subset_wacc)
+    projections, projection_mask = memoized("fcf_projections", ["initial_fcf", "growth"], lambda subset:
+                                            calculate_fcf(*inputs(subset, "initial_fcf", "growth")))
+    years = projections.shape[-1]
+    shares, _ = memoized("share_count", ["initial_shares", "buyback_rate"], lambda subset:
+                                   calculate_yearly_share_count(*inputs(subset, "initial_shares", "buyback_rate"),
+                                                                years))
+    yearly_ev, _ = memoized("yearly_ev", ["terminal_growth"], lambda subset: yearly_dcf_valuations(
+        projections[subset], inputs(subset, "terminal_growth")[0], wacc[subset][:, None]),
+        depends=wacc_mask | projection_mask)
+
+    net_debt = np.subtract(*inputs(codes, "debt", "cash"))[:, None]
+    if metric == "ev":
+        values = yearly_ev[..., 0]
+    elif metric == "equity_value":
+        values = yearly_ev[..., 0] - net_debt
+    else:
+        prices = (yearly_ev - net_debt[..., None]) * 1000 / shares[:, None, :]
+        values = prices[..., -1] if metric == "final_price_per_share" else prices[..., 0]
+
+    sizes = np.array([bin(code).count("1") for code in codes])
+    contributions = {}
+    for g, name in enumerate(names):
+        without = codes[(codes & (1 << g)) == 0]
+        weights = np.array([factorial(s) * factorial(k - s - 1) / factorial(k) for s in sizes[without]])
+        contributions[name] = np.sum(weights[:, None] * (values[without | (1 << g)] - values[without]), axis=0)
+
+    return {
+        "old": values[0],
+        "new": values[-1],
+        "contributions": contributions,
+        "evaluations": evaluations,
+        "subsets": len(codes)
+    }
+
+
+# Example usage:
+if __name__ == "__main__":
+    from universe import load_universe
+
+    universe = load_universe()
+    old = ticker_inputs(universe, "MSFT")
+    new = {key: value.copy() for key, value in old.items()}
+    new["beta"] = np.array(1.0)
+    new["risk_free_rate"] = np.array(0.042)
+    new["growth"] = old["growth"] + 0.01
+    new["cash"] = np.array(80.0)
+    new["initial_shares"] = np.array(7400.0)
+
+    result = attribute_change(old, new)
+    headers = ["Driver"] + list(SCENARIOS)
+    table = [["Previous Final Price"] + [f"${v:.2f}" for v in result["old"]]]
+    for name, contribution in result["contributions"].items():
+        table.append([name] + [f"{v:+.2f}" for v in contribution])
+    table.append(["New Final Price"] + [f"${v:.2f}" for v in result["new"]])
+    print(tabulate(table, headers, tablefmt="grid"))
+    print(f"{result['subsets']} subsets; evaluations per step: {result['evaluations']}")